@@ -4,10 +4,26 @@ from datetime import datetime
 import plotly.express as px
 import plotly.graph_objects as go
 from streamlit_option_menu import option_menu
-from src.database.models import get_session, Eleve, User
-from src.models.predicteur import PredicteurDecrochage
+from src.database.models import init_db, Eleve, routeur, ECOLE_PAR_DEFAUT
+from src.auth.authentification import authentifier, emettre_jeton, session_valide, ecole_utilisateur, TropDeTentatives
+from src.database.requetes import (charger_historique_partitions, formater_pour_affichage,
+                                   niveaux_disponibles_partitions, agreger_risques_partitions,
+                                   annees_disponibles_partitions)
+from src.database.export import exporter
+from src.database.cache import cache_pages
+from src.models.registre import RegistreModeles, ServiceScoring, comparer_ombre
+from src.models.schema import DonneesInvalides, AVIS_CONSEIL, SCHEMA, CHAMPS
+from src.models.predicteur import facteurs_risque
+from src.models.simulation import (Simulateur, scenario, CHAMPS_SIMULABLES, OPERATIONS as OPERATIONS_SIMULATION,
+                                   BOOLEENS as BOOLEENS_SIMULATION)
+from src.models.seuils import SEUIL_MODERE, SEUIL_ELEVE, SEUIL_RISQUE, niveau_risque, selection_suivi
+from src.monitoring.instrumentation import instrumentation
+from src.monitoring.derive import MoniteurDerive, charger_reference, NOM_ETAT as NOM_ETAT_DERIVE
+from src.monitoring.profilage import profileur, mode_environnement, MODES as MODES_PROFILAGE
+from sqlalchemy.exc import IntegrityError
 import joblib
 import os
+import tempfile
 
 # Configuration de la page
 st.set_page_config(
@@ -16,22 +32,96 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
+def preparer_base():
+    # Création des tables et ajout des colonnes récentes, une seule fois par processus
+    return init_db()
+
+preparer_base()
+
+@st.cache_data(ttl=60)
+def lignes_non_migrees():
+    # Partitionnement actif: les élèves restés dans la base principale seraient invisibles
+    return routeur.lignes_non_migrees()
+
+_non_migres = lignes_non_migrees()
+if _non_migres:
+    st.error(f"{_non_migres} élèves sont encore dans elite_vigilance.db alors que le partitionnement "
+             f"'{routeur.strategie}' est actif. Migrez-les avant de démarrer: python -m src.database.migration migrer")
+    st.stop()
+
+# Modèles servis depuis le registre versionné (production, candidat en ombre ou en déploiement)
+REGISTRE_MODELES = os.environ.get('ELITE_REGISTRE_MODELES', 'model/registre')
 MODEL_PATH = "model/modele_decrochage.pkl"
+
+@st.cache_resource
+def charger_service():
+    # Un seul service par processus: les changements du manifeste sont relus à chaud
+    registre = RegistreModeles(REGISTRE_MODELES)
+    registre.initialiser_depuis(MODEL_PATH)
+    service = ServiceScoring(registre)
+    service.predicteur_live()
+    return service
+
 try:
-    predicteur = PredicteurDecrochage(MODEL_PATH)
-    # st.success(f"Modèle chargé avec succès depuis {MODEL_PATH}")
+    service = charger_service()
 except Exception as e:
     # Garder l'application démarrable et afficher un message clair dans Streamlit
-    predicteur = None
-    st.error(f"Impossible de charger le modèle depuis {MODEL_PATH}: {e}")
+    service = None
+    st.error(f"Impossible de charger le modèle depuis {REGISTRE_MODELES}: {e}")
+
+@st.cache_resource
+def charger_moniteur(version):
+    # Résumés de dérive propres à chaque version (référence enregistrée à l'entraînement)
+    dossier = service.registre.repertoire / version
+    reference = charger_reference(dossier)
+    return MoniteurDerive(reference, chemin_etat=dossier / NOM_ETAT_DERIVE) if reference else None
+
+def moniteur_derive():
+    if service is None:
+        return None
+    return charger_moniteur(service.registre.manifeste()['live'])
+
+def afficher_alertes_derive():
+    moniteur = moniteur_derive()
+    alertes = moniteur.alertes() if moniteur else []
+    if alertes:
+        details = ", ".join(f"{a['champ']} (PSI {a['psi']:.2f}, dérive {a['niveau']})" for a in alertes)
+        st.warning(f"Les élèves évalués s'écartent des données d'entraînement : {details}")
+
+def observer_derive(donnees, probas):
+    # Le suivi de dérive ne doit jamais faire échouer une prédiction déjà enregistrée
+    moniteur = moniteur_derive()
+    if moniteur is None:
+        return
+    try:
+        moniteur.observer_lot(donnees, probas)
+    except Exception as e:
+        print(f"Suivi de dérive indisponible: {e}")
+
+def ecoles_utilisateur():
+    # Un utilisateur rattaché à une école ne voit que ses élèves (None = toutes les écoles)
+    ecole = st.session_state.get('ecole')
+    return [ecole] if ecole else None
+
+def donnees_page(page, calcul, **parametres):
+    # Cache partagé entre sessions, par école, rôle et filtres; invalidé au commit d'un élève de l'école
+    return cache_pages.obtenir(page, ecoles_utilisateur(), st.session_state.get('role'), parametres, calcul)
+
+def selection_annee(cle):
+    # Les années archivées sont lues depuis les fichiers Parquet, seulement quand on les sélectionne
+    ecoles = ecoles_utilisateur()
+    actives, archivees = donnees_page('annees', lambda: annees_disponibles_partitions(ecoles=ecoles))
+    options = [None] + sorted(set(actives) | set(archivees), reverse=True)
+    return st.selectbox(
+        "Année scolaire", options, key=cle,
+        format_func=lambda a: "Années en cours" if a is None else (f"{a} (archive)" if a in archivees else a)
+    )
 
 # Fonction pour l'authentification
 def authenticate(username, password):
-    session = get_session()
-    user = session.query(User).filter_by(username=username).first()
-    if user and user.password == password:  # Dans un vrai système, utilisez le hachage des mots de passe
-        return user.role
-    return None
+    # Utilisateurs en cache mémoire, mots de passe vérifiés par scrypt, tentatives limitées
+    return authentifier(username, password)
 
 # Interface de connexion
 def login_page():
@@ -43,44 +133,66 @@ def login_page():
         submit = st.form_submit_button("Se connecter")
         
         if submit:
-            role = authenticate(username, password)
+            try:
+                role = authenticate(username, password)
+            except TropDeTentatives as e:
+                st.error(str(e))
+                return
             if role:
                 st.session_state['logged_in'] = True
                 st.session_state['username'] = username
                 st.session_state['role'] = role
+                st.session_state['ecole'] = ecole_utilisateur(username)
+                st.session_state['jeton'] = emettre_jeton(username, role, st.session_state['ecole'])
                 st.rerun()
             else:
                 st.error("Nom d'utilisateur ou mot de passe incorrect")
 
+def calculer_tableau_de_bord(ecoles):
+    # Récupération des données (toutes les partitions accessibles à l'utilisateur)
+    df = charger_historique_partitions(ecoles=ecoles)
+    
+    # Colonnes numériques attendues par les graphiques
+    df['risque_decrochage'] = pd.to_numeric(df['Risque Décrochage'], errors='coerce')
+    df['niveau_scolaire'] = df['Niveau']
+    notes = df.dropna(subset=['risque_decrochage'])
+    donnees = {'df': df, 'risques': notes['risque_decrochage'].to_numpy(),
+               'ecoles': notes['École'].fillna(ECOLE_PAR_DEFAUT).to_numpy(), 'niveaux': notes['Niveau'].to_numpy()}
+    if not df.empty:
+        donnees['histogramme'] = px.histogram(df, x='risque_decrochage',
+                                              title='Distribution des Risques de Décrochage',
+                                              labels={'risque_decrochage': 'Probabilité de décrochage'})
+        donnees['boite'] = px.box(df, x='niveau_scolaire', y='risque_decrochage',
+                                  title='Risque de Décrochage par Niveau Scolaire')
+    return donnees
+
+@instrumentation.chronometre('page.tableau_de_bord')
 def display_dashboard():
     st.title("📊 Tableau de Bord")
+    if st.session_state.get('role') == 'admin':
+        afficher_alertes_derive()
     
-    # Récupération des données
-    session = get_session()
-    eleves = session.query(Eleve).all()
-    df = pd.DataFrame([eleve.to_dict() for eleve in eleves])
+    # Données et figures partagées par tous les utilisateurs de la même école (calculées une fois)
+    ecoles = ecoles_utilisateur()
+    donnees = donnees_page('tableau_de_bord', lambda: calculer_tableau_de_bord(ecoles))
+    df = donnees['df']
     
-    # Harmoniser les noms/valeurs des colonnes attendues par les graphiques
     if not df.empty:
-        # Créer une colonne numérique 'risque_decrochage' à partir de 'Risque Décrochage' (format texte "xx.x%")
-        if 'risque_decrochage' not in df.columns and 'Risque Décrochage' in df.columns:
-            try:
-                df['risque_decrochage'] = (
-                    df['Risque Décrochage']
-                    .astype(str)
-                    .str.replace('%', '', regex=False)
-                    .str.replace(',', '.', regex=False)
-                    .astype(float) / 100.0
-                )
-            except Exception:
-                # En cas d'échec de conversion, remplir par NaN
-                df['risque_decrochage'] = pd.NA
+        # Suivi: seuil fixe, ou les élèves les plus à risque dans la limite de la capacité de chaque école
+        risques = donnees['risques']
+        ecoles_df = sorted(set(donnees['ecoles'].tolist()))
+        capacite = st.number_input("Capacité de suivi par école (nombre d'élèves, 0 = seuil fixe)",
+                                   min_value=0, value=0, step=10)
+        capacites = {ecole: capacite for ecole in ecoles_df}
+        if len(ecoles_df) > 1:
+            with st.expander("Capacité de chaque école"):
+                for ecole in ecoles_df:
+                    # Réinitialisée à la capacité commune quand celle-ci change
+                    capacites[ecole] = st.number_input(ecole, min_value=0, value=capacite, step=10,
+                                                       key=f"capacite_{ecole}_{capacite}")
+        suivis, seuils = selection_suivi(risques, donnees['ecoles'], capacites, seuil=SEUIL_RISQUE)
+        aide_seuil = ", ".join(f"{ecole} : {seuil:.1%}" for ecole, seuil in seuils.items())
         
-        # Alias pour le niveau scolaire attendu par les graphiques
-        if 'niveau_scolaire' not in df.columns and 'Niveau' in df.columns:
-            df['niveau_scolaire'] = df['Niveau']
-    
-    if not df.empty:
         col1, col2, col3 = st.columns(3)
         
         with col1:
@@ -88,12 +200,8 @@ def display_dashboard():
             st.metric("Nombre total d'élèves", total_eleves)
             
         with col2:
-            # Protéger si la colonne est absente ou non numérique
-            if 'risque_decrochage' in df.columns:
-                eleves_risque = len(df[pd.to_numeric(df['risque_decrochage'], errors='coerce') >= 0.5])
-            else:
-                eleves_risque = 0
-            st.metric("Élèves à risque", eleves_risque)
+            eleves_risque = int(suivis.sum())
+            st.metric("Élèves à risque", eleves_risque, help=f"Seuil appliqué : {aide_seuil}")
             
         with col3:
             taux_risque = (eleves_risque / total_eleves) * 100 if total_eleves > 0 else 0
@@ -103,16 +211,28 @@ def display_dashboard():
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = px.histogram(df, x='risque_decrochage', 
-                             title='Distribution des Risques de Décrochage',
-                             labels={'risque_decrochage': 'Probabilité de décrochage'})
-            st.plotly_chart(fig)
+            st.plotly_chart(donnees['histogramme'])
             
         with col2:
-            fig = px.box(df, x='niveau_scolaire', y='risque_decrochage',
-                        title='Risque de Décrochage par Niveau Scolaire')
-            st.plotly_chart(fig)
+            st.plotly_chart(donnees['boite'])
+        
+        # Vue district: agrégats calculés en parallèle sur chaque partition puis fusionnés
+        if st.session_state.get('ecole') is None:
+            agregats = donnees_page('vue_district', lambda: agreger_risques_partitions(SEUIL_RISQUE), seuil=SEUIL_RISQUE)
+            if any(capacites.values()):
+                # Élèves à risque comptés sur la sélection par capacité, pas sur le seuil fixe
+                a_risque = pd.DataFrame({'ecole': donnees['ecoles'], 'niveau': donnees['niveaux'], 'a_risque': suivis})
+                a_risque = a_risque.groupby(['ecole', 'niveau'], as_index=False)['a_risque'].sum()
+                agregats = agregats.drop(columns='a_risque').merge(a_risque, on=['ecole', 'niveau'], how='left')
+                agregats['a_risque'] = agregats['a_risque'].fillna(0).astype(int)
+            if agregats['ecole'].nunique() > 1:
+                st.subheader("Vue par école")
+                st.dataframe(agregats.rename(columns={
+                    'ecole': 'École', 'niveau': 'Niveau', 'effectif': 'Effectif', 'a_risque': 'À risque',
+                    'risque_moyen': 'Risque moyen', 'ecart_type': 'Écart-type'
+                }), use_container_width=True)
 
+@instrumentation.chronometre('page.nouvelle_prediction')
 def new_prediction_page():
     st.title("🆕 Nouvelle Prédiction")
     
@@ -143,7 +263,7 @@ def new_prediction_page():
         
         if submitted:
             # Vérifier que le modèle est chargé
-            if predicteur is None:
+            if service is None:
                 st.error("Le modèle n'est pas chargé. Impossible de faire une prédiction pour le moment.")
                 return
             else:
@@ -164,19 +284,23 @@ def new_prediction_page():
                     'niveau': [niveau]
                 })
                 
-                # Prédiction
-                proba = predicteur.predict(data)[0]
-                risk_factors = predicteur.get_risk_factors(data)
+                # Prédiction (les saisies hors schéma sont refusées, jamais scorées)
+                try:
+                    proba = service.predire(data, ids=[id_eleve])[0]
+                except DonneesInvalides as e:
+                    st.error(f"Saisie invalide : {e.resultat.erreurs()['Erreurs'].iloc[0]}")
+                    return
+                risk_factors = service.predicteur_live().get_risk_factors(data)
 
             # Affichage des résultats
             st.header("Résultats de la prédiction")
 
             # Déterminer le niveau de risque et les couleurs
-            if proba >= 0.7:
+            if proba >= SEUIL_ELEVE:
                 risk_label = "Risque élevé"
                 risk_color = "#d9534f"  # rouge
                 risk_emoji = "🚨"
-            elif proba >= 0.4:
+            elif proba >= SEUIL_MODERE:
                 risk_label = "Risque modéré"
                 risk_color = "#f0ad4e"  # orange
                 risk_emoji = "⚠️"
@@ -197,9 +321,9 @@ def new_prediction_page():
                         "axis": {"range": [0, 100]},
                         "bar": {"color": risk_color},
                         "steps": [
-                            {"range": [0, 40], "color": "#d9f2e4"},
-                            {"range": [40, 70], "color": "#fde9cf"},
-                            {"range": [70, 100], "color": "#f7d6d6"},
+                            {"range": [0, SEUIL_MODERE * 100], "color": "#d9f2e4"},
+                            {"range": [SEUIL_MODERE * 100, SEUIL_ELEVE * 100], "color": "#fde9cf"},
+                            {"range": [SEUIL_ELEVE * 100, 100], "color": "#f7d6d6"},
                         ],
                         "threshold": {
                             "line": {"color": risk_color, "width": 4},
@@ -231,11 +355,17 @@ def new_prediction_page():
                     for factor in risk_factors:
                         st.write(f"• {factor}")
             
-            # Sauvegarde dans la base de données
-            session = get_session()
+            # Sauvegarde dans la partition de l'école (ou la base principale)
+            if routeur.ids_existants([id_eleve]):
+                st.error(f"L'identifiant {id_eleve} est déjà enregistré.")
+                return
+            ecole = st.session_state.get('ecole') or ECOLE_PAR_DEFAUT
+            annee_scolaire = str(datetime.now().year)
+            session = routeur.session_pour(ecole=ecole, annee_scolaire=annee_scolaire)
             new_eleve = Eleve(
                 id_eleve=id_eleve,
-                annee_scolaire=str(datetime.now().year),
+                ecole=ecole,
+                annee_scolaire=annee_scolaire,
                 age=age,
                 sexe=sexe,
                 niveau_scolaire=niveau,
@@ -256,28 +386,202 @@ def new_prediction_page():
             try:
                 session.add(new_eleve)
                 session.commit()
-                st.success("Prédiction enregistrée avec succès!")
             except Exception as e:
                 session.rollback()
                 st.error(f"Erreur lors de l'enregistrement : {str(e)}")
+                return
             finally:
                 session.close()
+            st.success("Prédiction enregistrée avec succès!")
+            # Mise à jour en ligne des résumés de dérive, après le commit (coût constant par prédiction)
+            observer_derive(data, [proba])
+
+# Saisie d'une classe entière (conseil de classe): identifiant + 13 entrées du modèle
+COLONNES_CLASSE = ['id_eleve'] + CHAMPS
+LIBELLES_CLASSE = dict([('id_eleve', 'ID Élève')] + [(champ, libelle) for champ, libelle, _, _ in SCHEMA])
+CHAMPS_BOOLEENS = [champ for champ, _, type_, _ in SCHEMA if type_ == 'booleen']
+OUI_NON = {'oui': True, 'non': False, 'vrai': True, 'faux': False, '1': True, '0': False}
+LIBELLES_NIVEAU = {'faible': "Faible risque", 'modere': "Risque modéré", 'eleve': "Risque élevé"}
+
+def grille_classe_vide(lignes=35):
+    grille = pd.DataFrame({champ: pd.Series([None] * lignes, dtype=object) for champ in COLONNES_CLASSE})
+    for champ, _, type_, _ in SCHEMA:
+        if type_ == 'numerique':
+            grille[champ] = pd.Series([None] * lignes, dtype=float)
+        elif type_ == 'booleen':
+            grille[champ] = False
+    return grille
+
+def configuration_grille_classe():
+    config = {'id_eleve': st.column_config.TextColumn(LIBELLES_CLASSE['id_eleve'], required=True)}
+    for champ, libelle, type_, contrainte in SCHEMA:
+        if type_ == 'numerique':
+            config[champ] = st.column_config.NumberColumn(libelle, min_value=contrainte[0], max_value=contrainte[1])
+        elif type_ == 'booleen':
+            config[champ] = st.column_config.CheckboxColumn(libelle)
+        else:
+            config[champ] = st.column_config.SelectboxColumn(libelle, options=list(contrainte))
+    return config
+
+def lire_feuille_classe(fichier):
+    """
+    Feuille de classe (CSV ou Excel), colonnes nommées par champ ou par libellé
+    """
+    if fichier.name.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(fichier)
+    else:
+        df = pd.read_csv(fichier, sep=None, engine='python')
+    champs = {libelle.lower(): champ for champ, libelle in LIBELLES_CLASSE.items()}
+    df = df.rename(columns=lambda c: champs.get(str(c).strip().lower(), str(c).strip()))
+    for champ, _, type_, _ in SCHEMA:
+        if champ not in df.columns:
+            continue
+        if type_ == 'numerique':
+            # Virgule décimale acceptée; une cellule non numérique devient vide et sera signalée par la validation
+            if not pd.api.types.is_numeric_dtype(df[champ]):
+                df[champ] = df[champ].astype(str).str.replace(',', '.', regex=False)
+            df[champ] = pd.to_numeric(df[champ], errors='coerce')
+        elif type_ == 'booleen' and not pd.api.types.is_numeric_dtype(df[champ]):
+            df[champ] = df[champ].map(lambda v: OUI_NON.get(str(v).strip().lower(), v))
+    return df
+
+def enregistrer_classe(lignes, probas, ecole, annee_scolaire):
+    """
+    Enregistre tous les élèves évalués en une seule transaction (tout ou rien)
+    """
+    date_prediction = datetime.now().date()
+    eleves = [
+        Eleve(id_eleve=str(ligne['id_eleve']), ecole=ecole, annee_scolaire=annee_scolaire,
+              age=int(ligne['age']), sexe=ligne['sexe'], niveau_scolaire=ligne['niveau'],
+              redoublement=bool(ligne['redoublement']), statut_bourse=bool(ligne['statut_bourse']),
+              moyenne_t1=float(ligne['moyenne_t1']), moyenne_t2=float(ligne['moyenne_t2']),
+              nb_matieres_echec=int(ligne['nb_matieres_echec']), absences_t1=int(ligne['absences_t1']),
+              absences_t2=int(ligne['absences_t2']), retards=int(ligne['retards']),
+              sanctions=int(ligne['sanctions']), avis_conseil=ligne['avis_conseil'],
+              risque_decrochage=float(proba), date_prediction=date_prediction)
+        for ligne, proba in zip(lignes.to_dict('records'), probas)
+    ]
+    session = routeur.session_pour(ecole=ecole, annee_scolaire=annee_scolaire)
+    try:
+        # Unité de travail ORM: insertions groupées, invalidation du cache de l'école au commit
+        session.add_all(eleves)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+@instrumentation.chronometre('page.conseil_classe')
+def class_council_page():
+    st.title("👥 Conseil de classe")
+    st.caption("Saisie ou import d'une classe entière: validation, scoring et enregistrement en une seule fois.")
+
+    if service is None:
+        st.error("Le modèle n'est pas chargé. Impossible de faire une prédiction pour le moment.")
+        return
+
+    source = st.radio("Source", ["Saisie dans la grille", "Import d'une feuille de classe"], horizontal=True)
+    if source == "Import d'une feuille de classe":
+        fichier = st.file_uploader("Feuille de classe (CSV ou Excel)", type=['csv', 'xlsx', 'xls'])
+        st.caption("Une ligne par élève; colonnes: " + ", ".join(LIBELLES_CLASSE.values()))
+        if fichier is None:
+            return
+        try:
+            classe = lire_feuille_classe(fichier)
+        except Exception as e:
+            st.error(f"Lecture impossible : {e}")
+            return
+        classe = st.data_editor(classe, num_rows="dynamic", column_config=configuration_grille_classe(),
+                                key="grille_import", use_container_width=True)
+    else:
+        classe = st.data_editor(grille_classe_vide(), num_rows="dynamic", column_config=configuration_grille_classe(),
+                                key="grille_classe", use_container_width=True)
 
+    if not st.button("Évaluer et enregistrer la classe"):
+        return
+
+    # Lignes vides de la grille ignorées (les cases à cocher valent toujours Oui/Non)
+    renseignees = [c for c in COLONNES_CLASSE if c in classe.columns and c not in CHAMPS_BOOLEENS]
+    classe = classe.dropna(how='all', subset=renseignees).reset_index(drop=True)
+    if classe.empty:
+        st.info("Aucun élève saisi.")
+        return
+    if 'id_eleve' not in classe.columns:
+        st.error("Colonne « ID Élève » absente.")
+        return
+    ids = classe['id_eleve'].astype(str).str.strip()
+    if classe['id_eleve'].isna().any() or (ids == '').any() or ids.duplicated().any():
+        st.error("Chaque élève doit avoir un identifiant unique.")
+        return
+    classe['id_eleve'] = ids
+
+    # Validation et scoring de toute la classe en un seul appel vectorisé
+    probas, resultat = service.predire_lot(classe, ids=ids.to_numpy())
+    if not resultat.tout_valide:
+        erreurs = resultat.erreurs()
+        erreurs.insert(1, 'ID Élève', ids.iloc[erreurs['Ligne']].to_numpy())
+        st.error(f"{len(erreurs)} ligne(s) invalide(s) : corrigez-les, la classe n'a pas été enregistrée.")
+        st.dataframe(erreurs, use_container_width=True)
+        return
+
+    # Unicité vérifiée dans toutes les partitions (la contrainte SQL ne couvre que la partition cible)
+    existants = routeur.ids_existants(ids.tolist())
+    if existants:
+        st.error(f"{len(existants)} identifiant(s) déjà enregistré(s) : {', '.join(sorted(existants)[:20])}. "
+                 "Aucun élève de la classe n'a été enregistré.")
+        return
+
+    ecole = st.session_state.get('ecole') or ECOLE_PAR_DEFAUT
+    try:
+        enregistrer_classe(classe, probas, ecole, str(datetime.now().year))
+    except IntegrityError:
+        st.error("Un ou plusieurs identifiants sont déjà enregistrés : aucun élève de la classe n'a été enregistré.")
+        return
+    except Exception as e:
+        st.error(f"Erreur lors de l'enregistrement (aucun élève enregistré) : {str(e)}")
+        return
+    st.success(f"{len(classe)} élèves évalués et enregistrés.")
+    observer_derive(classe[CHAMPS], probas)
+
+    resultats = pd.DataFrame({
+        'ID Élève': ids,
+        'Niveau': classe['niveau'],
+        'Probabilité': probas,
+        'Niveau de risque': pd.Series(niveau_risque(probas)).map(LIBELLES_NIVEAU).to_numpy(),
+        'Facteurs de risque': ['; '.join(f) for f in facteurs_risque(classe)],
+    }).sort_values('Probabilité', ascending=False)
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Élèves", len(resultats))
+    c2.metric("Risque élevé", int((probas >= SEUIL_ELEVE).sum()))
+    c3.metric("Risque moyen", f"{probas.mean():.1%}")
+
+    # Un seul graphique pour la classe (au lieu d'une jauge par élève)
+    fig = px.bar(resultats, x='Probabilité', y='ID Élève', orientation='h', color='Niveau de risque',
+                 color_discrete_map={"Faible risque": "#2e7d32", "Risque modéré": "#f0ad4e", "Risque élevé": "#d9534f"},
+                 title="Probabilité de décrochage par élève", range_x=[0, 1])
+    fig.add_vline(x=SEUIL_MODERE, line_dash='dot', line_color='#f0ad4e')
+    fig.add_vline(x=SEUIL_ELEVE, line_dash='dot', line_color='#d9534f')
+    fig.update_layout(height=max(300, 22 * len(resultats)), yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(resultats.style.format({'Probabilité': '{:.1%}'}), use_container_width=True, hide_index=True)
+
+@instrumentation.chronometre('page.historique')
 def history_page():
     st.title("📚 Historique des Prédictions")
     
-    session = get_session()
-    eleves = session.query(Eleve).all()
+    annee = selection_annee("annee_historique")
+    ecoles = ecoles_utilisateur()
+    niveaux = donnees_page('niveaux', lambda: niveaux_disponibles_partitions(ecoles=ecoles, annee=annee), annee=annee)
     
-    if eleves:
-        df = pd.DataFrame([eleve.to_dict() for eleve in eleves])
-        
+    if niveaux:
         # Filtres
         col1, col2, col3 = st.columns(3)
         with col1:
             niveau_filter = st.multiselect(
                 "Filtrer par niveau",
-                options=df['Niveau'].unique()
+                options=niveaux
             )
         with col2:
             date_filter = st.date_input(
@@ -285,65 +589,84 @@ def history_page():
                 value=[datetime.now().date()]
             )
         
-        # Application des filtres
-        if niveau_filter:
-            df = df[df['Niveau'].isin(niveau_filter)]
+        # Application des filtres (la période ne s'applique qu'une fois les deux dates choisies)
+        filtres = {'niveaux': niveau_filter, 'ecoles': ecoles_utilisateur(), 'annee': annee}
+        if isinstance(date_filter, (list, tuple)) and len(date_filter) == 2:
+            filtres['date_debut'], filtres['date_fin'] = date_filter
+        df = donnees_page('historique', lambda: formater_pour_affichage(charger_historique_partitions(**filtres)),
+                          **filtres)
         
         # Affichage du tableau
         st.dataframe(df)
         
+        # Export des mêmes lignes filtrées, écrit en flux dans un fichier temporaire
+        with col3:
+            format_export = st.selectbox("Format d'export", ["csv", "xlsx"])
+            compresser = st.checkbox("Compresser (gzip)", disabled=format_export != "csv")
+            if st.button("Préparer l'export"):
+                extension = format_export + (".gz" if compresser and format_export == "csv" else "")
+                with tempfile.NamedTemporaryFile(suffix=f".{extension}", delete=False) as tmp:
+                    chemin_export = tmp.name
+                n = exporter(chemin_export, format_fichier=format_export, compresser=compresser, **filtres)
+                with open(chemin_export, 'rb') as f:
+                    st.download_button(f"Télécharger ({n} lignes)", f,
+                                       file_name=f"historique_predictions.{extension}")
+                os.remove(chemin_export)
+        
     else:
         st.info("Aucune prédiction enregistrée pour le moment.")
 
+def calculer_statistiques(ecoles, annee, trend):
+    # Seules les colonnes utilisées par les graphiques sont lues
+    df = charger_historique_partitions(
+        colonnes=['niveau_scolaire', 'moyenne_t1', 'moyenne_t2', 'avis_conseil', 'absences_t2', 'risque_decrochage'],
+        ecoles=ecoles, annee=annee
+    )
+    if df.empty:
+        return None
+    
+    # Préparer colonnes numériques pour les calculs/graphes
+    df['risque_decrochage'] = pd.to_numeric(df['Risque Décrochage'], errors='coerce')
+    risk_by_level = df.groupby('Niveau')['risque_decrochage'].mean()
+    return {
+        'par_niveau': px.bar(risk_by_level, title='Risque moyen par niveau'),
+        'moyennes': px.scatter(df, x='Moyenne T1', y='Moyenne T2', color='risque_decrochage',
+                               title="Évolution des moyennes", trendline=trend),
+        'avis': px.box(df, x='Avis Conseil', y='risque_decrochage', title="Risque selon l'avis du conseil"),
+        'absences': px.scatter(df, x='Absences T2', y='risque_decrochage',
+                               title="Impact des absences sur le risque", trendline=trend),
+    }
+
+@st.cache_resource
+def tendance_disponible():
+    try:
+        import statsmodels.api as sm  # noqa: F401
+        return True
+    except Exception:
+        return False
+
+@instrumentation.chronometre('page.statistiques')
 def statistics_page():
     st.title("📈 Statistiques")
     
-    session = get_session()
-    eleves = session.query(Eleve).all()
+    annee = selection_annee("annee_statistiques")
+    trend = "ols" if tendance_disponible() else None
+    ecoles = ecoles_utilisateur()
+    figures = donnees_page('statistiques', lambda: calculer_statistiques(ecoles, annee, trend), annee=annee, trend=trend)
     
-    if eleves:
-        df = pd.DataFrame([eleve.to_dict() for eleve in eleves])
-        
-        # Préparer colonnes numériques pour les calculs/graphes
-        if 'risque_decrochage' not in df.columns and 'Risque Décrochage' in df.columns:
-            try:
-                df['risque_decrochage'] = (
-                    df['Risque Décrochage']
-                    .astype(str)
-                    .str.replace('%', '', regex=False)
-                    .str.replace(',', '.', regex=False)
-                    .astype(float) / 100.0
-                )
-            except Exception:
-                df['risque_decrochage'] = pd.NA
-        
+    if figures:
         # Statistiques générales
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("Risque moyen par niveau scolaire")
-            risk_by_level = df.groupby('Niveau')['risque_decrochage'].mean()
-            fig = px.bar(risk_by_level, 
-                        title='Risque moyen par niveau')
-            st.plotly_chart(fig)
+            st.plotly_chart(figures['par_niveau'])
         
         with col2:
             st.subheader("Évolution des moyennes")
-            try:
-                import statsmodels.api as sm  # noqa: F401
-                trend = "ols"
-            except Exception:
-                trend = None
+            if trend is None:
                 st.info("Droite de tendance désactivée (package 'statsmodels' non installé). Pour l'activer: python -m pip install statsmodels")
-            fig = px.scatter(
-                df,
-                x='Moyenne T1',
-                y='Moyenne T2',
-                color='risque_decrochage',
-                title="Évolution des moyennes",
-                trendline=trend
-            )
-            st.plotly_chart(fig)
+            st.plotly_chart(figures['moyennes'])
         
         # Analyses supplémentaires
         st.subheader("Analyse des facteurs de risque")
@@ -351,39 +674,232 @@ def statistics_page():
         col1, col2 = st.columns(2)
         
         with col1:
-            fig = px.box(df, 
-                        x='Avis Conseil', 
-                        y='risque_decrochage',
-                        title="Risque selon l'avis du conseil")
-            st.plotly_chart(fig)
+            st.plotly_chart(figures['avis'])
         
         with col2:
-            try:
-                import statsmodels.api as sm  # noqa: F401
-                trend = "ols"
-            except Exception:
-                trend = None
+            if trend is None:
                 st.info("Droite de tendance désactivée (package 'statsmodels' non installé). Pour l'activer: python -m pip install statsmodels")
-            fig = px.scatter(
-                df,
-                x='Absences T2',
-                y='risque_decrochage',
-                title="Impact des absences sur le risque",
-                trendline=trend
-            )
-            st.plotly_chart(fig)
+            st.plotly_chart(figures['absences'])
     
     else:
         st.info("Aucune donnée disponible pour les statistiques.")
 
+CHAMPS_COHORTE = ['age', 'sexe', 'niveau_scolaire', 'redoublement', 'statut_bourse', 'moyenne_t1', 'moyenne_t2',
+                  'nb_matieres_echec', 'absences_t1', 'absences_t2', 'retards', 'sanctions', 'avis_conseil']
+
+def charger_cohorte(ecoles, annee):
+    # Élèves enregistrés, avec les champs d'entrée du modèle sous leurs noms de l'application
+    df = charger_historique_partitions(colonnes=CHAMPS_COHORTE, ecoles=ecoles, annee=annee)
+    df.columns = CHAMPS_COHORTE
+    return df.rename(columns={'niveau_scolaire': 'niveau'})
+
+@instrumentation.chronometre('page.simulation')
+def simulation_page():
+    st.title("🔮 Simulation")
+    st.caption("Effet d'une évolution des indicateurs sur le nombre d'élèves à risque élevé, par niveau.")
+
+    if service is None:
+        st.error("Le modèle n'est pas chargé. Impossible de simuler pour le moment.")
+        return
+
+    annee = selection_annee("annee_simulation")
+    ecoles = ecoles_utilisateur()
+    cohorte = donnees_page('cohorte', lambda: charger_cohorte(ecoles, annee), annee=annee)
+    if cohorte.empty:
+        st.info("Aucun élève enregistré pour cette sélection.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        niveaux = st.multiselect("Niveaux concernés (tous si vide)", sorted(cohorte['niveau'].unique()))
+    with col2:
+        champ = st.selectbox("Indicateur", CHAMPS_SIMULABLES)
+    with col3:
+        if champ == 'avis_conseil':
+            valeurs = [st.selectbox("Nouvel avis", AVIS_CONSEIL)]
+            operation = 'fixer'
+        elif champ in BOOLEENS_SIMULATION:
+            valeurs = [st.selectbox("Nouvelle valeur", [False, True], format_func=lambda v: "Oui" if v else "Non")]
+            operation = 'fixer'
+        else:
+            operation = st.selectbox("Opération", OPERATIONS_SIMULATION)
+            saisie = st.text_input("Valeurs (une par scénario, séparées par des virgules)", "-1, -3, -5")
+
+    if st.button("Simuler"):
+        if champ not in BOOLEENS_SIMULATION and champ != 'avis_conseil':
+            try:
+                valeurs = [float(v) for v in saisie.split(',') if v.strip()]
+            except ValueError:
+                st.error("Valeurs numériques attendues, séparées par des virgules.")
+                return
+        # Tous les scénarios sont scorés ensemble, en un seul appel au modèle
+        scenarios = [scenario(f"{champ} {operation} {v}", [(champ, operation, v)], niveaux or None) for v in valeurs]
+        try:
+            rapport = Simulateur(service.predicteur_live(), cohorte).simuler(scenarios)
+        except DonneesInvalides as e:
+            st.error(f"Cohorte invalide : {e}")
+            return
+
+        st.dataframe(rapport.rename(columns={
+            'scenario': 'Scénario', 'niveau': 'Niveau', 'effectif': 'Effectif',
+            'risque_moyen_base': 'Risque moyen (actuel)', 'risque_moyen': 'Risque moyen (simulé)',
+            'a_risque_base': 'Risque élevé (actuel)', 'a_risque': 'Risque élevé (simulé)',
+            'variation_a_risque': 'Variation risque élevé', 'variation_risque_moyen': 'Variation risque moyen'
+        }), use_container_width=True)
+        fig = px.bar(rapport, x='scenario', y='variation_a_risque', color='niveau', barmode='group',
+                     title="Variation du nombre d'élèves à risque élevé",
+                     labels={'scenario': 'Scénario', 'variation_a_risque': 'Variation', 'niveau': 'Niveau'})
+        st.plotly_chart(fig)
+
+def performance_page():
+    st.title("⏱️ Performances")
+
+    if st.session_state.get('role') != 'admin':
+        st.error("Accès réservé aux administrateurs.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        actif = st.toggle("Instrumentation active", value=instrumentation.actif)
+    with col2:
+        taux = st.slider("Taux d'échantillonnage", min_value=0.01, max_value=1.0,
+                         value=float(instrumentation.taux_echantillonnage), step=0.01)
+    instrumentation.configurer(actif=actif, taux_echantillonnage=taux)
+
+    resume = instrumentation.resume()
+    if resume:
+        df = pd.DataFrame(resume).rename(columns={
+            'operation': 'Opération', 'appels': 'Appels', 'total_s': 'Total (s)',
+            'p50_ms': 'p50 (ms)', 'p95_ms': 'p95 (ms)', 'max_ms': 'Max (ms)'
+        })
+        st.dataframe(df.sort_values('p95 (ms)', ascending=False), use_container_width=True)
+    else:
+        st.info("Aucune mesure pour le moment. Activez l'instrumentation puis naviguez dans l'application.")
+
+    compteurs = instrumentation.compteurs()
+    if compteurs:
+        st.subheader("Compteurs")
+        st.json(compteurs)
+
+    # Cache des pages partagé entre les sessions
+    stats_cache = cache_pages.statistiques()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Cache des pages", f"{stats_cache['entrees']} entrées",
+                  help=f"{stats_cache['octets'] / 2**20:.1f} Mo sur {stats_cache['max_octets'] / 2**20:.0f} Mo")
+    with col2:
+        if st.button("Vider le cache des pages"):
+            cache_pages.vider()
+            st.rerun()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Exporter (Prometheus)", instrumentation.exporter_prometheus(),
+                           file_name="elite_metrics.prom", mime="text/plain")
+    with col2:
+        if st.button("Ajouter au journal JSON"):
+            chemin = instrumentation.exporter_json()
+            st.success(f"Instantané ajouté à {chemin}")
+    with col3:
+        if st.button("Réinitialiser les mesures"):
+            instrumentation.reinitialiser()
+            st.rerun()
+
+    # Profilage ponctuel du prochain affichage
+    st.subheader("Profilage")
+    col1, col2 = st.columns(2)
+    with col1:
+        mode = st.selectbox("Mode", MODES_PROFILAGE,
+                            format_func=lambda m: "cProfile" if m == 'cprofile' else "Échantillonnage de pile")
+    with col2:
+        st.write("")
+        if st.button("Profiler le prochain affichage"):
+            st.session_state['profilage_demande'] = mode
+            st.info("Ouvrez la page à analyser: son rendu complet sera profilé une fois.")
+
+    if 'dernier_profil' in st.session_state:
+        afficher_resume_profil(st.session_state['dernier_profil'])
+
+def models_page():
+    st.title("🧪 Modèles")
+
+    if st.session_state.get('role') != 'admin':
+        st.error("Accès réservé aux administrateurs.")
+        return
+    if service is None:
+        st.error("Le registre des modèles n'est pas disponible.")
+        return
+
+    registre = service.registre
+    manifeste = registre.manifeste()
+    versions = pd.DataFrame.from_dict(manifeste['versions'], orient='index')
+    versions.index.name = 'Version'
+    st.dataframe(versions, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("En production", manifeste['live'] or "-")
+    with col2:
+        st.metric("Candidat", manifeste['candidat'] or "-")
+
+    # Chaque action réécrit le manifeste: effet immédiat, sans redémarrage
+    if manifeste['candidat']:
+        col1, col2 = st.columns(2)
+        with col1:
+            ombre = st.toggle("Scoring en ombre", value=manifeste['ombre'])
+        with col2:
+            pourcentage = st.slider("Élèves servis par le candidat (%)", 0, 100, value=manifeste['pourcentage'])
+        if ombre != manifeste['ombre'] or pourcentage != manifeste['pourcentage']:
+            registre.definir_deploiement(pourcentage=pourcentage, ombre=ombre)
+            st.rerun()
+
+        if st.button("Comparer sur le journal d'ombre"):
+            service.vider()
+            comparaison = comparer_ombre(service.journal_ombre, manifeste['candidat'], seuil=SEUIL_RISQUE)
+            if comparaison:
+                st.json(comparaison)
+            else:
+                st.info("Aucune comparaison enregistrée pour ce candidat.")
+        if st.button("Promouvoir le candidat"):
+            registre.promouvoir()
+            st.rerun()
+
+    if manifeste['precedents'] and st.button(f"Revenir à {manifeste['precedents'][-1]}"):
+        registre.retour_arriere()
+        st.rerun()
+
+    # Dérive des entrées et du risque prédit par rapport à la référence d'entraînement
+    st.subheader("Dérive")
+    moniteur = moniteur_derive()
+    if moniteur is None:
+        st.info("Aucune référence de dérive pour cette version (python -m src.monitoring.derive reference).")
+    else:
+        afficher_alertes_derive()
+        derives = pd.DataFrame(moniteur.derives()).rename(columns={
+            'champ': 'Champ', 'n': 'Observations', 'psi': 'PSI', 'ks': 'KS',
+            'moyenne_reference': 'Moyenne (référence)', 'moyenne': 'Moyenne (production)'
+        })
+        st.dataframe(derives, use_container_width=True)
+
+def afficher_resume_profil(infos):
+    st.caption(f"Profil « {infos['label']} » ({infos['mode']}, {infos['duree']:.2f} s) enregistré dans {infos['chemin']}")
+    if infos['resume']:
+        st.dataframe(pd.DataFrame(infos['resume']), use_container_width=True)
+
 # Page principale
 def main_page():
+    pages = ["Tableau de bord", "Nouvelle Prédiction", "Conseil de classe", "Historique", "Statistiques", "Simulation"]
+    icons = ['house', 'person-plus', 'people', 'clock-history', 'graph-up', 'sliders']
+    if st.session_state.get('role') == 'admin':
+        pages += ["Performances", "Modèles"]
+        icons += ['speedometer2', 'diagram-3']
+
     # Menu latéral
     with st.sidebar:
         selected = option_menu(
             "Menu Principal",
-            ["Tableau de bord", "Nouvelle Prédiction", "Historique", "Statistiques"],
-            icons=['house', 'person-plus', 'clock-history', 'graph-up'],
+            pages,
+            icons=icons,
             menu_icon="cast"
         )
         
@@ -393,14 +909,41 @@ def main_page():
         display_dashboard()
     elif selected == "Nouvelle Prédiction":
         new_prediction_page()
+    elif selected == "Conseil de classe":
+        class_council_page()
     elif selected == "Historique":
         history_page()
     elif selected == "Statistiques":
         statistics_page()
+    elif selected == "Simulation":
+        simulation_page()
+    elif selected == "Performances":
+        performance_page()
+    elif selected == "Modèles":
+        models_page()
 
 # Point d'entrée de l'application
 if __name__ == "__main__":
-    if 'logged_in' not in st.session_state:
+    # Le jeton signé est vérifié en mémoire: aucune requête sur la table users par réexécution
+    identite = session_valide(st.session_state.get('jeton'))
+    if 'logged_in' in st.session_state and identite is None:
+        # Jeton expiré ou compte modifié: retour à l'écran de connexion
+        st.session_state.clear()
+    if identite is None:
         login_page()
     else:
-        main_page()
\ No newline at end of file
+        st.session_state['username'], st.session_state['role'], st.session_state['ecole'] = identite
+        # Profilage du rendu complet: demandé par un admin (une fois) ou par ELITE_PROFILAGE
+        mode_profilage = st.session_state.pop('profilage_demande', None) or mode_environnement()
+        if mode_profilage:
+            capture = None
+            try:
+                with profileur.capturer("rendu", mode=mode_profilage) as capture:
+                    main_page()
+            finally:
+                if capture is not None:
+                    st.session_state['dernier_profil'] = capture.infos()
+            with st.expander("Profil de ce rendu"):
+                afficher_resume_profil(st.session_state['dernier_profil'])
+        else:
+            main_page()
\ No newline at end of file
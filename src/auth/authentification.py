@@ -0,0 +1,328 @@
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import warnings
+import threading
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from src.database.models import User, get_session
+
+# Paramètres scrypt (coût mémoire ~16 Mo par vérification)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PREFIXE_SCRYPT = 'scrypt'
+
+# Durée de validité des jetons de session
+DUREE_JETON = 8 * 3600
+
+# Limitation des tentatives de connexion
+MAX_ECHECS_PAR_UTILISATEUR = 5
+FENETRE_ECHECS = 300            # secondes
+MAX_CONNEXIONS_PAR_SECONDE = 10  # toutes connexions confondues
+MAX_NOMS_SUIVIS = 10000          # noms d'utilisateur dont les échecs sont retenus
+
+# Relecture périodique de la table users (modifications faites par un autre processus ou le CLI)
+ENV_RAFRAICHISSEMENT_UTILISATEURS = 'ELITE_UTILISATEURS_RAFRAICHISSEMENT'
+RAFRAICHISSEMENT_UTILISATEURS = 30  # secondes
+
+# Clé de signature des jetons: fixée par l'environnement pour la partager entre processus
+ENV_CLE_SECRETE = 'ELITE_SECRET_KEY'
+_CLE_SECRETE = os.environ.get(ENV_CLE_SECRETE, '').encode()
+if not _CLE_SECRETE:
+    # Clé propre au processus: les jetons ne sont pas reconnus par les autres processus ni après un redémarrage
+    warnings.warn(f"{ENV_CLE_SECRETE} non définie: clé de signature aléatoire propre à ce processus")
+    _CLE_SECRETE = secrets.token_bytes(32)
+
+
+class TropDeTentatives(Exception):
+    """
+    Levée quand les tentatives de connexion dépassent les limites autorisées
+    """
+
+
+def hacher_mot_de_passe(mot_de_passe):
+    """
+    Retourne l'empreinte salée 'scrypt$n$r$p$sel$empreinte' du mot de passe
+    """
+    sel = secrets.token_bytes(16)
+    empreinte = hashlib.scrypt(mot_de_passe.encode(), salt=sel, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return f"{PREFIXE_SCRYPT}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${sel.hex()}${empreinte.hex()}"
+
+
+def est_hache(valeur):
+    return valeur.startswith(PREFIXE_SCRYPT + '$')
+
+
+def verifier_mot_de_passe(mot_de_passe, stocke):
+    """
+    Compare un mot de passe à sa valeur stockée (empreinte scrypt, ou texte clair historique)
+    """
+    if not est_hache(stocke):
+        return hmac.compare_digest(mot_de_passe.encode(), stocke.encode())
+    _, n, r, p, sel, empreinte = stocke.split('$')
+    calcul = hashlib.scrypt(mot_de_passe.encode(), salt=bytes.fromhex(sel), n=int(n), r=int(r), p=int(p))
+    return hmac.compare_digest(calcul.hex(), empreinte)
+
+
+class CacheUtilisateurs:
+    def __init__(self, intervalle=None):
+        """
+        Copie en mémoire de la table users (nom -> rôle, empreinte, école), chargée à la demande
+        et relue toutes les `intervalle` secondes: les comptes créés ou modifiés par un autre
+        processus (CLI init_db, autre worker) sont pris en compte sans redémarrage
+        """
+        if intervalle is None:
+            intervalle = float(os.environ.get(ENV_RAFRAICHISSEMENT_UTILISATEURS, RAFRAICHISSEMENT_UTILISATEURS))
+        self.intervalle = intervalle
+        self._verrou = threading.Lock()
+        self._utilisateurs = None
+        self._charge_le = 0.0
+
+    def _charger(self):
+        session = get_session()
+        try:
+            return {u.username: (u.role, u.password, u.ecole) for u in session.query(User).all()}
+        finally:
+            session.close()
+
+    def _perime(self):
+        return self._utilisateurs is None or time.monotonic() - self._charge_le > self.intervalle
+
+    def actualiser(self):
+        """
+        Relit la table si la copie a dépassé l'intervalle (un simple test d'horloge sinon).
+        Les vérifications de jetons en cache sont alors oubliées: un mot de passe changé
+        ailleurs révoque les jetons de ce processus au plus tard après l'intervalle.
+        """
+        if not self._perime():
+            return self._utilisateurs
+        with self._verrou:
+            if self._perime():
+                self._utilisateurs = self._charger()
+                self._charge_le = time.monotonic()
+                verifier_jeton.cache_clear()
+            return self._utilisateurs
+
+    def obtenir(self, username):
+        return self.actualiser().get(username)
+
+    def invalider(self):
+        """
+        À appeler après toute création/modification d'utilisateur
+        """
+        with self._verrou:
+            self._utilisateurs = None
+        verifier_jeton.cache_clear()
+
+
+class LimiteurTentatives:
+    def __init__(self, max_echecs=MAX_ECHECS_PAR_UTILISATEUR, fenetre=FENETRE_ECHECS,
+                 max_par_seconde=MAX_CONNEXIONS_PAR_SECONDE, max_noms=MAX_NOMS_SUIVIS):
+        """
+        Limite les échecs par utilisateur et le débit global de vérifications scrypt.
+        Les échecs sont rangés du plus ancien au plus récent: les noms expirés sont retirés
+        au fil de l'eau et au plus `max_noms` noms sont suivis (mémoire bornée même si
+        des noms d'utilisateur aléatoires sont essayés)
+        """
+        self.max_echecs = max_echecs
+        self.fenetre = fenetre
+        self.max_par_seconde = max_par_seconde
+        self.max_noms = max_noms
+        self._verrou = threading.Lock()
+        self._echecs = OrderedDict()   # nom -> dates des échecs, ordre du dernier échec
+        self._tentatives = deque()
+
+    def _purger(self, maintenant):
+        # Noms dont le dernier échec est sorti de la fenêtre (en tête de l'ordre)
+        while self._echecs and maintenant - next(iter(self._echecs.values()))[-1] > self.fenetre:
+            self._echecs.popitem(last=False)
+
+    def verifier(self, username):
+        maintenant = time.monotonic()
+        with self._verrou:
+            while self._tentatives and maintenant - self._tentatives[0] > 1.0:
+                self._tentatives.popleft()
+            if len(self._tentatives) >= self.max_par_seconde:
+                raise TropDeTentatives("Trop de connexions simultanées, réessayez dans un instant.")
+
+            self._purger(maintenant)
+            echecs = self._echecs.get(username)
+            if echecs:
+                while echecs and maintenant - echecs[0] > self.fenetre:
+                    echecs.popleft()
+                if not echecs:
+                    del self._echecs[username]
+                elif len(echecs) >= self.max_echecs:
+                    raise TropDeTentatives("Trop de tentatives échouées pour cet utilisateur, réessayez plus tard.")
+
+            self._tentatives.append(maintenant)
+
+    def echec(self, username):
+        maintenant = time.monotonic()
+        with self._verrou:
+            echecs = self._echecs.pop(username, None) or deque(maxlen=self.max_echecs)
+            echecs.append(maintenant)
+            self._echecs[username] = echecs
+            self._purger(maintenant)
+            # Au-delà du plafond, les noms aux échecs les plus anciens sont oubliés
+            # (le débit global borne le nombre de noms essayés pendant une fenêtre)
+            while len(self._echecs) > self.max_noms:
+                self._echecs.popitem(last=False)
+
+    def succes(self, username):
+        with self._verrou:
+            self._echecs.pop(username, None)
+
+
+cache_utilisateurs = CacheUtilisateurs()
+limiteur = LimiteurTentatives()
+
+
+def _mettre_a_jour_empreinte(username, mot_de_passe):
+    """
+    Remplace un mot de passe stocké en clair par son empreinte scrypt
+    """
+    session = get_session()
+    try:
+        user = session.query(User).filter_by(username=username).first()
+        if user is not None:
+            user.password = hacher_mot_de_passe(mot_de_passe)
+            session.commit()
+    finally:
+        session.close()
+    cache_utilisateurs.invalider()
+
+
+def authentifier(username, mot_de_passe):
+    """
+    Vérifie les identifiants et retourne le rôle, ou None.
+    Lève TropDeTentatives si les limites de connexion sont atteintes.
+    """
+    limiteur.verifier(username)
+    utilisateur = cache_utilisateurs.obtenir(username)
+    if utilisateur is None:
+        # Coût comparable à un vrai compte pour ne pas révéler les noms existants
+        verifier_mot_de_passe(mot_de_passe, _EMPREINTE_FACTICE)
+        limiteur.echec(username)
+        return None
+
+    role, stocke, _ = utilisateur
+    if not verifier_mot_de_passe(mot_de_passe, stocke):
+        limiteur.echec(username)
+        return None
+
+    limiteur.succes(username)
+    if not est_hache(stocke):
+        _mettre_a_jour_empreinte(username, mot_de_passe)
+    return role
+
+
+def _b64(donnees):
+    return base64.urlsafe_b64encode(donnees).rstrip(b'=').decode()
+
+
+def _signature(charge):
+    return _b64(hmac.new(_CLE_SECRETE, charge.encode(), hashlib.sha256).digest())
+
+
+def _version_mot_de_passe(stocke):
+    """
+    Empreinte courte du mot de passe stocké, portée par le jeton: un changement de mot de passe révoque les jetons
+    """
+    return _signature('mdp:' + stocke)[:16]
+
+
+def ecole_utilisateur(username):
+    """
+    École de rattachement de l'utilisateur (None = toutes les écoles)
+    """
+    utilisateur = cache_utilisateurs.obtenir(username)
+    return utilisateur[2] if utilisateur else None
+
+
+def emettre_jeton(username, role, ecole=None, duree=DUREE_JETON):
+    """
+    Émet un jeton de session signé (HMAC-SHA256) portant l'utilisateur, le rôle, l'école,
+    la version du mot de passe et l'expiration
+    """
+    utilisateur = cache_utilisateurs.obtenir(username)
+    version = _version_mot_de_passe(utilisateur[1]) if utilisateur else None
+    charge = _b64(json.dumps({'u': username, 'r': role, 'e': ecole, 'p': version,
+                              'exp': int(time.time()) + duree}).encode())
+    return f"{charge}.{_signature(charge)}"
+
+
+@lru_cache(maxsize=1024)
+def _decoder_jeton(jeton):
+    try:
+        charge, signature = jeton.split('.')
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _signature(charge)):
+        return None
+    return json.loads(base64.urlsafe_b64decode(charge + '=' * (-len(charge) % 4)))
+
+
+@lru_cache(maxsize=1024)
+def verifier_jeton(jeton):
+    """
+    Retourne (username, rôle, école, expiration) si le jeton est valide et l'utilisateur inchangé
+    (rôle, école et mot de passe), sinon None.
+    Le résultat est mis en cache: les réexécutions de page ne recalculent pas la signature.
+    CacheUtilisateurs.invalider vide ce cache après toute modification d'utilisateur.
+    """
+    contenu = _decoder_jeton(jeton)
+    if contenu is None:
+        return None
+    utilisateur = cache_utilisateurs.obtenir(contenu['u'])
+    if utilisateur is None or utilisateur[0] != contenu['r'] or utilisateur[2] != contenu.get('e'):
+        return None
+    if not hmac.compare_digest(str(contenu.get('p')), _version_mot_de_passe(utilisateur[1])):
+        return None
+    return contenu['u'], contenu['r'], contenu.get('e'), contenu['exp']
+
+
+def session_valide(jeton):
+    """
+    Vérifie un jeton de session (sans accès base ni hachage après la première vérification)
+    """
+    if not jeton:
+        return None
+    cache_utilisateurs.actualiser()
+    resultat = verifier_jeton(jeton)
+    if resultat is None or resultat[3] < time.time():
+        return None
+    return resultat[:3]
+
+
+def creer_utilisateur(session, username, mot_de_passe, role, ecole=None):
+    """
+    Ajoute un utilisateur avec un mot de passe haché (commit à la charge de l'appelant)
+    """
+    user = User(username=username, password=hacher_mot_de_passe(mot_de_passe), role=role, ecole=ecole)
+    session.add(user)
+    cache_utilisateurs.invalider()
+    return user
+
+
+def migrer_mots_de_passe(session):
+    """
+    Hache les mots de passe encore stockés en clair. Retourne le nombre de comptes migrés.
+    """
+    n = 0
+    for user in session.query(User).all():
+        if not est_hache(user.password):
+            user.password = hacher_mot_de_passe(user.password)
+            n += 1
+    session.commit()
+    cache_utilisateurs.invalider()
+    return n
+
+
+_EMPREINTE_FACTICE = hacher_mot_de_passe(secrets.token_hex(8))
@@ -0,0 +1,200 @@
+import os
+import sys
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+# Ajouter le répertoire racine au PYTHONPATH (exécution en ligne de commande)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.database.models import Eleve, Session, routeur
+# Hooks de commit du cache des pages: l'archivage réécrit le marqueur lu par l'application
+import src.database.cache  # noqa: F401
+
+# Répertoire des archives Parquet, partitionnées par année scolaire puis par niveau
+ENV_REPERTOIRE_ARCHIVES = 'ELITE_REPERTOIRE_ARCHIVES'
+TAILLE_LOT = 5000
+
+
+def repertoire_archives():
+    return Path(os.environ.get(ENV_REPERTOIRE_ARCHIVES, 'archives'))
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("L'archivage nécessite pyarrow: python -m pip install pyarrow") from e
+    return pyarrow
+
+
+def _schema(pa):
+    """
+    Schéma des fichiers d'archive (les colonnes de partition sont portées par les répertoires)
+    """
+    types = {
+        Eleve.id_eleve: pa.string(), Eleve.ecole: pa.string(), Eleve.date_prediction: pa.date32(),
+        Eleve.age: pa.int64(), Eleve.sexe: pa.string(), Eleve.redoublement: pa.bool_(),
+        Eleve.statut_bourse: pa.bool_(), Eleve.moyenne_t1: pa.float64(), Eleve.moyenne_t2: pa.float64(),
+        Eleve.nb_matieres_echec: pa.int64(), Eleve.absences_t1: pa.int64(), Eleve.absences_t2: pa.int64(),
+        Eleve.retards: pa.int64(), Eleve.sanctions: pa.int64(), Eleve.avis_conseil: pa.string(),
+        Eleve.risque_decrochage: pa.float64(),
+    }
+    return pa.schema([(colonne.key, type_) for colonne, type_ in types.items()])
+
+
+def _partitionnement(pa):
+    return pa.dataset.partitioning(
+        pa.schema([('annee_scolaire', pa.string()), ('niveau_scolaire', pa.string())]), flavor='hive'
+    )
+
+
+def annees_archivees():
+    """
+    Années scolaires présentes dans les archives
+    """
+    racine = repertoire_archives()
+    if not racine.exists():
+        return []
+    return sorted(unquote(chemin.name.split('=', 1)[1]) for chemin in racine.glob('annee_scolaire=*') if chemin.is_dir())
+
+
+def archiver_annee(annee, compression='zstd', taille_lot=TAILLE_LOT):
+    """
+    Déplace les élèves d'une année scolaire close de SQLite vers des fichiers Parquet
+    compressés (un répertoire par année puis par niveau). Retourne le nombre de lignes archivées.
+    """
+    pa = _pyarrow()
+    annee = str(annee)
+    schema = _schema(pa)
+    colonnes = [Eleve.niveau_scolaire, Eleve.id] + [getattr(Eleve, nom) for nom in schema.names]
+    racine = repertoire_archives()
+    suffixe = datetime.now().strftime('%Y%m%d%H%M%S')
+    total = 0
+
+    for cle in routeur.cles(annee=annee):
+        session = Session(bind=routeur.engine(cle))
+        ecrivains = {}
+        try:
+            query = (session.query(*colonnes)
+                     .filter(Eleve.annee_scolaire == annee)
+                     .order_by(Eleve.niveau_scolaire, Eleve.id)
+                     .execution_options(stream_results=True)
+                     .yield_per(taille_lot))
+
+            # Lignes regroupées par niveau et écrites par lots au fil de l'eau
+            lots = defaultdict(list)
+            n = 0
+            id_max = None
+            for ligne in query:
+                niveau, id_ligne = ligne[0], ligne[1]
+                lots[niveau].append(ligne[2:])
+                n += 1
+                id_max = id_ligne if id_max is None else max(id_max, id_ligne)
+                if len(lots[niveau]) >= taille_lot:
+                    _ecrire_lot(pa, schema, racine, annee, niveau, lots.pop(niveau), ecrivains, cle, suffixe, compression)
+            for niveau, lignes in lots.items():
+                _ecrire_lot(pa, schema, racine, annee, niveau, lignes, ecrivains, cle, suffixe, compression)
+            for ecrivain, _ in ecrivains.values():
+                ecrivain.close()
+
+            # Suppression dans SQLite seulement une fois les fichiers écrits et fermés
+            if n:
+                supprimes = (session.query(Eleve)
+                             .filter(Eleve.annee_scolaire == annee, Eleve.id <= id_max)
+                             .delete(synchronize_session=False))
+                if supprimes != n:
+                    raise RuntimeError(f"Partition {cle}: {supprimes} lignes à supprimer pour {n} archivées")
+                session.commit()
+        except Exception:
+            session.rollback()
+            for ecrivain, chemin in ecrivains.values():
+                ecrivain.close()
+                chemin.unlink(missing_ok=True)
+            raise
+        finally:
+            session.close()
+        total += n
+
+    return total
+
+
+def _ecrire_lot(pa, schema, racine, annee, niveau, lignes, ecrivains, cle, suffixe, compression):
+    if niveau not in ecrivains:
+        dossier = racine / f"annee_scolaire={quote(annee, safe='')}" / f"niveau_scolaire={quote(niveau, safe='')}"
+        dossier.mkdir(parents=True, exist_ok=True)
+        chemin = dossier / f"part-{quote(cle or 'principale', safe='')}-{suffixe}.parquet"
+        ecrivains[niveau] = (pa.parquet.ParquetWriter(str(chemin), schema, compression=compression), chemin)
+    colonnes = list(zip(*lignes))
+    table = pa.Table.from_arrays([pa.array(valeurs, type=champ.type) for valeurs, champ in zip(colonnes, schema)],
+                                 schema=schema)
+    ecrivains[niveau][0].write_table(table)
+
+
+def _expression(pa, niveaux=None, date_debut=None, date_fin=None, annee=None, ecoles=None):
+    """
+    Filtres de l'historique traduits en expression pyarrow (élagage des partitions
+    et des groupes de lignes grâce aux statistiques Parquet)
+    """
+    champ = pa.dataset.field
+    conditions = []
+    if annee:
+        conditions.append(champ('annee_scolaire') == str(annee))
+    if niveaux:
+        conditions.append(champ('niveau_scolaire').isin(list(niveaux)))
+    if ecoles:
+        conditions.append(champ('ecole').isin(list(ecoles)))
+    if date_debut is not None:
+        conditions.append(champ('date_prediction') >= pa.scalar(date_debut, type=pa.date32()))
+    if date_fin is not None:
+        conditions.append(champ('date_prediction') <= pa.scalar(date_fin, type=pa.date32()))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _dataset(pa):
+    return pa.dataset.dataset(str(repertoire_archives()), format='parquet', partitioning=_partitionnement(pa))
+
+
+def lire_archives(colonnes, **filtres):
+    """
+    Lit les archives filtrées en ne chargeant que les colonnes demandées (attributs de Eleve)
+    """
+    pa = _pyarrow()
+    table = _dataset(pa).to_table(columns=list(colonnes), filter=_expression(pa, **filtres))
+    return table.to_pandas()
+
+
+def iter_archives(colonnes, taille_lot=TAILLE_LOT, **filtres):
+    """
+    Parcourt les archives filtrées par lots de lignes (tuples), pour l'export en flux
+    """
+    pa = _pyarrow()
+    for lot in _dataset(pa).to_batches(columns=list(colonnes), filter=_expression(pa, **filtres),
+                                       batch_size=taille_lot):
+        yield from zip(*[lot.column(i).to_pylist() for i in range(lot.num_columns)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivage des années scolaires closes en Parquet")
+    parser.add_argument('annee', nargs='*', help="Année(s) scolaire(s) à archiver")
+    parser.add_argument('--compression', default='zstd', choices=['zstd', 'snappy', 'gzip', 'brotli'])
+    parser.add_argument('--lister', action='store_true', help="Lister les années déjà archivées")
+    args = parser.parse_args()
+
+    if args.lister or not args.annee:
+        print("Années archivées:", ', '.join(annees_archivees()) or 'aucune')
+        return
+    for annee in args.annee:
+        n = archiver_annee(annee, compression=args.compression)
+        print(f"{n} élèves de l'année {annee} archivés dans {repertoire_archives()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import os
+import time
+import pickle
+import secrets
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import quote
+
+from sqlalchemy import event
+
+from src.database.models import Eleve, Session
+from src.monitoring.instrumentation import instrumentation
+
+# Budget mémoire du cache des pages (en Mo)
+ENV_TAILLE_CACHE = 'ELITE_CACHE_PAGES_MO'
+TAILLE_PAR_DEFAUT_MO = 256
+
+# Durée de vie maximale d'une entrée (en secondes), optionnelle: 0 = illimitée
+ENV_TTL_CACHE = 'ELITE_CACHE_PAGES_TTL'
+TTL_PAR_DEFAUT = 0
+
+# Marqueurs de modification partagés entre processus (un fichier par école)
+ENV_REPERTOIRE_MARQUEURS = 'ELITE_CACHE_PAGES_MARQUEURS'
+
+# Dépendance d'une entrée calculée sur toutes les écoles (vue district)
+TOUTES_ECOLES = '*'
+
+# Marqueurs communs: vue district (réécrit à chaque commit) et invalidation totale (archivage)
+MARQUEUR_DISTRICT = 'district'
+MARQUEUR_TOUT = 'tout'
+
+
+def repertoire_marqueurs():
+    return Path(os.environ.get(ENV_REPERTOIRE_MARQUEURS, 'cache_marqueurs'))
+
+
+def _chemin_marqueur(nom):
+    return repertoire_marqueurs() / f"{nom}.marqueur"
+
+
+def _marqueur_ecole(ecole):
+    return f"ecole_{quote(str(ecole), safe='')}"
+
+
+def _lire_marqueur(nom):
+    try:
+        with open(_chemin_marqueur(nom), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def signaler_modification(ecoles):
+    """
+    Réécrit les marqueurs des écoles modifiées et celui de la vue district (TOUTES_ECOLES:
+    marqueur d'invalidation totale). Les autres processus voient le changement à leur
+    prochaine lecture du cache, sans que les autres écoles soient touchées.
+    """
+    if TOUTES_ECOLES in ecoles:
+        noms = {MARQUEUR_TOUT}
+    else:
+        noms = {_marqueur_ecole(ecole) for ecole in ecoles} | {MARQUEUR_DISTRICT}
+    repertoire_marqueurs().mkdir(parents=True, exist_ok=True)
+    contenu = secrets.token_bytes(16)
+    for nom in noms:
+        chemin = _chemin_marqueur(nom)
+        # Écriture atomique: un lecteur voit l'ancien ou le nouveau contenu
+        temporaire = chemin.with_name(f"{chemin.name}.{secrets.token_hex(4)}.tmp")
+        temporaire.write_bytes(contenu)
+        os.replace(temporaire, chemin)
+
+
+def signature_marqueurs(ecoles):
+    """
+    Contenu des marqueurs dont dépend une entrée: ceux de ses écoles (ou de la vue
+    district) et celui d'invalidation totale
+    """
+    noms = [_marqueur_ecole(ecole) for ecole in ecoles] if ecoles else [MARQUEUR_DISTRICT]
+    return tuple(_lire_marqueur(nom) for nom in noms + [MARQUEUR_TOUT])
+
+
+def _taille(valeur):
+    """
+    Estimation de l'empreinte mémoire d'une valeur mise en cache (octets)
+    """
+    if hasattr(valeur, 'memory_usage'):
+        return int(valeur.memory_usage(deep=True).sum())
+    if isinstance(valeur, dict):
+        return sum(_taille(v) for v in valeur.values())
+    try:
+        return len(pickle.dumps(valeur, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+class _Calcul:
+    """
+    Calcul en cours pour une clé: les demandes concurrentes attendent son résultat
+    """
+    __slots__ = ('termine', 'valeur', 'erreur')
+
+    def __init__(self):
+        self.termine = threading.Event()
+        self.valeur = None
+        self.erreur = None
+
+
+class CachePages:
+    def __init__(self, max_octets=None, ttl=None, signature=signature_marqueurs):
+        """
+        Cache en mémoire des données et figures des pages, partagé par toutes les sessions
+        du processus. Clé: (page, écoles, rôle, paramètres). Éviction LRU sous un budget
+        mémoire, invalidation ciblée par école à chaque commit d'élève du processus, et
+        à la lecture si le marqueur d'une de ses écoles a changé (écriture d'un autre
+        processus). La durée de vie des entrées est optionnelle (illimitée par défaut).
+        """
+        if max_octets is None:
+            max_octets = int(os.environ.get(ENV_TAILLE_CACHE, TAILLE_PAR_DEFAUT_MO)) * 1024 * 1024
+        if ttl is None:
+            ttl = float(os.environ.get(ENV_TTL_CACHE, TTL_PAR_DEFAUT))
+        self.max_octets = max_octets
+        self.ttl = ttl
+        self.signature = signature
+        self._verrou = threading.Lock()
+        self._entrees = OrderedDict()   # clé -> (valeur, taille, écoles, signature, expiration)
+        self._par_ecole = {}            # école (ou TOUTES_ECOLES) -> clés dépendantes
+        self._generations = {}          # école -> numéro d'invalidation
+        self._en_cours = {}
+        self.octets = 0
+
+    @staticmethod
+    def _cle(page, ecoles, role, parametres):
+        ecoles = tuple(sorted(ecoles)) if ecoles else None
+        return page, ecoles, role, repr(sorted((parametres or {}).items()))
+
+    def _generation(self, ecoles):
+        cles = ecoles or (TOUTES_ECOLES,)
+        return tuple(self._generations.get(ecole, 0) for ecole in cles) + (self._generations.get(TOUTES_ECOLES, 0),)
+
+    def obtenir(self, page, ecoles, role, parametres, calcul):
+        """
+        Retourne la valeur en cache, ou la calcule une seule fois même si plusieurs
+        sessions la demandent en même temps
+        """
+        cle = self._cle(page, ecoles, role, parametres)
+        signature = self.signature(ecoles) if self.signature else None
+        with self._verrou:
+            if cle in self._entrees:
+                valeur, _, _, signature_entree, expiration = self._entrees[cle]
+                if signature_entree == signature and time.monotonic() < expiration:
+                    self._entrees.move_to_end(cle)
+                    instrumentation.incrementer('cache_pages.succes')
+                    return valeur
+                # École modifiée par un autre processus, ou entrée expirée
+                self._retirer(cle)
+                instrumentation.incrementer('cache_pages.perimee')
+            en_cours = self._en_cours.get(cle)
+            proprietaire = en_cours is None
+            if proprietaire:
+                en_cours = self._en_cours[cle] = _Calcul()
+                generation = self._generation(ecoles)
+
+        if not proprietaire:
+            instrumentation.incrementer('cache_pages.attente')
+            en_cours.termine.wait()
+            if en_cours.erreur is not None:
+                raise en_cours.erreur
+            return en_cours.valeur
+
+        instrumentation.incrementer('cache_pages.echec')
+        en_cours.erreur = RuntimeError(f"Calcul interrompu pour la page {page}")
+        try:
+            en_cours.valeur = calcul()
+            en_cours.erreur = None
+        except Exception as e:
+            en_cours.erreur = e
+            raise
+        finally:
+            with self._verrou:
+                del self._en_cours[cle]
+                # Pas de stockage si un commit a invalidé ces écoles pendant le calcul
+                if en_cours.erreur is None and generation == self._generation(ecoles):
+                    self._stocker(cle, en_cours.valeur, ecoles, signature)
+            en_cours.termine.set()
+        return en_cours.valeur
+
+    def _stocker(self, cle, valeur, ecoles, signature=None):
+        taille = _taille(valeur)
+        if taille > self.max_octets:
+            return
+        dependances = tuple(ecoles) if ecoles else (TOUTES_ECOLES,)
+        expiration = time.monotonic() + self.ttl if self.ttl > 0 else float('inf')
+        self._entrees[cle] = (valeur, taille, dependances, signature, expiration)
+        self.octets += taille
+        for ecole in dependances:
+            self._par_ecole.setdefault(ecole, set()).add(cle)
+        while self.octets > self.max_octets:
+            ancienne, _ = next(iter(self._entrees.items()))
+            self._retirer(ancienne)
+            instrumentation.incrementer('cache_pages.eviction')
+
+    def _retirer(self, cle):
+        _, taille, dependances, _, _ = self._entrees.pop(cle)
+        self.octets -= taille
+        for ecole in dependances:
+            self._par_ecole.get(ecole, set()).discard(cle)
+
+    def invalider(self, ecoles):
+        """
+        Retire les entrées qui dépendent des écoles modifiées (et les vues district).
+        TOUTES_ECOLES dans `ecoles` vide tout le cache.
+        """
+        with self._verrou:
+            if TOUTES_ECOLES in ecoles:
+                cibles = set(self._entrees)
+                ecoles = set(ecoles) | set(self._par_ecole)
+            else:
+                cibles = set(self._par_ecole.get(TOUTES_ECOLES, ()))
+                for ecole in ecoles:
+                    cibles |= self._par_ecole.get(ecole, set())
+            for ecole in set(ecoles) | {TOUTES_ECOLES}:
+                self._generations[ecole] = self._generations.get(ecole, 0) + 1
+            for cle in cibles:
+                if cle in self._entrees:
+                    self._retirer(cle)
+        instrumentation.incrementer('cache_pages.invalidation')
+
+    def vider(self):
+        self.invalider({TOUTES_ECOLES})
+
+    def statistiques(self):
+        with self._verrou:
+            return {'entrees': len(self._entrees), 'octets': self.octets, 'max_octets': self.max_octets}
+
+
+cache_pages = CachePages()
+
+
+# Invalidation ciblée: écoles des élèves ajoutés/modifiés/supprimés, appliquée au commit
+@event.listens_for(Session, 'after_flush')
+def _noter_ecoles_modifiees(session, contexte):
+    ecoles = session.info.setdefault('ecoles_modifiees', set())
+    for objet in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(objet, Eleve):
+            ecoles.add(objet.ecole)
+
+
+@event.listens_for(Session, 'after_bulk_delete')
+def _noter_suppression_en_masse(contexte):
+    # Suppressions par requête (archivage): écoles inconnues, tout est invalidé
+    if contexte.mapper.class_ is Eleve:
+        contexte.session.info.setdefault('ecoles_modifiees', set()).add(TOUTES_ECOLES)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalider_apres_commit(session):
+    ecoles = session.info.pop('ecoles_modifiees', None)
+    if ecoles:
+        cache_pages.invalider(ecoles)
+        signaler_modification(ecoles)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _oublier_apres_rollback(session):
+    session.info.pop('ecoles_modifiees', None)
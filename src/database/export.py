@@ -0,0 +1,132 @@
+import os
+import sys
+import csv
+import gzip
+import argparse
+from datetime import date, datetime
+
+import numpy as np
+
+# Ajouter le répertoire racine au PYTHONPATH (exécution en ligne de commande)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.database.models import Session, routeur
+from src.database.requetes import requete_historique, annee_archivee, ATTRIBUTS, LIBELLES
+from src.database.archivage import iter_archives
+
+FORMATS = ('csv', 'xlsx')
+TAILLE_LOT = 1000
+
+
+def iter_lignes(session, taille_lot=TAILLE_LOT, **filtres):
+    """
+    Parcourt l'historique filtré par lots via un curseur côté serveur,
+    sans charger toute la table en mémoire
+    """
+    query = requete_historique(session, **filtres)
+    query = query.execution_options(stream_results=True).yield_per(taille_lot)
+    for ligne in query:
+        yield _valeurs_export(ligne)
+
+
+def iter_lignes_partitions(taille_lot=TAILLE_LOT, **filtres):
+    """
+    Parcourt l'historique filtré partition après partition (une seule session ouverte à la fois)
+    """
+    for cle in routeur.cles(ecoles=filtres.get('ecoles'), annee=filtres.get('annee')):
+        session = Session(bind=routeur.engine(cle))
+        try:
+            yield from iter_lignes(session, taille_lot=taille_lot, **filtres)
+        finally:
+            session.close()
+    # Année close: lignes lues par lots dans les archives Parquet
+    if annee_archivee(filtres.get('annee')):
+        for ligne in iter_archives(ATTRIBUTS, taille_lot=taille_lot, **filtres):
+            yield _valeurs_export(ligne)
+
+
+def _valeurs_export(ligne):
+    valeurs = []
+    for valeur in ligne:
+        # Scalaires NumPy (np.bool_, np.int64, …) ramenés aux types Python avant le formatage
+        if isinstance(valeur, np.generic):
+            valeur = valeur.item()
+        if isinstance(valeur, bool):
+            valeur = 'Oui' if valeur else 'Non'
+        elif isinstance(valeur, (date, datetime)):
+            valeur = valeur.isoformat()
+        valeurs.append(valeur)
+    return valeurs
+
+
+def exporter_csv(destination, lignes, compresser=False):
+    """
+    Écrit les lignes en CSV (UTF-8, séparateur ';'), une par une, éventuellement compressé en gzip
+    """
+    ouvrir = gzip.open if compresser else open
+    n = 0
+    with ouvrir(destination, 'wt', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(LIBELLES)
+        for valeurs in lignes:
+            writer.writerow(valeurs)
+            n += 1
+    return n
+
+
+def exporter_xlsx(destination, lignes):
+    """
+    Écrit les lignes en Excel avec openpyxl en mode écriture seule (mémoire constante)
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("L'export Excel nécessite openpyxl: python -m pip install openpyxl") from e
+
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet('Historique')
+    feuille.append(LIBELLES)
+    n = 0
+    for valeurs in lignes:
+        feuille.append(valeurs)
+        n += 1
+    classeur.save(destination)
+    return n
+
+
+def exporter(destination, format_fichier='csv', compresser=False, **filtres):
+    """
+    Exporte l'historique filtré (toutes partitions) au format demandé et retourne le nombre de lignes
+    """
+    if format_fichier not in FORMATS:
+        raise ValueError(f"Format d'export inconnu: {format_fichier}")
+
+    lignes = iter_lignes_partitions(**filtres)
+    if format_fichier == 'csv':
+        return exporter_csv(destination, lignes, compresser=compresser)
+    # Un fichier xlsx est déjà une archive zip: pas de compression gzip supplémentaire
+    return exporter_xlsx(destination, lignes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export de l'historique des prédictions")
+    parser.add_argument('-o', '--sortie', required=True, help="Fichier de sortie")
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help="Format (déduit de l'extension par défaut)")
+    parser.add_argument('--gzip', action='store_true', help="Compresser le CSV en gzip")
+    parser.add_argument('--niveau', action='append', help="Filtrer par niveau (répétable)")
+    parser.add_argument('--du', type=date.fromisoformat, help="Date de prédiction minimale (AAAA-MM-JJ)")
+    parser.add_argument('--au', type=date.fromisoformat, help="Date de prédiction maximale (AAAA-MM-JJ)")
+    parser.add_argument('--annee', help="Année scolaire")
+    parser.add_argument('--ecole', action='append', help="Filtrer par école (répétable)")
+    args = parser.parse_args()
+
+    format_fichier = args.format or ('xlsx' if args.sortie.endswith('.xlsx') else 'csv')
+    n = exporter(args.sortie, format_fichier=format_fichier, compresser=args.gzip,
+                 niveaux=args.niveau, date_debut=args.du, date_fin=args.au, annee=args.annee,
+                 ecoles=args.ecole)
+    print(f"{n} lignes exportées dans {args.sortie}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from src.database.models import init_db, User, get_session
+from src.auth.authentification import creer_utilisateur, migrer_mots_de_passe
 
 def create_default_users():
     """Crée les utilisateurs par défaut"""
@@ -12,21 +13,25 @@ def create_default_users():
     
     # Vérifier si les utilisateurs existent déjà
     if session.query(User).first() is None:
-        # Créer les utilisateurs par défaut
+        # Créer les utilisateurs par défaut (mots de passe hachés)
         users = [
-            User(username='admin', password='admin123', role='admin'),
-            User(username='prof1', password='prof123', role='enseignant'),
-            User(username='conseiller1', password='conseiller123', role='conseiller')
+            ('admin', 'admin123', 'admin'),
+            ('prof1', 'prof123', 'enseignant'),
+            ('conseiller1', 'conseiller123', 'conseiller')
         ]
         
         # Ajouter les utilisateurs à la base de données
-        for user in users:
-            session.add(user)
+        for username, password, role in users:
+            creer_utilisateur(session, username, password, role)
         
         session.commit()
         print("Utilisateurs par défaut créés avec succès!")
     else:
         print("Les utilisateurs existent déjà.")
+        # Hacher les mots de passe créés en clair par d'anciennes versions
+        n = migrer_mots_de_passe(session)
+        if n:
+            print(f"{n} mot(s) de passe migré(s) vers scrypt.")
     
     session.close()
 
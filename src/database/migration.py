@@ -0,0 +1,100 @@
+import os
+import sys
+import argparse
+from collections import defaultdict
+
+# Ajouter le répertoire racine au PYTHONPATH (exécution en ligne de commande)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from sqlalchemy import inspect, select, delete, insert
+
+from src.database.models import Eleve, get_engine, routeur
+from src.database.cache import signaler_modification
+
+TAILLE_LOT = 5000
+
+
+def migrer_vers_partitions(routeur=routeur, taille_lot=TAILLE_LOT):
+    """
+    Copie les élèves de la base principale vers leurs partitions, puis les retire de la
+    base principale. Un identifiant déjà présent dans une partition n'est ni copié ni
+    supprimé: il est signalé comme conflit. Retourne (migrés, conflits).
+    """
+    if routeur.strategie is None:
+        raise ValueError("Partitionnement inactif: définissez ELITE_PARTITIONNEMENT")
+    engine = get_engine()
+    if not inspect(engine).has_table(Eleve.__tablename__):
+        return 0, []
+
+    table = Eleve.__table__
+    colonnes = [c for c in table.columns if c.key != 'id']
+    migres, conflits, dernier = 0, [], 0
+    while True:
+        with engine.connect() as conn:
+            lignes = conn.execute(
+                select(table).where(table.c.id > dernier).order_by(table.c.id).limit(taille_lot)
+            ).mappings().all()
+        if not lignes:
+            break
+        dernier = lignes[-1]['id']
+
+        par_partition = defaultdict(list)
+        for ligne in lignes:
+            par_partition[routeur.cle(ligne['ecole'], ligne['annee_scolaire'])].append(ligne)
+
+        for cle, groupe in par_partition.items():
+            existants = routeur.ids_existants([ligne['id_eleve'] for ligne in groupe])
+            a_copier = [ligne for ligne in groupe if ligne['id_eleve'] not in existants]
+            conflits.extend(ligne['id_eleve'] for ligne in groupe if ligne['id_eleve'] in existants)
+            if a_copier:
+                with routeur.engine(cle).begin() as conn:
+                    conn.execute(insert(table), [{c.key: ligne[c.key] for c in colonnes} for ligne in a_copier])
+                # Retrait de la base principale seulement après le commit dans la partition
+                with engine.begin() as conn:
+                    conn.execute(delete(table).where(table.c.id.in_([ligne['id'] for ligne in a_copier])))
+                # Insertions hors ORM: l'application est prévenue par les marqueurs du cache
+                signaler_modification({ligne['ecole'] for ligne in a_copier})
+                migres += len(a_copier)
+    return migres, conflits
+
+
+def doublons_entre_partitions(routeur=routeur):
+    """
+    Identifiants présents dans plusieurs partitions -> liste des partitions
+    """
+    def _ids(session):
+        return [i for (i,) in session.query(Eleve.id_eleve)]
+
+    cles = routeur.cles()
+    presences = defaultdict(list)
+    for cle, ids in zip(cles, routeur.executer_partout(_ids, cles)):
+        for id_eleve in ids:
+            presences[id_eleve].append(cle)
+    return {id_eleve: partitions for id_eleve, partitions in presences.items() if len(partitions) > 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migration de la table eleves vers les partitions")
+    parser.add_argument('action', choices=['etat', 'migrer', 'verifier'])
+    args = parser.parse_args()
+
+    if routeur.strategie is None:
+        print("Partitionnement inactif (ELITE_PARTITIONNEMENT non défini): rien à migrer.")
+        return
+    if args.action == 'migrer':
+        migres, conflits = migrer_vers_partitions()
+        print(f"{migres} élèves migrés vers les partitions '{routeur.strategie}'")
+        if conflits:
+            print(f"{len(conflits)} identifiants déjà présents dans une partition, laissés dans la base principale: "
+                  f"{', '.join(conflits[:20])}")
+    elif args.action == 'verifier':
+        doublons = doublons_entre_partitions()
+        print(f"{len(doublons)} identifiants présents dans plusieurs partitions")
+        for id_eleve, partitions in list(doublons.items())[:20]:
+            print(f"  {id_eleve}: {', '.join(partitions)}")
+    print(f"Partitions: {', '.join(routeur.cles()) or 'aucune'}")
+    print(f"Élèves non migrés dans la base principale: {routeur.lignes_non_migrees()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,37 @@
-from sqlalchemy import create_engine, Column, Integer, Float, String, Boolean, Date, ForeignKey
+import os
+import threading
+from urllib.parse import quote, unquote
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from sqlalchemy import create_engine, inspect, text, Column, Integer, Float, String, Boolean, Date, ForeignKey
+from sqlalchemy.engine import URL
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+from src.monitoring.instrumentation import instrumentation, installer_hooks_sqlalchemy
 
 Base = declarative_base()
 
+ECOLE_PAR_DEFAUT = 'principale'
+
+# Chronométrage des requêtes SQL (sans effet si l'instrumentation est désactivée)
+installer_hooks_sqlalchemy()
+
 class User(Base):
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
     username = Column(String, unique=True, nullable=False)
-    password = Column(String, nullable=False)  # Dans un vrai système, utiliser le hachage
+    password = Column(String, nullable=False)  # Empreinte scrypt salée (voir src/auth/authentification.py)
     role = Column(String, nullable=False)  # 'admin', 'enseignant', 'conseiller'
+    ecole = Column(String, nullable=True)  # None = accès à toutes les écoles (district)
     
 class Eleve(Base):
     __tablename__ = 'eleves'
     
     id = Column(Integer, primary_key=True)
     id_eleve = Column(String, unique=True, nullable=False)
+    ecole = Column(String, nullable=False, default=ECOLE_PAR_DEFAUT)
     annee_scolaire = Column(String, nullable=False)
     date_prediction = Column(Date, default=datetime.now().date())
     
@@ -47,6 +61,7 @@ class Eleve(Base):
         """Convertit l'objet en dictionnaire pour l'affichage"""
         return {
             'ID Élève': self.id_eleve,
+            'École': self.ecole,
             'Année Scolaire': self.annee_scolaire,
             'Âge': self.age,
             'Sexe': self.sexe,
@@ -65,13 +80,174 @@ class Eleve(Base):
             'Date Prédiction': self.date_prediction.strftime('%d/%m/%Y')
         }
 
+DATABASE_URL = 'sqlite:///elite_vigilance.db'
+
+# Moteur et fabrique de sessions partagés (créés une seule fois par processus)
+_engine = None
+Session = sessionmaker()
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_engine(DATABASE_URL)
+    return _engine
+
+def _ajouter_colonnes_manquantes(engine, table):
+    """
+    Ajoute aux bases existantes les colonnes introduites après leur création
+    """
+    existantes = {col['name'] for col in inspect(engine).get_columns(table.name)}
+    with engine.begin() as conn:
+        for col in table.columns:
+            if col.name not in existantes:
+                defaut = col.default.arg if col.default is not None and not callable(col.default.arg) else None
+                clause = f" DEFAULT '{defaut}'" if defaut is not None else ""
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col.type.compile(engine.dialect)}{clause}'))
+
 # Création de la base de données
 def init_db():
-    engine = create_engine('sqlite:///elite_vigilance.db')
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        _ajouter_colonnes_manquantes(engine, table)
     return engine
 
 def get_session():
-    engine = create_engine('sqlite:///elite_vigilance.db')
-    Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+    instrumentation.incrementer('db.sessions_ouvertes')
+    return Session(bind=get_engine())
+
+STRATEGIES_PARTITIONNEMENT = ('ecole', 'annee')
+
+# Partitionnement de la table eleves: 'ecole' ou 'annee' (vide = base unique)
+ENV_PARTITIONNEMENT = 'ELITE_PARTITIONNEMENT'
+ENV_REPERTOIRE_PARTITIONS = 'ELITE_REPERTOIRE_PARTITIONS'
+
+class RouteurEleves:
+    def __init__(self, strategie=None, repertoire='partitions'):
+        """
+        Route les lectures/écritures de Eleve vers un fichier SQLite par école
+        ou par année scolaire, pour que les écritures concurrentes de plusieurs
+        écoles ne se bloquent pas sur un verrou unique
+        """
+        if strategie not in (None,) + STRATEGIES_PARTITIONNEMENT:
+            raise ValueError(f"Stratégie de partitionnement inconnue: {strategie}")
+        self.strategie = strategie
+        self.repertoire = Path(repertoire)
+        self._engines = {}
+        self._verrou = threading.Lock()
+
+    @classmethod
+    def depuis_environnement(cls):
+        strategie = os.environ.get(ENV_PARTITIONNEMENT, '').strip().lower() or None
+        return cls(strategie, os.environ.get(ENV_REPERTOIRE_PARTITIONS, 'partitions'))
+
+    def cle(self, ecole=None, annee_scolaire=None):
+        """
+        Clé de partition d'un élève (None = base principale)
+        """
+        if self.strategie == 'ecole':
+            return ecole or ECOLE_PAR_DEFAUT
+        if self.strategie == 'annee':
+            return str(annee_scolaire)
+        return None
+
+    def _chemin(self, cle):
+        # Encodage réversible (%XX): la clé d'origine se relit depuis le nom du fichier
+        return self.repertoire / f"eleves_{self.strategie}_{quote(cle, safe='')}.db"
+
+    def engine(self, cle):
+        if cle is None:
+            return get_engine()
+        with self._verrou:
+            if cle not in self._engines:
+                self.repertoire.mkdir(parents=True, exist_ok=True)
+                # URL construite sans analyse: les '%XX' du nom de fichier ne doivent pas être décodés
+                engine = create_engine(URL.create('sqlite', database=str(self._chemin(cle))))
+                Eleve.__table__.create(engine, checkfirst=True)
+                _ajouter_colonnes_manquantes(engine, Eleve.__table__)
+                self._engines[cle] = engine
+            return self._engines[cle]
+
+    def session_pour(self, ecole=None, annee_scolaire=None):
+        """
+        Session ouverte sur la partition de l'élève
+        """
+        instrumentation.incrementer('db.sessions_ouvertes')
+        return Session(bind=self.engine(self.cle(ecole, annee_scolaire)))
+
+    def cles(self, ecoles=None, annee=None):
+        """
+        Partitions existantes, réduites à celles qui peuvent contenir les filtres donnés
+        """
+        if self.strategie is None:
+            return [None]
+        prefixe = f"eleves_{self.strategie}_"
+        # Dédoublonnage par fichier: une partition ouverte et son fichier sur disque ne comptent qu'une fois
+        connues = {chemin.name: unquote(chemin.stem[len(prefixe):]) for chemin in self.repertoire.glob(f"{prefixe}*.db")}
+        connues.update((self._chemin(cle).name, cle) for cle in list(self._engines))
+        cles = sorted(connues.values())
+        if self.strategie == 'ecole' and ecoles:
+            cles = [cle for cle in cles if cle in set(ecoles)]
+        if self.strategie == 'annee' and annee:
+            cles = [cle for cle in cles if cle == str(annee)]
+        return cles
+
+    def fichiers(self, ecoles=None, annee=None):
+        """
+        Fichiers SQLite des partitions concernées (aucun sans partitionnement)
+        """
+        if self.strategie is None:
+            return []
+        return [str(self._chemin(cle)) for cle in self.cles(ecoles=ecoles, annee=annee)]
+
+    def lignes_non_migrees(self):
+        """
+        Nombre d'élèves encore dans la table eleves de la base principale alors que le
+        partitionnement est actif (invisibles tant qu'ils ne sont pas migrés)
+        """
+        if self.strategie is None:
+            return 0
+        engine = get_engine()
+        if not inspect(engine).has_table(Eleve.__tablename__):
+            return 0
+        with engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {Eleve.__tablename__}")).scalar()
+
+    def ids_existants(self, ids, cles=None):
+        """
+        Identifiants déjà enregistrés dans une partition quelconque: la contrainte
+        d'unicité de id_eleve ne vaut qu'à l'intérieur d'un fichier SQLite
+        """
+        ids = list({str(i) for i in ids})
+        if not ids:
+            return set()
+
+        def _chercher(session):
+            trouves = set()
+            for debut in range(0, len(ids), 500):
+                lot = ids[debut:debut + 500]
+                trouves.update(i for (i,) in session.query(Eleve.id_eleve).filter(Eleve.id_eleve.in_(lot)))
+            return trouves
+
+        return set().union(*self.executer_partout(_chercher, cles))
+
+    def executer_partout(self, fonction, cles=None, max_workers=8):
+        """
+        Exécute fonction(session) sur chaque partition en parallèle et retourne la liste des résultats
+        """
+        cles = self.cles() if cles is None else cles
+
+        def _executer(cle):
+            session = Session(bind=self.engine(cle))
+            try:
+                return fonction(session)
+            finally:
+                session.close()
+
+        if len(cles) <= 1:
+            return [_executer(cle) for cle in cles]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(cles))) as pool:
+            return list(pool.map(_executer, cles))
+
+# Routeur partagé par l'application
+routeur = RouteurEleves.depuis_environnement()
@@ -0,0 +1,166 @@
+import pandas as pd
+from sqlalchemy import func, case
+from src.database.models import Eleve, routeur
+from src.database.archivage import annees_archivees, lire_archives
+
+# Colonnes de l'historique: (attribut du modèle, libellé affiché/exporté)
+COLONNES_HISTORIQUE = [
+    ('id_eleve', 'ID Élève'),
+    ('ecole', 'École'),
+    ('annee_scolaire', 'Année Scolaire'),
+    ('age', 'Âge'),
+    ('sexe', 'Sexe'),
+    ('niveau_scolaire', 'Niveau'),
+    ('redoublement', 'Redoublement'),
+    ('statut_bourse', 'Boursier'),
+    ('moyenne_t1', 'Moyenne T1'),
+    ('moyenne_t2', 'Moyenne T2'),
+    ('nb_matieres_echec', 'Matières en échec'),
+    ('absences_t1', 'Absences T1'),
+    ('absences_t2', 'Absences T2'),
+    ('retards', 'Retards'),
+    ('sanctions', 'Sanctions'),
+    ('avis_conseil', 'Avis Conseil'),
+    ('risque_decrochage', 'Risque Décrochage'),
+    ('date_prediction', 'Date Prédiction'),
+]
+
+ATTRIBUTS = [attribut for attribut, _ in COLONNES_HISTORIQUE]
+LIBELLES = [libelle for _, libelle in COLONNES_HISTORIQUE]
+LIBELLE_PAR_ATTRIBUT = dict(COLONNES_HISTORIQUE)
+
+
+def _filtrer(query, niveaux=None, date_debut=None, date_fin=None, annee=None, ecoles=None):
+    if ecoles:
+        query = query.filter(Eleve.ecole.in_(list(ecoles)))
+    if niveaux:
+        query = query.filter(Eleve.niveau_scolaire.in_(list(niveaux)))
+    if date_debut is not None:
+        query = query.filter(Eleve.date_prediction >= date_debut)
+    if date_fin is not None:
+        query = query.filter(Eleve.date_prediction <= date_fin)
+    if annee:
+        query = query.filter(Eleve.annee_scolaire == str(annee))
+    return query
+
+
+def requete_historique(session, colonnes=None, **filtres):
+    """
+    Requête de l'historique (colonnes seulement, sans objets ORM) avec les filtres de la page
+    """
+    query = session.query(*[getattr(Eleve, attribut) for attribut in (colonnes or ATTRIBUTS)])
+    return _filtrer(query, **filtres).order_by(Eleve.id)
+
+
+def niveaux_disponibles(session):
+    """
+    Liste des niveaux scolaires présents dans l'historique
+    """
+    return [niveau for (niveau,) in session.query(Eleve.niveau_scolaire).distinct().order_by(Eleve.niveau_scolaire)]
+
+
+def libelles(colonnes=None):
+    return [LIBELLE_PAR_ATTRIBUT[attribut] for attribut in (colonnes or ATTRIBUTS)]
+
+
+def charger_historique(session, colonnes=None, **filtres):
+    """
+    Charge l'historique filtré dans un DataFrame (valeurs brutes, libellés en colonnes)
+    """
+    lignes = requete_historique(session, colonnes=colonnes, **filtres).all()
+    return pd.DataFrame.from_records(lignes, columns=libelles(colonnes))
+
+
+def _cles(filtres):
+    return routeur.cles(ecoles=filtres.get('ecoles'), annee=filtres.get('annee'))
+
+
+def annee_archivee(annee):
+    return bool(annee) and str(annee) in annees_archivees()
+
+
+def charger_historique_partitions(colonnes=None, **filtres):
+    """
+    Charge l'historique filtré depuis toutes les partitions concernées (en parallèle).
+    Pour une année archivée, les fichiers Parquet sont lus en ne chargeant que les
+    colonnes demandées, avec les filtres appliqués à la lecture.
+    """
+    morceaux = routeur.executer_partout(
+        lambda session: charger_historique(session, colonnes=colonnes, **filtres), _cles(filtres)
+    )
+    if annee_archivee(filtres.get('annee')):
+        archive = lire_archives(colonnes or ATTRIBUTS, **filtres)
+        archive.columns = libelles(colonnes)
+        morceaux.append(archive)
+    morceaux = [df for df in morceaux if not df.empty]
+    if not morceaux:
+        return pd.DataFrame(columns=libelles(colonnes))
+    return pd.concat(morceaux, ignore_index=True)
+
+
+def annees_disponibles_partitions(ecoles=None):
+    """
+    Années scolaires présentes en base (actives) et dans les archives
+    """
+    resultats = routeur.executer_partout(
+        lambda session: [annee for (annee,) in _filtrer(session.query(Eleve.annee_scolaire), ecoles=ecoles).distinct()],
+        routeur.cles(ecoles=ecoles)
+    )
+    actives = sorted({annee for annees in resultats for annee in annees})
+    return actives, annees_archivees()
+
+
+def niveaux_disponibles_partitions(ecoles=None, annee=None):
+    """
+    Niveaux présents dans l'ensemble des partitions (et dans l'archive de l'année demandée)
+    """
+    resultats = routeur.executer_partout(niveaux_disponibles, routeur.cles(ecoles=ecoles))
+    niveaux = {niveau for niveaux in resultats for niveau in niveaux}
+    if annee_archivee(annee):
+        niveaux |= set(lire_archives(['niveau_scolaire'], annee=annee, ecoles=ecoles)['niveau_scolaire'])
+    return sorted(niveaux)
+
+
+def agreger_risques(session, seuil, **filtres):
+    """
+    Agrégats partiels par école et niveau (effectif, somme, somme des carrés, élèves au-dessus du seuil)
+    """
+    query = session.query(
+        Eleve.ecole,
+        Eleve.niveau_scolaire,
+        func.count(Eleve.id),
+        func.sum(Eleve.risque_decrochage),
+        func.sum(Eleve.risque_decrochage * Eleve.risque_decrochage),
+        func.sum(case((Eleve.risque_decrochage >= seuil, 1), else_=0)),
+    )
+    lignes = _filtrer(query, **filtres).group_by(Eleve.ecole, Eleve.niveau_scolaire).all()
+    return pd.DataFrame.from_records(lignes, columns=['ecole', 'niveau', 'effectif', 'somme', 'somme_carres', 'a_risque'])
+
+
+def agreger_risques_partitions(seuil, **filtres):
+    """
+    Agrégats du district: calcul en parallèle sur chaque partition puis fusion des agrégats partiels
+    """
+    partiels = routeur.executer_partout(lambda session: agreger_risques(session, seuil, **filtres), _cles(filtres))
+    partiels = [df for df in partiels if not df.empty]
+    if not partiels:
+        return pd.DataFrame(columns=['ecole', 'niveau', 'effectif', 'a_risque', 'risque_moyen', 'ecart_type'])
+    fusion = pd.concat(partiels).groupby(['ecole', 'niveau'], as_index=False)[['effectif', 'somme', 'somme_carres', 'a_risque']].sum()
+    fusion['risque_moyen'] = fusion['somme'] / fusion['effectif']
+    variance = fusion['somme_carres'] / fusion['effectif'] - fusion['risque_moyen'] ** 2
+    fusion['ecart_type'] = variance.clip(lower=0) ** 0.5
+    return fusion.drop(columns=['somme', 'somme_carres'])
+
+
+def formater_pour_affichage(df):
+    """
+    Met en forme l'historique comme Eleve.to_dict (Oui/Non, pourcentages, dates)
+    """
+    df = df.copy()
+    for col in ['Redoublement', 'Boursier']:
+        df[col] = df[col].map({True: 'Oui', False: 'Non', 1: 'Oui', 0: 'Non'})
+    for col in ['Moyenne T1', 'Moyenne T2']:
+        df[col] = df[col].map('{:.1f}'.format)
+    df['Risque Décrochage'] = df['Risque Décrochage'].map('{:.1%}'.format)
+    df['Date Prédiction'] = pd.to_datetime(df['Date Prédiction']).dt.strftime('%d/%m/%Y')
+    return df
@@ -0,0 +1,58 @@
+import numpy as np
+import joblib
+from pathlib import Path
+
+NOM_FICHIER = 'calibration.pkl'
+METHODES = ('isotonique', 'platt')
+
+
+def ajuster_calibration(probas, y, methode='isotonique', n_points=101):
+    """
+    Ajuste une calibration des probabilités brutes et la résume en table
+    linéaire par morceaux (x croissant -> y calibré)
+    """
+    probas = np.asarray(probas, dtype=float)
+    y = np.asarray(y, dtype=int)
+
+    if methode == 'isotonique':
+        from sklearn.isotonic import IsotonicRegression
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip')
+        iso.fit(probas, y)
+        x_table = np.asarray(iso.X_thresholds_, dtype=float)
+        y_table = np.asarray(iso.y_thresholds_, dtype=float)
+    elif methode == 'platt':
+        from sklearn.linear_model import LogisticRegression
+        platt = LogisticRegression()
+        platt.fit(probas.reshape(-1, 1), y)
+        x_table = np.linspace(0.0, 1.0, n_points)
+        y_table = platt.predict_proba(x_table.reshape(-1, 1))[:, 1]
+    else:
+        raise ValueError(f"Méthode de calibration inconnue: {methode}")
+
+    return {'methode': methode, 'x': x_table, 'y': y_table}
+
+
+def appliquer_calibration(probas, table):
+    """
+    Applique la table de calibration (une interpolation linéaire, sans estimateur)
+    """
+    if table is None:
+        return probas
+    return np.interp(probas, table['x'], table['y'])
+
+
+def charger_calibration(dossier_modele):
+    """
+    Charge la table de calibration placée à côté du modèle, si elle existe
+    """
+    chemin = Path(dossier_modele) / NOM_FICHIER
+    if not chemin.exists():
+        return None
+    return joblib.load(chemin)
+
+
+def score_brier(probas, y):
+    """
+    Score de Brier (erreur quadratique moyenne des probabilités)
+    """
+    return float(np.mean((np.asarray(probas, dtype=float) - np.asarray(y, dtype=float)) ** 2))
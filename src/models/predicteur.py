@@ -2,16 +2,46 @@ import joblib
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from src.monitoring.instrumentation import instrumentation
+from src.models.calibration import charger_calibration, appliquer_calibration
+from src.models.schema import valider_lot, DonneesInvalides, AVIS_CONSEIL
+
+# Correspondance entre les champs de l'application et les colonnes du modèle entraîné
+CORRESPONDANCE_COLONNES = {
+    'age': 'Age',
+    'redoublement': 'Redoublement_Annee_Precedente',
+    'statut_bourse': 'Statut_Bourse',
+    'moyenne_t1': 'Moyenne_Generale_T1',
+    'moyenne_t2': 'Moyenne_Generale_T2',
+    'nb_matieres_echec': 'Nombre_Matieres_Echec_T1',
+    'absences_t1': 'Nombre_Absences_Injustifiees_T1',
+    'absences_t2': 'Nombre_Absences_Injustifiees_T2',
+    'retards': 'Nombre_Retards_T1',
+    'sanctions': 'Nombre_Sanctions_Disciplinaires_T1',
+    'niveau': 'Niveau_Scolaire_Actuel'
+}
+
+# Variables numériques standardisées (identiques à l'entraînement)
+COLONNES_NUMERIQUES = ['Age', 'Moyenne_Generale_T1', 'Moyenne_Generale_T2',
+                       'Nombre_Matieres_Echec_T1', 'Nombre_Absences_Injustifiees_T1',
+                       'Nombre_Absences_Injustifiees_T2', 'Nombre_Retards_T1',
+                       'Nombre_Sanctions_Disciplinaires_T1', 'evolution_moyenne',
+                       'evolution_absences', 'total_absences']
 
 class PredicteurDecrochage:
     def __init__(self, model_path):
         """
         Initialise le prédicteur avec le modèle entraîné
         """
-        self.model = joblib.load(model_path)
-        self.scaler = joblib.load(str(Path(model_path).parent / 'scaler.pkl'))
-        
-    def preprocess_data(self, data):
+        with instrumentation.chrono('predicteur.chargement_modele'):
+            self.model = joblib.load(model_path)
+        with instrumentation.chrono('predicteur.chargement_scaler'):
+            self.scaler = joblib.load(str(Path(model_path).parent / 'scaler.pkl'))
+        # Table de calibration optionnelle (générée par train.py)
+        self.calibration = charger_calibration(Path(model_path).parent)
+        
+    @instrumentation.chronometre('predicteur.preprocess_data')
+    def preprocess_data(self, data, standardiser=True):
         """
         Prétraite les données pour la prédiction
         """
@@ -19,20 +49,7 @@ class PredicteurDecrochage:
         data_processed = data.copy()
         
         # Renommage des colonnes pour correspondre au modèle entraîné
-        mapping = {
-            'age': 'Age',
-            'redoublement': 'Redoublement_Annee_Precedente',
-            'statut_bourse': 'Statut_Bourse',
-            'moyenne_t1': 'Moyenne_Generale_T1',
-            'moyenne_t2': 'Moyenne_Generale_T2',
-            'nb_matieres_echec': 'Nombre_Matieres_Echec_T1',
-            'absences_t1': 'Nombre_Absences_Injustifiees_T1',
-            'absences_t2': 'Nombre_Absences_Injustifiees_T2',
-            'retards': 'Nombre_Retards_T1',
-            'sanctions': 'Nombre_Sanctions_Disciplinaires_T1',
-            'niveau': 'Niveau_Scolaire_Actuel'
-        }
-        data_processed.rename(columns=mapping, inplace=True)
+        data_processed.rename(columns=CORRESPONDANCE_COLONNES, inplace=True)
 
         # Encodage du niveau scolaire
         data_processed['Niveau_Scolaire_Actuel_3ème Humanités'] = (data_processed['Niveau_Scolaire_Actuel'] == '3ème Humanités').astype(int)
@@ -53,24 +70,10 @@ class PredicteurDecrochage:
             'Avis_Conseil_Classe_T1_Très Favorable'
         ]
         
-        # Initialisation des colonnes d'avis à 0
-        for col in avis_columns:
-            data_processed[col] = 0
-            
-        # Mapping des avis
-        avis_mapping = {
-            'Défavorable': 'Avis_Conseil_Classe_T1_Défavorable',
-            'Favorable': 'Avis_Conseil_Classe_T1_Favorable',
-            'Favorable avec mise en garde': 'Avis_Conseil_Classe_T1_Favorable avec mise en garde',
-            'Passable': 'Avis_Conseil_Classe_T1_Passable',
-            'Très Défavorable': 'Avis_Conseil_Classe_T1_Très Défavorable',
-            'Très Favorable': 'Avis_Conseil_Classe_T1_Très Favorable'
-        }
-        
-        # Application du mapping des avis
-        for idx, avis in enumerate(data['avis_conseil']):
-            if avis in avis_mapping:
-                data_processed.loc[idx, avis_mapping[avis]] = 1
+        # Encodage one-hot vectorisé (les avis hors domaine sont rejetés par la validation)
+        avis = data['avis_conseil'].to_numpy()
+        for valeur in AVIS_CONSEIL:
+            data_processed[f'Avis_Conseil_Classe_T1_{valeur}'] = (avis == valeur).astype(int)
                 
         # Création des nouvelles variables
         data_processed['evolution_moyenne'] = data_processed['Moyenne_Generale_T2'] - data_processed['Moyenne_Generale_T1']
@@ -88,14 +91,9 @@ class PredicteurDecrochage:
             if col in data_processed.columns:
                 data_processed[col] = data_processed[col].astype(int)
 
-        # Standardisation des variables numériques
-        numeric_features = ['Age', 'Moyenne_Generale_T1', 'Moyenne_Generale_T2', 
-                            'Nombre_Matieres_Echec_T1', 'Nombre_Absences_Injustifiees_T1',
-                            'Nombre_Absences_Injustifiees_T2', 'Nombre_Retards_T1',
-                            'Nombre_Sanctions_Disciplinaires_T1', 'evolution_moyenne',
-                            'evolution_absences', 'total_absences']
-        
-        data_processed[numeric_features] = self.scaler.transform(data_processed[numeric_features])
+        # Standardisation des variables numériques (sauf pour la simulation, qui perturbe les valeurs brutes)
+        if standardiser:
+            data_processed[COLONNES_NUMERIQUES] = self.scaler.transform(data_processed[COLONNES_NUMERIQUES])
         
         # Réorganiser les colonnes dans l'ordre exact attendu par le modèle
         if hasattr(self.model, 'feature_names_in_'):
@@ -128,65 +126,66 @@ class PredicteurDecrochage:
                 'Sexe_Masculin'
             ]
 
-        # S'assurer que toutes les colonnes attendues existent (créer à 0 si manquantes)
-        for col in expected_columns:
-            if col not in data_processed.columns:
-                data_processed[col] = 0
+        # Une colonne attendue absente signale un écart de schéma: pas de remplissage silencieux
+        manquantes = [col for col in expected_columns if col not in data_processed.columns]
+        if manquantes:
+            raise ValueError(f"Colonnes attendues par le modèle absentes: {manquantes}")
 
         # Supprimer les colonnes inattendues éventuelles
-        data_processed = data_processed[[c for c in expected_columns if c in data_processed.columns]]
-        
         data_processed = data_processed[expected_columns]
         
         return data_processed
         
+    @instrumentation.chronometre('predicteur.predict')
     def predict(self, data):
         """
         Fait une prédiction pour un élève
         """
+        # Les lignes hors schéma sont rejetées plutôt que scorées
+        resultat = valider_lot(data)
+        if not resultat.tout_valide:
+            raise DonneesInvalides(resultat)
+
         # Prétraitement des données
-        features = self.preprocess_data(data)
-        
-        # Prédiction
-        proba = self.model.predict_proba(features)
+        features = self.preprocess_data(data.reset_index(drop=True))
         
-        return proba[:, 1]  # Retourne la probabilité de décrochage
+        return self.predict_features(features)
+
+    def predict_features(self, features):
+        """
+        Probabilités de décrochage (calibrées) pour une matrice déjà prétraitée
+        """
+        with instrumentation.chrono('predicteur.predict_proba'):
+            proba = self.model.predict_proba(features)
+        return appliquer_calibration(proba[:, 1], self.calibration)
         
+    @instrumentation.chronometre('predicteur.get_risk_factors')
     def get_risk_factors(self, data):
         """
         Identifie les principaux facteurs de risque
         """
-        risk_factors = []
-        
-        # Évolution des moyennes
-        evolution = data['moyenne_t2'].iloc[0] - data['moyenne_t1'].iloc[0]
-        if evolution < -5:
-            risk_factors.append("Baisse significative des résultats scolaires")
-        
-        # Moyennes faibles
-        if data['moyenne_t2'].iloc[0] < 50:
-            risk_factors.append("Moyenne générale insuffisante")
-        
-        # Matières en échec
-        if data['nb_matieres_echec'].iloc[0] > 3:
-            risk_factors.append("Nombre élevé de matières en échec")
-        
-        # Absences
-        if data['absences_t2'].iloc[0] > 10:
-            risk_factors.append("Taux d'absentéisme élevé")
-        if data['absences_t2'].iloc[0] > data['absences_t1'].iloc[0]:
-            risk_factors.append("Augmentation des absences")
-            
-        # Retards
-        if data['retards'].iloc[0] > 10:
-            risk_factors.append("Nombre important de retards")
-            
-        # Sanctions
-        if data['sanctions'].iloc[0] > 2:
-            risk_factors.append("Problèmes de comportement")
-            
-        # Avis du conseil
-        if data['avis_conseil'].iloc[0] in ['Défavorable', 'Très Défavorable']:
-            risk_factors.append("Avis défavorable du conseil de classe")
-            
-        return risk_factors
\ No newline at end of file
+        return facteurs_risque(data.head(1))[0]
+
+
+# Facteurs de risque: (message, règle vectorisée sur les colonnes de l'application)
+REGLES_FACTEURS = [
+    ("Baisse significative des résultats scolaires", lambda d: d['moyenne_t2'] - d['moyenne_t1'] < -5),
+    ("Moyenne générale insuffisante", lambda d: d['moyenne_t2'] < 50),
+    ("Nombre élevé de matières en échec", lambda d: d['nb_matieres_echec'] > 3),
+    ("Taux d'absentéisme élevé", lambda d: d['absences_t2'] > 10),
+    ("Augmentation des absences", lambda d: d['absences_t2'] > d['absences_t1']),
+    ("Nombre important de retards", lambda d: d['retards'] > 10),
+    ("Problèmes de comportement", lambda d: d['sanctions'] > 2),
+    ("Avis défavorable du conseil de classe", lambda d: d['avis_conseil'].isin(['Défavorable', 'Très Défavorable'])),
+]
+
+
+def facteurs_risque(data):
+    """
+    Facteurs de risque de chaque élève d'un lot (une passe vectorisée par règle)
+    """
+    facteurs = [[] for _ in range(len(data))]
+    for message, regle in REGLES_FACTEURS:
+        for k in np.flatnonzero(regle(data).to_numpy()):
+            facteurs[k].append(message)
+    return facteurs
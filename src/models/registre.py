@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import zlib
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Ajouter le répertoire racine au PYTHONPATH (exécution en ligne de commande)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.models.predicteur import PredicteurDecrochage
+from src.models.calibration import NOM_FICHIER as FICHIER_CALIBRATION
+from src.models.schema import valider_lot
+from src.monitoring.instrumentation import instrumentation
+from src.scoring.export import exporter, exporter_dossier, ModeleNonExportable
+from src.scoring.scoreur import NOM_ARTEFACT
+
+FICHIERS_MODELE = ('modele_decrochage.pkl', 'scaler.pkl', FICHIER_CALIBRATION)
+NOM_MANIFESTE = 'manifest.json'
+NOM_JOURNAL_OMBRE = 'ombre.jsonl'
+
+# Taille des lots de scoring en ombre: les prédictions unitaires sont regroupées
+TAILLE_LOT_OMBRE = 32
+
+
+class RegistreModeles:
+    def __init__(self, repertoire='model/registre'):
+        """
+        Registre versionné des modèles: un répertoire par version et un manifeste
+        indiquant la version en production, le candidat et son mode de déploiement
+        """
+        self.repertoire = Path(repertoire)
+        self._verrou = threading.Lock()
+        self._manifeste = None
+        self._mtime = None
+        self._predicteurs = {}
+
+    @property
+    def chemin_manifeste(self):
+        return self.repertoire / NOM_MANIFESTE
+
+    def manifeste(self):
+        """
+        Manifeste courant, relu automatiquement quand le fichier change (sans redémarrage)
+        """
+        try:
+            mtime = self.chemin_manifeste.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {'live': None, 'candidat': None, 'ombre': False, 'pourcentage': 0,
+                    'precedents': [], 'versions': {}}
+        if mtime != self._mtime:
+            with self._verrou:
+                with open(self.chemin_manifeste, encoding='utf-8') as f:
+                    self._manifeste = json.load(f)
+                self._mtime = mtime
+        return self._manifeste
+
+    def _ecrire(self, manifeste):
+        self.repertoire.mkdir(parents=True, exist_ok=True)
+        temporaire = self.chemin_manifeste.with_suffix('.tmp')
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(manifeste, f, ensure_ascii=False, indent=2)
+        # Remplacement atomique: les lecteurs voient l'ancien ou le nouveau manifeste
+        os.replace(temporaire, self.chemin_manifeste)
+        with self._verrou:
+            self._manifeste = manifeste
+            self._mtime = self.chemin_manifeste.stat().st_mtime_ns
+
+    def _modifier(self, fonction):
+        manifeste = json.loads(json.dumps(self.manifeste()))
+        fonction(manifeste)
+        self._ecrire(manifeste)
+        return manifeste
+
+    def _inscrire(self, version, infos):
+        def _ajouter(manifeste):
+            manifeste['versions'][version] = dict(infos or {}, date=datetime.now().isoformat(timespec='seconds'))
+            if manifeste['live'] is None:
+                manifeste['live'] = version
+            else:
+                # Un nouveau modèle n'est jamais servi directement: il démarre en ombre
+                manifeste['candidat'] = version
+                manifeste['ombre'] = True
+                manifeste['pourcentage'] = 0
+        self._modifier(_ajouter)
+        return version
+
+    def _nouveau_repertoire(self, version):
+        version = version or datetime.now().strftime('v%Y%m%d_%H%M%S')
+        destination = self.repertoire / version
+        destination.mkdir(parents=True, exist_ok=False)
+        return version, destination
+
+    def enregistrer(self, dossier_source, infos=None, version=None):
+        """
+        Copie un couple modèle+scaler (et sa calibration) dans une nouvelle version.
+        La première version devient la production, les suivantes des candidates.
+        """
+        dossier_source = Path(dossier_source)
+        version, destination = self._nouveau_repertoire(version)
+        for nom in FICHIERS_MODELE:
+            if (dossier_source / nom).exists():
+                shutil.copy2(dossier_source / nom, destination / nom)
+        self._exporter_numpy(lambda: exporter_dossier(destination))
+        return self._inscrire(version, infos)
+
+    def enregistrer_objets(self, modele, scaler, calibration=None, infos=None, version=None, annexes=None):
+        """
+        Sauvegarde un modèle entraîné (avec son scaler et sa calibration) comme nouvelle version.
+        `annexes` (nom de fichier -> objet JSON) accompagne le modèle, ex. la référence de dérive.
+        """
+        version, destination = self._nouveau_repertoire(version)
+        joblib.dump(modele, destination / 'modele_decrochage.pkl')
+        joblib.dump(scaler, destination / 'scaler.pkl')
+        if calibration is not None:
+            joblib.dump(calibration, destination / FICHIER_CALIBRATION)
+        for nom, contenu in (annexes or {}).items():
+            with open(destination / nom, 'w', encoding='utf-8') as f:
+                json.dump(contenu, f, ensure_ascii=False)
+        self._exporter_numpy(lambda: exporter(modele, scaler, calibration, destination / NOM_ARTEFACT))
+        return self._inscrire(version, infos)
+
+    @staticmethod
+    def _exporter_numpy(export):
+        # Artefact du profil de scoring léger (NumPy seul), si le type de modèle le permet
+        try:
+            export()
+        except ModeleNonExportable as e:
+            print(f"Pas d'artefact NumPy: {e}")
+
+    def promouvoir(self):
+        """
+        Met le candidat en production (l'ancienne version reste disponible pour un retour arrière)
+        """
+        def _promouvoir(manifeste):
+            if not manifeste['candidat']:
+                raise ValueError("Aucun candidat à promouvoir")
+            manifeste['precedents'].append(manifeste['live'])
+            manifeste['live'] = manifeste['candidat']
+            manifeste['candidat'] = None
+            manifeste['ombre'] = False
+            manifeste['pourcentage'] = 0
+        return self._modifier(_promouvoir)
+
+    def retour_arriere(self):
+        """
+        Rétablit immédiatement la version de production précédente
+        """
+        def _retour(manifeste):
+            if not manifeste['precedents']:
+                raise ValueError("Aucune version précédente")
+            manifeste['candidat'] = None
+            manifeste['ombre'] = False
+            manifeste['pourcentage'] = 0
+            manifeste['live'] = manifeste['precedents'].pop()
+        return self._modifier(_retour)
+
+    def definir_deploiement(self, pourcentage=None, ombre=None):
+        """
+        Règle la part d'élèves servis par le candidat et le scoring en ombre
+        """
+        def _regler(manifeste):
+            if pourcentage is not None:
+                manifeste['pourcentage'] = int(min(max(pourcentage, 0), 100))
+            if ombre is not None:
+                manifeste['ombre'] = bool(ombre)
+        return self._modifier(_regler)
+
+    def predicteur(self, version):
+        """
+        Prédicteur d'une version (chargé une seule fois par processus)
+        """
+        if version not in self._predicteurs:
+            with self._verrou:
+                if version not in self._predicteurs:
+                    self._predicteurs[version] = PredicteurDecrochage(
+                        str(self.repertoire / version / 'modele_decrochage.pkl')
+                    )
+        return self._predicteurs[version]
+
+    def initialiser_depuis(self, model_path):
+        """
+        Crée la première version à partir des fichiers historiques de model/ si le registre est vide
+        """
+        if self.manifeste()['live'] is None and Path(model_path).exists():
+            self.enregistrer(Path(model_path).parent, {'origine': str(model_path)}, version='v0')
+
+
+def part_deploiement(ids):
+    """
+    Rang stable 0-99 de chaque élève: un même élève est toujours servi par le même modèle
+    """
+    return np.array([zlib.crc32(str(i).encode()) % 100 for i in ids], dtype=int)
+
+
+class ServiceScoring:
+    def __init__(self, registre, taille_lot_ombre=TAILLE_LOT_OMBRE, journal_ombre=None):
+        """
+        Sert les prédictions du modèle en production, déploie le candidat sur une part
+        des élèves et le fait tourner en ombre (en parallèle, par lots) pour comparaison
+        """
+        self.registre = registre
+        self.taille_lot_ombre = taille_lot_ombre
+        self.journal_ombre = Path(journal_ombre or registre.repertoire / NOM_JOURNAL_OMBRE)
+        self._verrou = threading.Lock()
+        self._tampon = []
+        self._executeur = ThreadPoolExecutor(max_workers=1)
+
+    def predicteur_live(self):
+        return self.registre.predicteur(self.registre.manifeste()['live'])
+
+    def predire(self, data, ids=None):
+        """
+        Probabilités servies pour un lot d'élèves (production ou candidat selon le déploiement)
+        """
+        manifeste = self.registre.manifeste()
+        live, candidat = manifeste['live'], manifeste['candidat']
+        ids = list(ids) if ids is not None else [str(i) for i in range(len(data))]
+
+        probas_live = self.registre.predicteur(live).predict(data)
+        if not candidat:
+            return probas_live
+
+        # Déploiement progressif: le candidat sert la part d'élèves demandée
+        servis = probas_live.copy()
+        masque = part_deploiement(ids) < manifeste['pourcentage']
+        probas_candidat = None
+        if masque.any():
+            with instrumentation.chrono('registre.predict_candidat'):
+                probas_candidat = self.registre.predicteur(candidat).predict(data[masque].reset_index(drop=True))
+            servis[masque] = probas_candidat
+            self._journaliser(live, candidat, np.asarray(ids)[masque], probas_live[masque], probas_candidat)
+
+        # Ombre: les autres élèves sont rescorés par le candidat hors du chemin de réponse
+        if manifeste['ombre'] and (~masque).any():
+            self._mettre_en_ombre(live, candidat, data[~masque], np.asarray(ids)[~masque], probas_live[~masque])
+        return servis
+
+    def predire_lot(self, data, ids=None):
+        """
+        Valide un lot puis score uniquement les lignes conformes au schéma.
+        Retourne (probabilités, NaN pour les lignes rejetées ; ResultatValidation).
+        """
+        resultat = valider_lot(data)
+        probas = np.full(len(data), np.nan)
+        if resultat.valides.any():
+            ids = np.asarray(ids if ids is not None else [str(i) for i in range(len(data))])
+            probas[resultat.valides] = self.predire(resultat.lignes_valides(), ids=ids[resultat.valides])
+        return probas, resultat
+
+    def _mettre_en_ombre(self, live, candidat, data, ids, probas_live):
+        with self._verrou:
+            self._tampon.append((live, candidat, data.reset_index(drop=True), ids, probas_live))
+            n = sum(len(element[3]) for element in self._tampon)
+            if n < self.taille_lot_ombre:
+                return
+            lot, self._tampon = self._tampon, []
+        self._executeur.submit(self._scorer_lot, lot)
+
+    def vider(self):
+        """
+        Score immédiatement le tampon d'ombre (et attend la fin du scoring)
+        """
+        with self._verrou:
+            lot, self._tampon = self._tampon, []
+        if lot:
+            self._executeur.submit(self._scorer_lot, lot).result()
+
+    def _scorer_lot(self, lot):
+        # Regroupement par couple de versions: un seul predict_proba par couple
+        groupes = {}
+        for live, candidat, data, ids, probas_live in lot:
+            groupes.setdefault((live, candidat), []).append((data, ids, probas_live))
+        for (live, candidat), elements in groupes.items():
+            data = pd.concat([e[0] for e in elements], ignore_index=True)
+            ids = np.concatenate([e[1] for e in elements])
+            probas_live = np.concatenate([e[2] for e in elements])
+            with instrumentation.chrono('registre.predict_ombre'):
+                probas_candidat = self.registre.predicteur(candidat).predict(data)
+            self._journaliser(live, candidat, ids, probas_live, probas_candidat)
+
+    def _journaliser(self, live, candidat, ids, probas_live, probas_candidat):
+        horodatage = datetime.now().isoformat(timespec='seconds')
+        self.journal_ombre.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_ombre, 'a', encoding='utf-8') as f:
+            for id_eleve, p_live, p_candidat in zip(ids, probas_live, probas_candidat):
+                f.write(json.dumps({
+                    'horodatage': horodatage, 'id_eleve': str(id_eleve),
+                    'live': live, 'candidat': candidat,
+                    'proba_live': float(p_live), 'proba_candidat': float(p_candidat),
+                }) + '\n')
+
+
+def comparer_ombre(chemin_journal, candidat=None, seuil=0.5):
+    """
+    Compare les sorties production/candidat enregistrées (écart moyen, accord au seuil)
+    """
+    if not Path(chemin_journal).exists():
+        return None
+    df = pd.read_json(chemin_journal, lines=True)
+    if candidat:
+        df = df[df['candidat'] == candidat]
+    if df.empty:
+        return None
+    ecart = (df['proba_candidat'] - df['proba_live'])
+    return {
+        'n': len(df),
+        'ecart_moyen': float(ecart.mean()),
+        'ecart_absolu_moyen': float(ecart.abs().mean()),
+        'accord_seuil': float(((df['proba_live'] >= seuil) == (df['proba_candidat'] >= seuil)).mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestion du registre des modèles")
+    parser.add_argument('--registre', default='model/registre')
+    sous = parser.add_subparsers(dest='commande', required=True)
+    sous.add_parser('etat', help="Afficher le manifeste")
+    sous.add_parser('promouvoir', help="Mettre le candidat en production")
+    sous.add_parser('retour', help="Revenir à la version précédente")
+    deploiement = sous.add_parser('deploiement', help="Part des élèves servis par le candidat")
+    deploiement.add_argument('pourcentage', type=int)
+    ombre = sous.add_parser('ombre', help="Activer/désactiver le scoring en ombre")
+    ombre.add_argument('etat', choices=['on', 'off'])
+    sous.add_parser('comparer', help="Comparer production et candidat sur le journal d'ombre")
+    args = parser.parse_args()
+
+    registre = RegistreModeles(args.registre)
+    if args.commande == 'promouvoir':
+        registre.promouvoir()
+    elif args.commande == 'retour':
+        registre.retour_arriere()
+    elif args.commande == 'deploiement':
+        registre.definir_deploiement(pourcentage=args.pourcentage)
+    elif args.commande == 'ombre':
+        registre.definir_deploiement(ombre=args.etat == 'on')
+    elif args.commande == 'comparer':
+        print(comparer_ombre(registre.repertoire / NOM_JOURNAL_OMBRE, registre.manifeste()['candidat']))
+        return
+    print(json.dumps(registre.manifeste(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# Domaines des champs catégoriels (valeurs du formulaire et du jeu d'entraînement)
+NIVEAUX = ('3ème Humanités', '4ème Humanités')
+SEXES = ('Masculin', 'Féminin')
+AVIS_CONSEIL = ('Très Favorable', 'Favorable', 'Favorable avec mise en garde',
+                'Passable', 'Défavorable', 'Très Défavorable')
+
+# Schéma des 13 entrées du modèle: (champ, libellé, type, contrainte)
+#   'numerique': bornes (min, max), None = non borné
+#   'booleen': True/False ou 0/1
+#   'categorie': domaine des valeurs admises
+SCHEMA = [
+    ('age', 'Âge', 'numerique', (12, 25)),
+    ('redoublement', 'Redoublement', 'booleen', None),
+    ('statut_bourse', 'Boursier', 'booleen', None),
+    ('moyenne_t1', 'Moyenne T1', 'numerique', (0, 100)),
+    ('moyenne_t2', 'Moyenne T2', 'numerique', (0, 100)),
+    ('nb_matieres_echec', 'Matières en échec', 'numerique', (0, None)),
+    ('absences_t1', 'Absences T1', 'numerique', (0, None)),
+    ('absences_t2', 'Absences T2', 'numerique', (0, None)),
+    ('retards', 'Retards', 'numerique', (0, None)),
+    ('sanctions', 'Sanctions', 'numerique', (0, None)),
+    ('avis_conseil', 'Avis Conseil', 'categorie', AVIS_CONSEIL),
+    ('sexe', 'Sexe', 'categorie', SEXES),
+    ('niveau', 'Niveau', 'categorie', NIVEAUX),
+]
+CHAMPS = [champ for champ, _, _, _ in SCHEMA]
+
+# Deux bits par champ: valeur manquante (colonne absente ou nulle), puis valeur invalide
+BIT_MANQUANT = {champ: np.uint32(1 << (2 * i)) for i, champ in enumerate(CHAMPS)}
+BIT_INVALIDE = {champ: np.uint32(1 << (2 * i + 1)) for i, champ in enumerate(CHAMPS)}
+
+
+def _message_invalide(libelle, type_, contrainte):
+    if type_ == 'numerique':
+        minimum, maximum = contrainte
+        return f"{libelle}: doit être ≥ {minimum}" if maximum is None else f"{libelle}: hors de [{minimum}, {maximum}]"
+    if type_ == 'booleen':
+        return f"{libelle}: Oui/Non attendu"
+    return f"{libelle}: valeur inconnue"
+
+
+MESSAGES = {}
+for _champ, _libelle, _type, _contrainte in SCHEMA:
+    MESSAGES[BIT_MANQUANT[_champ]] = f"{_libelle}: valeur manquante"
+    MESSAGES[BIT_INVALIDE[_champ]] = _message_invalide(_libelle, _type, _contrainte)
+
+
+class DonneesInvalides(ValueError):
+    """
+    Levée quand des lignes ne respectent pas le schéma des entrées du modèle
+    """
+    def __init__(self, resultat):
+        self.resultat = resultat
+        n = int((~resultat.valides).sum())
+        premieres = '; '.join(resultat.erreurs()['Erreurs'].head(3))
+        super().__init__(f"{n} ligne(s) invalide(s): {premieres}")
+
+
+class ResultatValidation:
+    def __init__(self, donnees, masques):
+        """
+        Masque d'erreurs (bits BIT_MANQUANT / BIT_INVALIDE) de chaque ligne d'un lot
+        """
+        self.donnees = donnees
+        self.masques = masques
+        self.valides = masques == 0
+
+    @property
+    def tout_valide(self):
+        return bool(self.valides.all())
+
+    def lignes_valides(self):
+        return self.donnees[self.valides].reset_index(drop=True)
+
+    def erreurs(self):
+        """
+        Lignes rejetées (position dans le lot) avec la liste lisible de leurs erreurs
+        """
+        positions = np.flatnonzero(~self.valides)
+        masques = self.masques[positions]
+        # Décodage par bit (26 passes vectorisées), pas par ligne
+        messages = [[] for _ in positions]
+        for bit, message in MESSAGES.items():
+            for k in np.flatnonzero(masques & bit):
+                messages[k].append(message)
+        return pd.DataFrame({'Ligne': positions, 'Erreurs': ['; '.join(m) for m in messages]})
+
+
+def _verifier_numerique(valeurs, contrainte):
+    nombres = pd.to_numeric(valeurs, errors='coerce').to_numpy(dtype=float)
+    invalide = np.isnan(nombres)
+    minimum, maximum = contrainte
+    with np.errstate(invalid='ignore'):
+        if minimum is not None:
+            invalide |= nombres < minimum
+        if maximum is not None:
+            invalide |= nombres > maximum
+    return invalide
+
+
+def _verifier_booleen(valeurs):
+    return ~valeurs.isin([True, False, 0, 1]).to_numpy()
+
+
+def _verifier_categorie(valeurs, domaine):
+    return ~valeurs.isin(domaine).to_numpy()
+
+
+def valider_lot(data):
+    """
+    Valide un lot complet (DataFrame aux colonnes de l'application) avec des
+    opérations vectorisées par colonne. Retourne un ResultatValidation.
+    """
+    n = len(data)
+    masques = np.zeros(n, dtype=np.uint32)
+    for champ, _, type_, contrainte in SCHEMA:
+        if champ not in data.columns:
+            masques |= BIT_MANQUANT[champ]
+            continue
+        valeurs = data[champ]
+        manquant = valeurs.isna().to_numpy()
+        if type_ == 'numerique':
+            invalide = _verifier_numerique(valeurs, contrainte)
+        elif type_ == 'booleen':
+            invalide = _verifier_booleen(valeurs)
+        else:
+            invalide = _verifier_categorie(valeurs, contrainte)
+        masques[manquant] |= BIT_MANQUANT[champ]
+        masques[invalide & ~manquant] |= BIT_INVALIDE[champ]
+    return ResultatValidation(data, masques)
@@ -0,0 +1,86 @@
+import numpy as np
+
+# Seuils par défaut appliqués aux probabilités (calibrées si une table est disponible)
+SEUIL_MODERE = 0.4
+SEUIL_ELEVE = 0.7
+SEUIL_RISQUE = 0.5
+
+
+def niveau_risque(proba, seuil_modere=SEUIL_MODERE, seuil_eleve=SEUIL_ELEVE):
+    """
+    Classe une probabilité en 'eleve', 'modere' ou 'faible'
+    (un tableau de probabilités donne un tableau de niveaux)
+    """
+    if np.ndim(proba) > 0:
+        probas = np.asarray(proba, dtype=float)
+        return np.select([probas >= seuil_eleve, probas >= seuil_modere], ['eleve', 'modere'], 'faible')
+    if proba >= seuil_eleve:
+        return 'eleve'
+    if proba >= seuil_modere:
+        return 'modere'
+    return 'faible'
+
+
+def seuil_par_capacite(probas, capacite):
+    """
+    Seuil de probabilité qui retient les `capacite` élèves les plus à risque
+    (ex: « les 200 élèves que l'on peut suivre »). À titre indicatif seulement:
+    en cas d'égalité, `probas >= seuil` peut dépasser la capacité; la sélection
+    elle-même passe par le rang (selection_par_capacite)
+    """
+    probas = np.asarray(probas, dtype=float)
+    n = len(probas)
+    if capacite <= 0 or n == 0:
+        return 1.0
+    if capacite >= n:
+        return float(probas.min())
+    # k-ième plus grande valeur en O(n) sans tri complet
+    return float(np.partition(probas, n - capacite)[n - capacite])
+
+
+def selection_par_capacite(probas, groupes, capacites):
+    """
+    Sélectionne, dans chaque groupe (école), les élèves les plus à risque dans
+    la limite de la capacité du groupe. Retourne un masque booléen et le seuil
+    effectif de chaque groupe.
+    """
+    probas = np.asarray(probas, dtype=float)
+    groupes = np.asarray(groupes)
+    codes, inverse = np.unique(groupes, return_inverse=True)
+
+    if isinstance(capacites, dict):
+        capacite_groupe = np.array([capacites.get(code, 0) for code in codes], dtype=int)
+    else:
+        capacite_groupe = np.broadcast_to(np.asarray(capacites, dtype=int), codes.shape)
+
+    # Tri par groupe puis par probabilité décroissante
+    ordre = np.lexsort((-probas, inverse))
+    groupes_tries = inverse[ordre]
+    debuts = np.searchsorted(groupes_tries, np.arange(len(codes)))
+    rangs = np.arange(len(probas)) - debuts[groupes_tries]
+
+    masque = np.zeros(len(probas), dtype=bool)
+    masque[ordre] = rangs < capacite_groupe[groupes_tries]
+
+    # Seuil effectif = plus faible probabilité retenue dans chaque groupe
+    seuils = np.ones(len(codes))
+    np.minimum.at(seuils, inverse[masque], probas[masque])
+    return masque, dict(zip(codes.tolist(), seuils.tolist()))
+
+
+def selection_suivi(probas, groupes, capacites, seuil=SEUIL_RISQUE):
+    """
+    Élèves retenus pour le suivi, école par école: les plus à risque dans la limite
+    de la capacité de l'école (par rang, égalités comprises), ou le seuil fixe pour
+    les écoles sans capacité renseignée (0 ou absente). Retourne le masque et le
+    seuil effectif de chaque école.
+    """
+    probas = np.asarray(probas, dtype=float)
+    groupes = np.asarray(groupes)
+    capacites = {groupe: int(c) for groupe, c in capacites.items() if c and c > 0}
+    masque, seuils = selection_par_capacite(probas, groupes, capacites)
+    fixe = ~np.isin(groupes, list(capacites))
+    masque[fixe] = probas[fixe] >= seuil
+    for groupe in np.unique(groupes[fixe]).tolist():
+        seuils[groupe] = seuil
+    return masque, seuils
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from src.models.predicteur import CORRESPONDANCE_COLONNES, COLONNES_NUMERIQUES
+from src.models.schema import SCHEMA, AVIS_CONSEIL, valider_lot, DonneesInvalides
+from src.models.seuils import SEUIL_ELEVE
+from src.monitoring.instrumentation import instrumentation
+
+OPERATIONS = ('ajouter', 'multiplier', 'fixer')
+
+# Champs numériques perturbables et leurs bornes (celles du schéma des entrées)
+BORNES = {champ: contrainte for champ, _, type_, contrainte in SCHEMA if type_ == 'numerique'}
+BOOLEENS = [champ for champ, _, type_, _ in SCHEMA if type_ == 'booleen']
+CHAMPS_SIMULABLES = list(BORNES) + BOOLEENS + ['avis_conseil']
+
+PREFIXE_AVIS = 'Avis_Conseil_Classe_T1_'
+
+
+def scenario(nom, modifications, niveaux=None):
+    """
+    Décrit un scénario: liste de (champ, opération, valeur) appliquée aux élèves des niveaux
+    donnés (tous si None). Ex: scenario("-5 absences", [('absences_t2', 'ajouter', -5)], ['4ème Humanités'])
+    """
+    for champ, operation, _ in modifications:
+        if champ not in CHAMPS_SIMULABLES:
+            raise ValueError(f"Champ non simulable: {champ}")
+        if operation not in OPERATIONS:
+            raise ValueError(f"Opération inconnue: {operation}")
+        if champ not in BORNES and operation != 'fixer':
+            raise ValueError(f"Seule l'opération 'fixer' s'applique à {champ}")
+    return {'nom': nom, 'modifications': list(modifications), 'niveaux': niveaux}
+
+
+class Simulateur:
+    def __init__(self, predicteur, cohorte):
+        """
+        Prépare une cohorte (DataFrame aux champs de l'application) pour la simulation:
+        la matrice de base est prétraitée une seule fois, sans standardisation,
+        pour que les perturbations s'expriment en unités réelles
+        """
+        resultat = valider_lot(cohorte)
+        if not resultat.tout_valide:
+            raise DonneesInvalides(resultat)
+        self.predicteur = predicteur
+        self.cohorte = cohorte.reset_index(drop=True)
+        base = predicteur.preprocess_data(self.cohorte, standardiser=False)
+        self.colonnes = list(base.columns)
+        self.base = base.to_numpy(dtype=float)
+        self.niveaux = self.cohorte['niveau'].to_numpy()
+        self._indice = {colonne: j for j, colonne in enumerate(self.colonnes)}
+
+        # Standardisation appliquée à toute la pile en une opération
+        scaler = predicteur.scaler
+        noms = list(getattr(scaler, 'feature_names_in_', COLONNES_NUMERIQUES))
+        self._numeriques = np.array([self._indice[nom] for nom in noms])
+        self._moyennes = scaler.mean_
+        self._echelles = scaler.scale_
+
+    def _col(self, champ):
+        return self._indice[CORRESPONDANCE_COLONNES.get(champ, champ)]
+
+    def _appliquer(self, matrice, scenario):
+        lignes = np.ones(len(matrice), dtype=bool)
+        if scenario['niveaux']:
+            lignes = np.isin(self.niveaux, list(scenario['niveaux']))
+        for champ, operation, valeur in scenario['modifications']:
+            if champ == 'avis_conseil':
+                if valeur not in AVIS_CONSEIL:
+                    raise ValueError(f"Avis inconnu: {valeur}")
+                for avis in AVIS_CONSEIL:
+                    matrice[lignes, self._indice[PREFIXE_AVIS + avis]] = float(avis == valeur)
+                continue
+            j = self._col(champ)
+            if operation == 'ajouter':
+                matrice[lignes, j] += valeur
+            elif operation == 'multiplier':
+                matrice[lignes, j] *= valeur
+            else:
+                matrice[lignes, j] = float(valeur)
+            if champ in BORNES:
+                minimum, maximum = BORNES[champ]
+                matrice[lignes, j] = np.clip(matrice[lignes, j], minimum, maximum)
+
+    def _deriver(self, matrice):
+        # Variables dérivées recalculées après perturbation (mêmes formules que le prétraitement)
+        i = self._indice
+        t1, t2 = matrice[:, i['Moyenne_Generale_T1']], matrice[:, i['Moyenne_Generale_T2']]
+        a1, a2 = matrice[:, i['Nombre_Absences_Injustifiees_T1']], matrice[:, i['Nombre_Absences_Injustifiees_T2']]
+        matrice[:, i['evolution_moyenne']] = t2 - t1
+        matrice[:, i['evolution_absences']] = a2 - a1
+        matrice[:, i['total_absences']] = a1 + a2
+
+    def probabilites(self, scenarios):
+        """
+        Probabilités de la cohorte pour la situation actuelle puis chaque scénario:
+        tableau (1 + nb scénarios, nb élèves), obtenu en un seul predict_proba
+        """
+        n = len(self.base)
+        pile = np.empty(((1 + len(scenarios)) * n, len(self.colonnes)))
+        pile[:n] = self.base
+        for k, sc in enumerate(scenarios, start=1):
+            bloc = pile[k * n:(k + 1) * n]
+            bloc[:] = self.base
+            self._appliquer(bloc, sc)
+            self._deriver(bloc)
+        pile[:, self._numeriques] = (pile[:, self._numeriques] - self._moyennes) / self._echelles
+        with instrumentation.chrono('simulation.predict_proba'):
+            probas = self.predicteur.predict_features(pd.DataFrame(pile, columns=self.colonnes))
+        return probas.reshape(1 + len(scenarios), n)
+
+    def simuler(self, scenarios, seuil=SEUIL_ELEVE):
+        """
+        Variation de la distribution du risque par niveau pour chaque scénario
+        (risque moyen, élèves au-dessus du seuil, avant/après)
+        """
+        probas = self.probabilites(scenarios)
+        base, simules = probas[0], probas[1:]
+        n = len(base)
+        long = pd.DataFrame({
+            'scenario': np.repeat([sc['nom'] for sc in scenarios], n),
+            'niveau': np.tile(self.niveaux, len(scenarios)),
+            'risque_base': np.tile(base, len(scenarios)),
+            'risque': simules.ravel(),
+        })
+        long['a_risque_base'] = long['risque_base'] >= seuil
+        long['a_risque'] = long['risque'] >= seuil
+        rapport = long.groupby(['scenario', 'niveau'], sort=False).agg(
+            effectif=('risque', 'size'),
+            risque_moyen_base=('risque_base', 'mean'),
+            risque_moyen=('risque', 'mean'),
+            a_risque_base=('a_risque_base', 'sum'),
+            a_risque=('a_risque', 'sum'),
+        ).reset_index()
+        rapport['variation_a_risque'] = rapport['a_risque'] - rapport['a_risque_base']
+        rapport['variation_risque_moyen'] = rapport['risque_moyen'] - rapport['risque_moyen_base']
+        return rapport
@@ -30,9 +30,16 @@ def load_data(file_path):
     
     return df
 
-def preprocess_data(df):
+# Variables numériques standardisées (identiques au prédicteur)
+NUMERIC_FEATURES = ['Age', 'Moyenne_Generale_T1', 'Moyenne_Generale_T2', 
+                    'Nombre_Matieres_Echec_T1', 'Nombre_Absences_Injustifiees_T1',
+                    'Nombre_Absences_Injustifiees_T2', 'Nombre_Retards_T1',
+                    'Nombre_Sanctions_Disciplinaires_T1', 'evolution_moyenne',
+                    'evolution_absences', 'total_absences']
+
+def build_features(df):
     """
-    Prétraite les données pour l'entraînement
+    Construit les variables dérivées et l'encodage, sans division ni standardisation
     """
     df_processed = df.copy()
     
@@ -52,18 +59,20 @@ def preprocess_data(df):
     X = df_processed.drop('Statut_Decrochage', axis=1)
     y = df_processed['Statut_Decrochage']
     
+    return X, y
+
+def preprocess_data(df):
+    """
+    Prétraite les données pour l'entraînement
+    """
+    X, y = build_features(df)
+    
     # Division train/test
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Standardisation des variables numériques
     scaler = StandardScaler()
-    numeric_features = ['Age', 'Moyenne_Generale_T1', 'Moyenne_Generale_T2', 
-                       'Nombre_Matieres_Echec_T1', 'Nombre_Absences_Injustifiees_T1',
-                       'Nombre_Absences_Injustifiees_T2', 'Nombre_Retards_T1',
-                       'Nombre_Sanctions_Disciplinaires_T1', 'evolution_moyenne',
-                       'evolution_absences', 'total_absences']
-    
-    X_train[numeric_features] = scaler.fit_transform(X_train[numeric_features])
-    X_test[numeric_features] = scaler.transform(X_test[numeric_features])
+    X_train[NUMERIC_FEATURES] = scaler.fit_transform(X_train[NUMERIC_FEATURES])
+    X_test[NUMERIC_FEATURES] = scaler.transform(X_test[NUMERIC_FEATURES])
     
     return X_train, X_test, y_train, y_test, scaler
\ No newline at end of file
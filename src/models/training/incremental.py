@@ -0,0 +1,298 @@
+import os
+import sys
+import copy
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from sklearn.model_selection import train_test_split
+from data_loader import load_data, build_features, NUMERIC_FEATURES
+from model_evaluation import compute_metrics
+
+# Accès au package src (registre, calibration et référence de dérive)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from src.models.calibration import charger_calibration, appliquer_calibration, ajuster_calibration
+from src.monitoring.derive import construire_reference, NOM_REFERENCE
+
+# Nom du magasin de caractéristiques, rangé dans le registre des modèles
+NOM_MAGASIN = 'magasin_caracteristiques.pkl'
+
+# Part d'arbres / d'itérations ajoutés à chaque mise à jour incrémentale
+CROISSANCE = 0.2
+
+# Plafond d'arbres / d'itérations: la taille du modèle et la latence de scoring restent bornées
+MAX_ESTIMATEURS = 500
+
+# Modèles dont la mise à jour conserve les arbres / coefficients déjà appris
+MODELES_A_ETAT = ('RandomForestClassifier', 'ExtraTreesClassifier', 'GradientBoostingClassifier',
+                  'LGBMClassifier', 'XGBClassifier')
+
+# Élèves nouveaux non vus nécessaires pour réajuster la calibration (les deux classes présentes)
+MIN_CALIBRATION = 50
+
+# En dessous, tous les nouveaux élèves servent à la mise à jour (pas d'évaluation tenue à l'écart)
+MIN_EVALUATION = 10
+
+
+class MagasinCaracteristiques:
+    def __init__(self, chemin):
+        """
+        Données d'entraînement déjà prétraitées (variables dérivées et encodage,
+        sans standardisation), enrichies au fil des trimestres sans tout recalculer
+        """
+        self.chemin = Path(chemin)
+        if self.chemin.exists():
+            contenu = joblib.load(self.chemin)
+            self.brut, self.X, self.y = contenu['brut'], contenu['X'], contenu['y']
+            self.empreintes = contenu['empreintes']
+        else:
+            self.brut, self.X, self.y = None, None, None
+            self.empreintes = set()
+
+    @property
+    def vide(self):
+        return self.X is None
+
+    def ajouter(self, df, empreintes):
+        """
+        Ajoute les lignes jamais vues (dédoublonnées par empreinte) et retourne
+        leurs caractéristiques (X, y) ainsi que les lignes brutes ajoutées
+        """
+        nouvelles = ~np.isin(empreintes, list(self.empreintes))
+        df = df[nouvelles].reset_index(drop=True)
+        if df.empty:
+            return None, None, df
+
+        X_nouveau, y_nouveau = build_features(df)
+        if not self.vide:
+            inconnues = set(X_nouveau.columns) - set(self.X.columns)
+            if inconnues:
+                raise ValueError(f"Modalités absentes des données d'origine: {sorted(inconnues)}")
+            # Modalité absente du lot: colonne indicatrice à 0 (encodage one-hot)
+            X_nouveau = X_nouveau.reindex(columns=self.X.columns, fill_value=0)
+
+        self.brut = df if self.brut is None else pd.concat([self.brut, df], ignore_index=True)
+        self.X = X_nouveau if self.X is None else pd.concat([self.X, X_nouveau], ignore_index=True)
+        self.y = y_nouveau if self.y is None else pd.concat([self.y, y_nouveau], ignore_index=True)
+        self.empreintes.update(empreintes[nouvelles].tolist())
+        return X_nouveau, y_nouveau, df
+
+    def sauvegarder(self):
+        self.chemin.parent.mkdir(parents=True, exist_ok=True)
+        temporaire = self.chemin.with_suffix('.tmp')
+        joblib.dump({'brut': self.brut, 'X': self.X, 'y': self.y, 'empreintes': self.empreintes}, temporaire)
+        os.replace(temporaire, self.chemin)
+
+
+def charger_etiquetes(chemin_csv):
+    """
+    Lignes étiquetées d'un CSV et leur empreinte (calculée sur la ligne complète,
+    identifiant et année compris, pour ne pas confondre deux élèves identiques)
+    """
+    empreintes = pd.util.hash_pandas_object(pd.read_csv(chemin_csv), index=False).to_numpy()
+    return load_data(chemin_csv), empreintes
+
+
+def mettre_a_jour_scaler(scaler, X_nouveau):
+    """
+    Met à jour moyenne et variance du scaler avec les nouvelles lignes (partial_fit,
+    formules de moyenne/variance courantes), sans repasser sur l'historique
+    """
+    scaler = copy.deepcopy(scaler)
+    scaler.partial_fit(X_nouveau[NUMERIC_FEATURES])
+    return scaler
+
+
+def conserve_etat(model):
+    """
+    Vrai si la mise à jour repart des estimateurs déjà appris (warm_start d'arbres,
+    boosting poursuivi, partial_fit): ils attendent la standardisation d'origine
+    """
+    return hasattr(model, 'partial_fit') or type(model).__name__ in MODELES_A_ETAT
+
+
+def standardiser(X, scaler):
+    X = X.copy()
+    X[NUMERIC_FEATURES] = scaler.transform(X[NUMERIC_FEATURES])
+    return X
+
+
+def _ajout(actuels, croissance, max_estimateurs):
+    """
+    Estimateurs à ajouter (0 quand le plafond est atteint)
+    """
+    return max(0, min(max(1, int(actuels * croissance)), max_estimateurs - actuels))
+
+
+def reentrainer(model, X, y, X_nouveau, y_nouveau, croissance=CROISSANCE, max_estimateurs=MAX_ESTIMATEURS):
+    """
+    Met à jour une copie du modèle en repartant de son état quand il le permet:
+    - partial_fit (modèles linéaires SGD, Naive Bayes): nouvelles lignes seulement;
+    - RandomForest / GradientBoosting: warm_start, arbres ou étapes supplémentaires;
+    - LightGBM (init_model) / XGBoost (xgb_model): itérations supplémentaires;
+    - LogisticRegression: warm_start (coefficients actuels comme point de départ).
+    Les autres modèles sont réentraînés sur tout le magasin (déjà prétraité).
+    Le nombre d'arbres / d'itérations ne dépasse jamais max_estimateurs: au plafond,
+    une forêt remplace ses arbres les plus anciens par des arbres neufs, et un modèle
+    de boosting (étapes non retirables) est réentraîné en entier avec max_estimateurs.
+    Retourne (modèle, mode de mise à jour).
+    """
+    model = copy.deepcopy(model)
+    nom = type(model).__name__
+
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X_nouveau, y_nouveau, classes=np.array([0, 1]))
+        return model, 'partial_fit'
+
+    if nom in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+        actuels = len(model.estimators_)
+        supplementaires = _ajout(actuels, croissance, max_estimateurs)
+        retires = 0
+        if supplementaires == 0:
+            # Rotation: autant d'arbres neufs que d'arbres les plus anciens retirés
+            retires = supplementaires = max(1, int(max_estimateurs * croissance))
+            if actuels > max_estimateurs:
+                retires += actuels - max_estimateurs
+        model.set_params(warm_start=True, n_estimators=actuels + supplementaires)
+        model.fit(X, y)
+        if retires:
+            model.estimators_ = model.estimators_[retires:]
+            model.set_params(n_estimators=len(model.estimators_))
+            return model, f'warm_start (+{supplementaires}, -{retires} anciens)'
+        return model, f'warm_start (+{supplementaires})'
+
+    if nom == 'GradientBoostingClassifier':
+        supplementaires = _ajout(model.n_estimators, croissance, max_estimateurs)
+        if supplementaires == 0:
+            model.set_params(warm_start=False, n_estimators=max_estimateurs)
+            model.fit(X, y)
+            return model, f'réentraînement complet (plafond {max_estimateurs})'
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + supplementaires)
+        model.fit(X, y)
+        return model, f'warm_start (+{supplementaires})'
+
+    if nom == 'LGBMClassifier':
+        ancien = model.booster_
+        supplementaires = _ajout(ancien.num_trees(), croissance, max_estimateurs)
+        if supplementaires == 0:
+            model.set_params(n_estimators=max_estimateurs)
+            model.fit(X, y)
+            return model, f'réentraînement complet (plafond {max_estimateurs})'
+        model.set_params(n_estimators=supplementaires)
+        model.fit(X, y, init_model=ancien)
+        return model, 'init_model'
+
+    if nom == 'XGBClassifier':
+        ancien = model.get_booster()
+        supplementaires = _ajout(ancien.num_boosted_rounds(), croissance, max_estimateurs)
+        if supplementaires == 0:
+            model.set_params(n_estimators=max_estimateurs)
+            model.fit(X, y)
+            return model, f'réentraînement complet (plafond {max_estimateurs})'
+        model.set_params(n_estimators=supplementaires)
+        model.fit(X, y, xgb_model=ancien)
+        return model, 'xgb_model'
+
+    if 'warm_start' in model.get_params():
+        model.set_params(warm_start=True)
+        model.fit(X, y)
+        return model, 'warm_start'
+
+    model.fit(X, y)
+    return model, 'réentraînement complet'
+
+
+def recalibrer(calibration, probas, y, version):
+    """
+    Réajuste la table de calibration (même méthode) sur des probabilités hors échantillon.
+    Retourne (table, origine) ; la table d'origine est reprise si l'échantillon est insuffisant.
+    """
+    if calibration is None:
+        return None, 'aucune'
+    y = np.asarray(y)
+    if len(y) < MIN_CALIBRATION or len(np.unique(y)) < 2:
+        print(f"Calibration reprise de {version} sans réajustement ({len(y)} élèves tenus à l'écart)")
+        return calibration, f'reprise de {version}'
+    return ajuster_calibration(probas, y, methode=calibration['methode']), 'réajustée'
+
+
+def entrainement_incremental(chemin_csv, registre, chemin_initial=None, version=None, croissance=CROISSANCE,
+                             max_estimateurs=MAX_ESTIMATEURS):
+    """
+    Ajoute les élèves nouvellement étiquetés au magasin et enregistre une version
+    mise à jour du modèle (production par défaut) comme candidate dans le registre.
+    Le scaler d'origine est conservé quand le modèle garde ses arbres ou coefficients
+    (leurs seuils ont été appris sur cette standardisation); il n'est mis à jour que
+    lorsque le modèle est réentraîné en entier. La calibration est réajustée sur les
+    nouveaux élèves tenus à l'écart, ou reprise telle quelle (et signalée) s'ils sont trop peu.
+    """
+    debut = time.perf_counter()
+    version = version or registre.manifeste()['live']
+    dossier = registre.repertoire / version
+    model = joblib.load(dossier / 'modele_decrochage.pkl')
+    scaler = joblib.load(dossier / 'scaler.pkl')
+    calibration = charger_calibration(dossier)
+
+    magasin = MagasinCaracteristiques(registre.repertoire / NOM_MAGASIN)
+    if magasin.vide and chemin_initial:
+        # Premier passage: le jeu d'origine est prétraité une fois pour toutes
+        magasin.ajouter(*charger_etiquetes(chemin_initial))
+
+    X_nouveau, y_nouveau, _ = magasin.ajouter(*charger_etiquetes(chemin_csv))
+    if X_nouveau is None:
+        print("Aucun nouvel élève étiqueté: rien à mettre à jour.")
+        return None
+    print(f"{len(X_nouveau)} nouveaux élèves ajoutés au magasin ({len(magasin.X)} au total)")
+
+    # Évaluation sur une partie des nouvelles lignes, jamais vue par le modèle mis à jour
+    if len(X_nouveau) >= MIN_EVALUATION:
+        stratifier = y_nouveau if y_nouveau.nunique() > 1 and y_nouveau.value_counts().min() >= 2 else None
+        idx_maj, idx_eval = train_test_split(np.arange(len(X_nouveau)), test_size=0.2, random_state=42,
+                                             stratify=stratifier)
+    else:
+        print(f"Moins de {MIN_EVALUATION} nouveaux élèves: mise à jour sans évaluation tenue à l'écart")
+        idx_maj, idx_eval = np.arange(len(X_nouveau)), np.array([], dtype=int)
+    debut_nouveaux = len(magasin.X) - len(X_nouveau)
+    masque = np.ones(len(magasin.X), dtype=bool)
+    masque[debut_nouveaux + idx_eval] = False
+
+    colonnes = list(getattr(model, 'feature_names_in_', magasin.X.columns))
+    y_eval = magasin.y[~masque]
+    # Modèle actuel évalué avec son propre scaler (AUC sur les scores bruts: la calibration,
+    # réajustée sur ces mêmes élèves, ne doit pas entrer dans la comparaison)
+    brutes_avant = np.array([])
+    if len(idx_eval):
+        brutes_avant = model.predict_proba(standardiser(magasin.X.loc[~masque, colonnes], scaler))[:, 1]
+
+    # Standardisation cohérente avec les estimateurs conservés
+    if not conserve_etat(model):
+        scaler = mettre_a_jour_scaler(scaler, X_nouveau)
+    X = standardiser(magasin.X[colonnes], scaler)
+    X_eval = X[~masque]
+    model, mode = reentrainer(model, X[masque], magasin.y[masque],
+                             X.iloc[debut_nouveaux + idx_maj], magasin.y.iloc[debut_nouveaux + idx_maj],
+                             croissance=croissance, max_estimateurs=max_estimateurs)
+    brutes_apres = model.predict_proba(X_eval)[:, 1] if len(idx_eval) else np.array([])
+    calibration, origine_calibration = recalibrer(calibration, brutes_apres, y_eval, version)
+    probas_apres = appliquer_calibration(brutes_apres, calibration)
+    infos = {'modele': type(model).__name__, 'origine': version, 'mise_a_jour': mode,
+             'nouveaux_eleves': int(len(X_nouveau)), 'calibration': origine_calibration}
+    # AUC définie seulement si les élèves tenus à l'écart comptent les deux classes
+    if y_eval.nunique() > 1:
+        auc_avant = compute_metrics(y_eval, brutes_avant)['auc_roc']
+        auc_apres = compute_metrics(y_eval, brutes_apres)['auc_roc']
+        infos['auc_roc'] = float(auc_apres)
+        print(f"Mise à jour ({mode}) : AUC-ROC sur les nouveaux élèves {auc_avant:.3f} -> {auc_apres:.3f}")
+    else:
+        print(f"Mise à jour ({mode}) : AUC-ROC non calculable ({len(y_eval)} élèves tenus à l'écart, deux classes nécessaires)")
+
+    # Risque de référence: élèves tenus à l'écart, ou tout le magasin sans évaluation séparée
+    if not len(idx_eval):
+        probas_apres = appliquer_calibration(model.predict_proba(X)[:, 1], calibration)
+    reference = construire_reference(magasin.brut, probas_apres)
+    nouvelle = registre.enregistrer_objets(model, scaler, calibration, infos=infos,
+                                           annexes={NOM_REFERENCE: reference})
+    magasin.sauvegarder()
+    print(f"Version {nouvelle} enregistrée en {time.perf_counter() - debut:.1f} s")
+    return nouvelle
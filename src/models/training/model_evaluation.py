@@ -1,24 +1,115 @@
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-from sklearn.metrics import confusion_matrix, roc_auc_score, classification_report
+from sklearn.metrics import classification_report
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from scipy.stats import rankdata
+from joblib import Parallel, delayed
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from data_loader import NUMERIC_FEATURES
 
-def evaluate_model(model, X_test, y_test, model_name=""):
+METRIC_NAMES = ['accuracy', 'precision', 'recall', 'f1', 'auc_roc']
+
+def compute_metrics(y_true, y_proba, threshold=0.5):
+    """
+    Calcule toutes les métriques à partir des seules probabilités.
+    Accepte des tableaux 1D (un jeu) ou 2D (un jeu par ligne, ex: bootstrap).
+    """
+    y_true = np.asarray(y_true).astype(bool)
+    y_proba = np.asarray(y_proba, dtype=float)
+    y_pred = y_proba >= threshold
+    
+    # Matrice de confusion par comptage vectorisé
+    tp = np.sum(y_pred & y_true, axis=-1)
+    fp = np.sum(y_pred & ~y_true, axis=-1)
+    fn = np.sum(~y_pred & y_true, axis=-1)
+    tn = np.sum(~y_pred & ~y_true, axis=-1)
+    n = y_true.shape[-1]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        accuracy = (tp + tn) / n
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        
+        # AUC-ROC via la statistique de Mann-Whitney (rangs moyens pour les ex aequo)
+        ranks = rankdata(y_proba, axis=-1)
+        n_pos = y_true.sum(axis=-1)
+        n_neg = n - n_pos
+        auc_roc = (np.sum(ranks * y_true, axis=-1) - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+    
+    return {
+        'accuracy': accuracy,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'auc_roc': auc_roc,
+        'confusion_matrix': np.array([[tn, fp], [fn, tp]])
+    }
+
+def bootstrap_ci(y_true, y_proba, n_bootstrap=1000, alpha=0.05, threshold=0.5, random_state=42, batch_size=200):
+    """
+    Intervalles de confiance bootstrap des métriques (rééchantillonnage vectorisé)
+    """
+    y_true = np.asarray(y_true)
+    y_proba = np.asarray(y_proba, dtype=float)
+    rng = np.random.default_rng(random_state)
+    n = len(y_true)
+    
+    samples = {name: [] for name in METRIC_NAMES}
+    for start in range(0, n_bootstrap, batch_size):
+        size = min(batch_size, n_bootstrap - start)
+        # Une ligne d'indices par réplique bootstrap
+        idx = rng.integers(0, n, size=(size, n))
+        metrics = compute_metrics(y_true[idx], y_proba[idx], threshold)
+        for name in METRIC_NAMES:
+            samples[name].append(metrics[name])
+    
+    ci = {}
+    for name in METRIC_NAMES:
+        values = np.concatenate(samples[name])
+        values = values[~np.isnan(values)]
+        low, high = np.percentile(values, [100 * alpha / 2, 100 * (1 - alpha / 2)])
+        ci[name] = (float(low), float(high))
+    return ci
+
+def _graphiques():
+    """
+    Import différé de matplotlib/seaborn: seuls les graphiques en ont besoin
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+def save_confusion_matrix(cm, model_name=""):
+    """
+    Sauvegarde la matrice de confusion en image
+    """
+    plt, sns = _graphiques()
+    plt.figure(figsize=(8, 6))
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
+    plt.title(f'Matrice de confusion - {model_name}')
+    plt.ylabel('Valeur réelle')
+    plt.xlabel('Prédiction')
+    plt.savefig(f'confusion_matrix_{model_name.replace(" ", "_")}.png')
+    plt.close()
+
+def evaluate_model(model, X_test, y_test, model_name="", save_plots=False):
     """
     Évalue les performances d'un modèle
     """
-    # Prédictions
-    y_pred = model.predict(X_test)
+    # Une seule passe de prédiction: les classes sont déduites des probabilités
     y_pred_proba = model.predict_proba(X_test)[:, 1]
+    y_pred = (y_pred_proba >= 0.5).astype(int)
     
     # Calcul des métriques
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred)
-    recall = recall_score(y_test, y_pred)
-    f1 = f1_score(y_test, y_pred)
-    auc_roc = roc_auc_score(y_test, y_pred_proba)
+    metrics = compute_metrics(y_test, y_pred_proba)
+    accuracy = float(metrics['accuracy'])
+    precision = float(metrics['precision'])
+    recall = float(metrics['recall'])
+    f1 = float(metrics['f1'])
+    auc_roc = float(metrics['auc_roc'])
+    cm = metrics['confusion_matrix']
     
     # Affichage des résultats
     print(f"\nRésultats pour {model_name}:")
@@ -31,17 +122,9 @@ def evaluate_model(model, X_test, y_test, model_name=""):
     print("\nRapport de classification détaillé:")
     print(classification_report(y_test, y_pred))
     
-    # Matrice de confusion
-    cm = confusion_matrix(y_test, y_pred)
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
-    plt.title(f'Matrice de confusion - {model_name}')
-    plt.ylabel('Valeur réelle')
-    plt.xlabel('Prédiction')
-    
-    # Sauvegarder la matrice de confusion
-    plt.savefig(f'confusion_matrix_{model_name.replace(" ", "_")}.png')
-    plt.close()
+    # Matrice de confusion (image seulement sur demande)
+    if save_plots:
+        save_confusion_matrix(cm, model_name)
     
     return {
         'accuracy': accuracy,
@@ -52,7 +135,60 @@ def evaluate_model(model, X_test, y_test, model_name=""):
         'confusion_matrix': cm
     }
 
-def analyze_feature_importance(model, feature_names, model_name=""):
+def _fit_fold(model, X, y, train_idx, valid_idx):
+    """
+    Entraîne un clone du modèle sur un pli et retourne les probabilités de validation
+    """
+    X_train, X_valid = X.iloc[train_idx].copy(), X.iloc[valid_idx].copy()
+    
+    # Standardisation ajustée sur le seul pli d'entraînement (pas de fuite)
+    numeric = [col for col in NUMERIC_FEATURES if col in X.columns]
+    scaler = StandardScaler()
+    X_train[numeric] = scaler.fit_transform(X_train[numeric])
+    X_valid[numeric] = scaler.transform(X_valid[numeric])
+    
+    fold_model = clone(model)
+    fold_model.fit(X_train, y.iloc[train_idx])
+    return valid_idx, fold_model.predict_proba(X_valid)[:, 1]
+
+def evaluate_model_cv(model, X, y, model_name="", n_splits=5, n_jobs=-1, n_bootstrap=1000, random_state=42):
+    """
+    Évaluation par validation croisée stratifiée, plis entraînés en parallèle.
+    X et y sont les données non standardisées (voir data_loader.build_features).
+    """
+    y = pd.Series(np.asarray(y))
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    folds = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(model, X, y, train_idx, valid_idx)
+        for train_idx, valid_idx in skf.split(X, y)
+    )
+    
+    # Métriques par pli, puis probabilités hors-pli regroupées pour le bootstrap
+    y_values = y.to_numpy()
+    oof_proba = np.empty(len(y_values))
+    fold_metrics = []
+    for valid_idx, proba in folds:
+        oof_proba[valid_idx] = proba
+        metrics = compute_metrics(y_values[valid_idx], proba)
+        fold_metrics.append({name: float(metrics[name]) for name in METRIC_NAMES})
+    
+    fold_df = pd.DataFrame(fold_metrics)
+    ci = bootstrap_ci(y_values, oof_proba, n_bootstrap=n_bootstrap, random_state=random_state)
+    
+    print(f"\nValidation croisée ({n_splits} plis) pour {model_name}:")
+    for name in METRIC_NAMES:
+        low, high = ci[name]
+        print(f"{name}: {fold_df[name].mean():.3f} ± {fold_df[name].std():.3f} (IC 95 %: {low:.3f}–{high:.3f})")
+    
+    return {
+        'folds': fold_metrics,
+        'mean': fold_df.mean().to_dict(),
+        'std': fold_df.std().to_dict(),
+        'ci': ci,
+        'oof_proba': oof_proba
+    }
+
+def analyze_feature_importance(model, feature_names, model_name="", save_plots=False):
     """
     Analyse l'importance des caractéristiques pour les modèles qui le supportent
     """
@@ -77,7 +213,11 @@ def analyze_feature_importance(model, feature_names, model_name=""):
         for idx, row in feature_importance.head(10).iterrows():
             print(f"{row['feature']}: {row['importance']:.3f}")
         
-        # Visualisation
+        # Visualisation (sur demande)
+        if not save_plots:
+            return feature_importance
+        
+        plt, sns = _graphiques()
         plt.figure(figsize=(12, 6))
         sns.barplot(data=feature_importance.head(15), x='importance', y='feature')
         plt.title(f'Importance des caractéristiques - {model_name}')
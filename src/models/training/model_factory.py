@@ -1,10 +1,15 @@
+import importlib
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.svm import SVC
 from sklearn.neighbors import KNeighborsClassifier
-from xgboost import XGBClassifier
-from lightgbm import LGBMClassifier
+
+# Bibliothèques de boosting optionnelles (profil d'entraînement): ignorées si absentes
+OPTIONNELS = {
+    'XGBoost': ('xgboost', 'XGBClassifier'),
+    'LightGBM': ('lightgbm', 'LGBMClassifier'),
+}
 
 def get_models():
     """
@@ -16,11 +21,15 @@ def get_models():
         'Random Forest': RandomForestClassifier(random_state=42),
         'Gradient Boosting': GradientBoostingClassifier(random_state=42),
         'SVM': SVC(probability=True, random_state=42),
-        'KNN': KNeighborsClassifier(),
-        'XGBoost': XGBClassifier(random_state=42),
-        'LightGBM': LGBMClassifier(random_state=42)
+        'KNN': KNeighborsClassifier()
     }
-    
+
+    for nom, (module, classe) in OPTIONNELS.items():
+        try:
+            models[nom] = getattr(importlib.import_module(module), classe)(random_state=42)
+        except ImportError:
+            print(f"{nom} ignoré: le paquet '{module}' n'est pas installé (requirements-entrainement.txt)")
+
     return models
 
 def train_model(model, X_train, y_train):
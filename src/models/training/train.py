@@ -1,23 +1,41 @@
 import os
-import joblib
-from data_loader import load_data, preprocess_data
+import sys
+import argparse
+from sklearn.base import clone
+from sklearn.model_selection import cross_val_predict
+from sklearn.preprocessing import StandardScaler
+from data_loader import load_data, preprocess_data, build_features, NUMERIC_FEATURES
 from model_factory import get_models, train_model
-from model_evaluation import evaluate_model, analyze_feature_importance
+from model_evaluation import evaluate_model, evaluate_model_cv, analyze_feature_importance
 
-def main():
-    # Charger les données
-    data_path = "donnees_eleves_complet.csv"
-    print("Chargement des données...")
-    df = load_data(data_path)
-    
+# Accès au package src (calibration partagée avec le prédicteur)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+from src.models.calibration import ajuster_calibration, appliquer_calibration, score_brier, METHODES
+from src.models.registre import RegistreModeles
+from src.monitoring.derive import construire_reference, NOM_REFERENCE
+from incremental import entrainement_incremental, MAX_ESTIMATEURS
+
+def calibrate_model(model, X_train, y_train, X_test, y_test, methode):
+    """
+    Ajuste la table de calibration sur des probabilités hors-échantillon
+    (validation croisée sur le jeu d'entraînement)
+    """
+    probas_oof = cross_val_predict(clone(model), X_train, y_train, cv=5, method='predict_proba')[:, 1]
+    table = ajuster_calibration(probas_oof, y_train, methode=methode)
+
+    probas_test = model.predict_proba(X_test)[:, 1]
+    print(f"Brier (test) avant calibration : {score_brier(probas_test, y_test):.4f}")
+    print(f"Brier (test) après calibration : {score_brier(appliquer_calibration(probas_test, table), y_test):.4f}")
+    return table
+
+def selection_holdout(df, models, args):
+    """
+    Sélection sur une division 80/20: chaque modèle est entraîné sur 80 % et évalué sur 20 %
+    """
     # Prétraitement des données
     print("\nPrétraitement des données...")
     X_train, X_test, y_train, y_test, scaler = preprocess_data(df)
     
-    # Obtenir tous les modèles à tester
-    print("\nInitialisation des modèles...")
-    models = get_models()
-    
     # Stocker les résultats et les modèles entraînés
     results = {}
     trained_models = {}
@@ -29,40 +47,126 @@ def main():
         trained_models[name] = trained_model
         
         print(f"\nÉvaluation du modèle {name}...")
-        metrics = evaluate_model(trained_model, X_test, y_test, name)
-        results[name] = metrics
+        results[name] = evaluate_model(trained_model, X_test, y_test, name, save_plots=args.plots)
         
         # Analyser l'importance des caractéristiques
         print(f"\nAnalyse de l'importance des caractéristiques pour {name}...")
-        feature_importance = analyze_feature_importance(trained_model, X_train.columns, name)
+        analyze_feature_importance(trained_model, X_train.columns, name, save_plots=args.plots)
     
     # Sélectionner le meilleur modèle basé sur l'AUC-ROC
     best_model_name = max(results, key=lambda k: results[k]['auc_roc'])
     best_model = trained_models[best_model_name]
+    auc = results[best_model_name]['auc_roc']
+    print(f"\nMeilleur modèle : {best_model_name}")
+    print(f"Score AUC-ROC : {auc:.3f}")
+    
+    # Calibration des probabilités du meilleur modèle
+    calibration = None
+    if args.calibration != 'aucune':
+        print(f"\nCalibration ({args.calibration}) du modèle {best_model_name}...")
+        calibration = calibrate_model(best_model, X_train, y_train, X_test, y_test, args.calibration)
+    
+    risques_test = appliquer_calibration(best_model.predict_proba(X_test)[:, 1], calibration)
+    return best_model_name, best_model, scaler, calibration, risques_test, auc
+
+def selection_cv(df, models, args):
+    """
+    Sélection par validation croisée: seuls les K plis sont entraînés pour chaque modèle,
+    puis le modèle retenu est entraîné une fois sur toutes les données. La calibration
+    est ajustée sur ses probabilités hors-pli (aucun entraînement supplémentaire).
+    """
+    # Données complètes non standardisées: chaque pli ajuste son propre scaler
+    X_all, y_all = build_features(df)
+    
+    cv_results = {}
+    for name, model in models.items():
+        cv_results[name] = evaluate_model_cv(model, X_all, y_all, name, n_splits=args.cv,
+                                             n_jobs=args.n_jobs, n_bootstrap=args.bootstrap)
     
+    # Sélectionner le meilleur modèle sur la moyenne des plis
+    best_model_name = max(cv_results, key=lambda k: cv_results[k]['mean']['auc_roc'])
+    resultat = cv_results[best_model_name]
+    auc = resultat['mean']['auc_roc']
+    low, high = resultat['ci']['auc_roc']
     print(f"\nMeilleur modèle : {best_model_name}")
-    print(f"Score AUC-ROC : {results[best_model_name]['auc_roc']:.3f}")
+    print(f"Score AUC-ROC (validation croisée {args.cv} plis) : {auc:.3f} (IC 95 %: {low:.3f}–{high:.3f})")
     
-    # Sauvegarder le meilleur modèle et le scaler
+    # Entraînement final du modèle retenu sur toutes les données
+    print(f"\nEntraînement du modèle {best_model_name} sur toutes les données...")
+    scaler = StandardScaler()
+    X_full = X_all.copy()
+    X_full[NUMERIC_FEATURES] = scaler.fit_transform(X_all[NUMERIC_FEATURES])
+    best_model = train_model(clone(models[best_model_name]), X_full, y_all)
+    analyze_feature_importance(best_model, X_full.columns, best_model_name, save_plots=args.plots)
+    
+    calibration = None
+    if args.calibration != 'aucune':
+        print(f"\nCalibration ({args.calibration}) sur les probabilités hors-pli de {best_model_name}...")
+        calibration = ajuster_calibration(resultat['oof_proba'], y_all, methode=args.calibration)
+        print(f"Brier (hors-pli) avant calibration : {score_brier(resultat['oof_proba'], y_all):.4f}")
+        print(f"Brier (hors-pli) après calibration : "
+              f"{score_brier(appliquer_calibration(resultat['oof_proba'], calibration), y_all):.4f}")
+    
+    risques_oof = appliquer_calibration(resultat['oof_proba'], calibration)
+    return best_model_name, best_model, scaler, calibration, risques_oof, auc
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement des modèles de décrochage")
+    parser.add_argument('--calibration', choices=METHODES + ('aucune',), default='isotonique',
+                        help="Calibration des probabilités du meilleur modèle")
+    parser.add_argument('--cv', type=int, default=0, metavar='K',
+                        help="Sélection du modèle par validation croisée stratifiée à K plis (0 = simple division 80/20)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Plis entraînés en parallèle")
+    parser.add_argument('--bootstrap', type=int, default=1000, help="Répliques bootstrap pour les intervalles de confiance")
+    parser.add_argument('--plots', action='store_true', help="Sauvegarder les graphiques d'évaluation")
+    parser.add_argument('--incremental', metavar='CSV',
+                        help="Mise à jour incrémentale du modèle en production avec de nouveaux élèves étiquetés")
+    parser.add_argument('--version', help="Version de départ de la mise à jour incrémentale (production par défaut)")
+    parser.add_argument('--max-estimateurs', type=int, default=MAX_ESTIMATEURS,
+                        help="Plafond d'arbres / d'itérations après une mise à jour incrémentale")
+    args = parser.parse_args()
+
+    # Charger les données
+    data_path = "donnees_eleves_complet.csv"
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
-    print(f"Base directory: {base_dir}")
-    model_dir = os.path.join(base_dir, "model")
-    print(f"Model directory: {model_dir}")
-    
-    # S'assurer que le répertoire model existe
-    os.makedirs(model_dir, exist_ok=True)
-    
-    # Sauvegarder le modèle
-    model_path = os.path.join(model_dir, "modele_decrochage.pkl")
-    print(f"Model path: {model_path}")
-    joblib.dump(best_model, model_path)
-    print(f"Meilleur modèle sauvegardé dans {model_path}")
-    
-    # Sauvegarder le scaler
-    scaler_path = os.path.join(model_dir, "scaler.pkl")
-    print(f"Scaler path: {scaler_path}")
-    joblib.dump(scaler, scaler_path)
-    print(f"Scaler sauvegardé dans {scaler_path}")
+    
+    if args.incremental:
+        # Pas de réentraînement complet: magasin de caractéristiques + démarrage à chaud
+        registre = RegistreModeles(os.path.join(base_dir, "model", "registre"))
+        registre.initialiser_depuis(os.path.join(base_dir, "model", "modele_decrochage.pkl"))
+        entrainement_incremental(args.incremental, registre, chemin_initial=data_path, version=args.version,
+                                 max_estimateurs=args.max_estimateurs)
+        return
+    print("Chargement des données...")
+    df = load_data(data_path)
+    
+    # Obtenir tous les modèles à tester
+    print("\nInitialisation des modèles...")
+    models = get_models()
+    
+    if args.cv:
+        best_model_name, best_model, scaler, calibration, risques_reference, auc = selection_cv(df, models, args)
+    else:
+        best_model_name, best_model, scaler, calibration, risques_reference, auc = selection_holdout(df, models, args)
+    
+    # Enregistrer le meilleur modèle comme candidat dans le registre (la production n'est pas remplacée)
+    registre = RegistreModeles(os.path.join(base_dir, "model", "registre"))
+    # Le modèle historique de model/ devient la première version de production
+    registre.initialiser_depuis(os.path.join(base_dir, "model", "modele_decrochage.pkl"))
+    
+    # Statistiques de référence pour le suivi de dérive en production
+    reference = construire_reference(df, risques_reference)
+    
+    infos = {'modele': best_model_name, 'auc_roc': float(auc), 'calibration': args.calibration,
+             'evaluation': f"validation croisée {args.cv} plis" if args.cv else "division 80/20"}
+    version = registre.enregistrer_objets(best_model, scaler, calibration, infos=infos,
+                                          annexes={NOM_REFERENCE: reference})
+    print(f"Modèle enregistré dans {registre.repertoire / version}")
+    if registre.manifeste()['live'] == version:
+        print("Première version du registre: mise en production.")
+    else:
+        print("Candidat en ombre. Déploiement: python -m src.models.registre deploiement <pourcentage>, "
+              "mise en production: python -m src.models.registre promouvoir")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
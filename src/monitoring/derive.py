@@ -0,0 +1,362 @@
+import os
+import sys
+import json
+import math
+import uuid
+import atexit
+import argparse
+import threading
+from bisect import bisect_right
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Ajouter le répertoire racine au PYTHONPATH (exécution en ligne de commande)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+# Champs suivis (noms de l'application) et colonnes correspondantes du jeu d'entraînement
+CHAMPS_NUMERIQUES = {
+    'age': 'Age',
+    'moyenne_t1': 'Moyenne_Generale_T1',
+    'moyenne_t2': 'Moyenne_Generale_T2',
+    'nb_matieres_echec': 'Nombre_Matieres_Echec_T1',
+    'absences_t1': 'Nombre_Absences_Injustifiees_T1',
+    'absences_t2': 'Nombre_Absences_Injustifiees_T2',
+    'retards': 'Nombre_Retards_T1',
+    'sanctions': 'Nombre_Sanctions_Disciplinaires_T1',
+}
+CHAMPS_CATEGORIELS = {
+    'redoublement': 'Redoublement_Annee_Precedente',
+    'statut_bourse': 'Statut_Bourse',
+    'avis_conseil': 'Avis_Conseil_Classe_T1',
+    'niveau': 'Niveau_Scolaire_Actuel',
+    'sexe': 'Sexe',
+}
+CHAMP_RISQUE = 'risque_decrochage'
+
+NOM_REFERENCE = 'reference_derive.json'
+NOM_ETAT = 'derive_etat.json'
+
+# Seuils usuels du PSI: < 0.1 stable, 0.1-0.25 dérive modérée, > 0.25 dérive forte
+SEUIL_PSI_MODERE = 0.1
+SEUIL_PSI_FORT = 0.25
+# Nombre minimal d'observations avant de lever une alerte
+MIN_OBSERVATIONS = 30
+N_INTERVALLES = 10
+
+
+def _cle(valeur):
+    """
+    Clé de comptage d'une valeur catégorielle (booléens et 0/1 confondus)
+    """
+    if isinstance(valeur, (bool, np.bool_)) or valeur in (0, 1):
+        return 'Oui' if valeur else 'Non'
+    return str(valeur)
+
+
+class Moments:
+    """
+    Effectif, moyenne et somme des carrés des écarts (Welford), fusionnables
+    """
+    __slots__ = ('n', 'moyenne', 'm2', 'minimum', 'maximum')
+
+    def __init__(self, n=0, moyenne=0.0, m2=0.0, minimum=math.inf, maximum=-math.inf):
+        self.n = n
+        self.moyenne = moyenne
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def ajouter(self, x):
+        self.n += 1
+        delta = x - self.moyenne
+        self.moyenne += delta / self.n
+        self.m2 += delta * (x - self.moyenne)
+        self.minimum = min(self.minimum, x)
+        self.maximum = max(self.maximum, x)
+
+    def fusionner(self, autre):
+        n = self.n + autre.n
+        if n == 0:
+            return
+        delta = autre.moyenne - self.moyenne
+        self.m2 += autre.m2 + delta * delta * self.n * autre.n / n
+        self.moyenne += delta * autre.n / n
+        self.n = n
+        self.minimum = min(self.minimum, autre.minimum)
+        self.maximum = max(self.maximum, autre.maximum)
+
+    @property
+    def ecart_type(self):
+        return math.sqrt(self.m2 / self.n) if self.n else 0.0
+
+    def etat(self):
+        return {'n': self.n, 'moyenne': self.moyenne, 'm2': self.m2,
+                'minimum': self.minimum if self.n else None, 'maximum': self.maximum if self.n else None}
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        return cls(etat['n'], etat['moyenne'], etat['m2'],
+                   math.inf if etat['minimum'] is None else etat['minimum'],
+                   -math.inf if etat['maximum'] is None else etat['maximum'])
+
+
+def psi(comptes_reference, comptes_courants, epsilon=1e-4):
+    """
+    Population Stability Index entre deux distributions discrètes de même support
+    """
+    ref = np.asarray(comptes_reference, dtype=float)
+    cour = np.asarray(comptes_courants, dtype=float)
+    ref = np.maximum(ref / max(ref.sum(), 1.0), epsilon)
+    cour = np.maximum(cour / max(cour.sum(), 1.0), epsilon)
+    return float(np.sum((cour - ref) * np.log(cour / ref)))
+
+
+def ks(comptes_reference, comptes_courants):
+    """
+    Statistique de Kolmogorov-Smirnov calculée aux bords des intervalles de l'histogramme
+    """
+    ref = np.cumsum(comptes_reference) / max(sum(comptes_reference), 1)
+    cour = np.cumsum(comptes_courants) / max(sum(comptes_courants), 1)
+    return float(np.max(np.abs(ref - cour)))
+
+
+def _bords(valeurs, n_intervalles=N_INTERVALLES):
+    """
+    Bords intérieurs des intervalles: quantiles de la référence (doublons retirés)
+    """
+    valeurs = np.asarray(valeurs, dtype=float)
+    valeurs = valeurs[~np.isnan(valeurs)]
+    quantiles = np.quantile(valeurs, np.linspace(0, 1, n_intervalles + 1)[1:-1])
+    return sorted(set(float(q) for q in quantiles))
+
+
+def _histogramme(valeurs, bords):
+    indices = np.searchsorted(bords, np.asarray(valeurs, dtype=float), side='right')
+    return np.bincount(indices, minlength=len(bords) + 1).tolist()
+
+
+def construire_reference(df, risques=None, n_intervalles=N_INTERVALLES):
+    """
+    Statistiques de référence à partir des données d'entraînement (colonnes du CSV)
+    et, si fournies, des probabilités prédites sur le jeu de test
+    """
+    reference = {'n': int(len(df)), 'numeriques': {}, 'categories': {}}
+    numeriques = {champ: df[colonne] for champ, colonne in CHAMPS_NUMERIQUES.items()}
+    if risques is not None:
+        numeriques[CHAMP_RISQUE] = pd.Series(risques)
+    for champ, valeurs in numeriques.items():
+        bords = _bords(valeurs, n_intervalles)
+        reference['numeriques'][champ] = {
+            'bords': bords,
+            'comptes': _histogramme(valeurs, bords),
+            'moyenne': float(valeurs.mean()),
+            'ecart_type': float(valeurs.std(ddof=0)),
+        }
+    for champ, colonne in CHAMPS_CATEGORIELS.items():
+        reference['categories'][champ] = dict(Counter(_cle(v) for v in df[colonne]))
+    return reference
+
+
+def sauvegarder_reference(reference, dossier):
+    chemin = Path(dossier) / NOM_REFERENCE
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(reference, f, ensure_ascii=False)
+    return chemin
+
+
+def charger_reference(dossier):
+    """
+    Référence enregistrée à côté du modèle, ou None (modèles antérieurs au suivi de dérive)
+    """
+    chemin = Path(dossier) / NOM_REFERENCE
+    if not chemin.exists():
+        return None
+    with open(chemin, encoding='utf-8') as f:
+        return json.load(f)
+
+
+class MoniteurDerive:
+    def __init__(self, reference, chemin_etat=None, intervalle_sauvegarde=20):
+        """
+        Résumés en flux des entrées et du risque prédit: histogrammes sur les
+        intervalles de la référence, comptages par catégorie et moments courants.
+        Chaque observation coûte O(1) (recherche dichotomique sur ~10 bords par champ).
+        Chaque processus sauvegarde ses seules observations dans son propre fichier
+        (derive_etat-<processus>.json); les lectures additionnent tous les fichiers.
+        """
+        self.reference = reference
+        self.chemin_etat = Path(chemin_etat) if chemin_etat else None
+        self.intervalle_sauvegarde = intervalle_sauvegarde
+        self._verrou = threading.Lock()
+        self._depuis_sauvegarde = 0
+        self._observations = 0
+        self.histogrammes = {champ: [0] * (len(ref['bords']) + 1) for champ, ref in reference['numeriques'].items()}
+        self.moments = {champ: Moments() for champ in reference['numeriques']}
+        self.categories = {champ: Counter() for champ in reference['categories']}
+        if self.chemin_etat:
+            self.fichier_processus = self.chemin_etat.with_name(
+                f"{self.chemin_etat.stem}-{uuid.uuid4().hex[:12]}{self.chemin_etat.suffix}")
+            # Les dernières observations ne sont pas perdues à l'arrêt du processus
+            atexit.register(self.sauvegarder)
+
+    def observer(self, ligne):
+        """
+        Ajoute une prédiction (dictionnaire champ -> valeur, risque_decrochage compris)
+        """
+        with self._verrou:
+            for champ, ref in self.reference['numeriques'].items():
+                valeur = ligne.get(champ)
+                if valeur is None:
+                    continue
+                valeur = float(valeur)
+                self.histogrammes[champ][bisect_right(ref['bords'], valeur)] += 1
+                self.moments[champ].ajouter(valeur)
+            for champ in self.categories:
+                if ligne.get(champ) is not None:
+                    self.categories[champ][_cle(ligne[champ])] += 1
+            self._depuis_sauvegarde += 1
+            self._observations += 1
+            sauvegarder = self.chemin_etat and self._depuis_sauvegarde >= self.intervalle_sauvegarde
+        if sauvegarder:
+            self.sauvegarder()
+
+    def observer_lot(self, data, risques):
+        """
+        Ajoute un lot de prédictions (DataFrame aux colonnes de l'application)
+        """
+        for ligne, risque in zip(data.to_dict('records'), risques):
+            self.observer(dict(ligne, **{CHAMP_RISQUE: risque}))
+
+    def etat(self):
+        with self._verrou:
+            return {
+                'histogrammes': {champ: list(c) for champ, c in self.histogrammes.items()},
+                'moments': {champ: m.etat() for champ, m in self.moments.items()},
+                'categories': {champ: dict(c) for champ, c in self.categories.items()},
+            }
+
+    def fusionner_etat(self, etat):
+        """
+        Fusionne un état sauvegardé (autre processus, redémarrage): les résumés s'additionnent
+        """
+        with self._verrou:
+            for champ, comptes in etat.get('histogrammes', {}).items():
+                if champ in self.histogrammes and len(comptes) == len(self.histogrammes[champ]):
+                    self.histogrammes[champ] = [a + b for a, b in zip(self.histogrammes[champ], comptes)]
+                    self.moments[champ].fusionner(Moments.depuis_etat(etat['moments'][champ]))
+            for champ, comptes in etat.get('categories', {}).items():
+                if champ in self.categories:
+                    self.categories[champ].update(comptes)
+
+    def _fichiers_sauvegardes(self):
+        """
+        États des autres processus (et des exécutions précédentes), hors fichier de ce processus
+        """
+        if not self.chemin_etat:
+            return []
+        motif = f"{self.chemin_etat.stem}*{self.chemin_etat.suffix}"
+        return [chemin for chemin in self.chemin_etat.parent.glob(motif) if chemin != self.fichier_processus]
+
+    def etat_global(self):
+        """
+        Observations de ce processus additionnées à celles sauvegardées par tous les autres
+        """
+        total = MoniteurDerive(self.reference)
+        total.fusionner_etat(self.etat())
+        for chemin in self._fichiers_sauvegardes():
+            try:
+                total.fusionner_etat(json.loads(chemin.read_text(encoding='utf-8')))
+            except (OSError, ValueError):
+                continue
+        return total.etat()
+
+    def sauvegarder(self):
+        """
+        Écrit les observations de ce processus dans son fichier (remplacement atomique):
+        aucun autre processus n'écrit ce fichier, rien n'est écrasé
+        """
+        if not self.chemin_etat or not self._observations:
+            return
+        etat = self.etat()
+        temporaire = self.fichier_processus.with_suffix('.tmp')
+        temporaire.write_text(json.dumps(etat), encoding='utf-8')
+        os.replace(temporaire, self.fichier_processus)
+        with self._verrou:
+            self._depuis_sauvegarde = 0
+
+    def derives(self):
+        """
+        PSI (et KS pour les champs numériques) de chaque champ par rapport à la référence
+        """
+        resultats = []
+        etat = self.etat_global()
+        for champ, ref in self.reference['numeriques'].items():
+            comptes = etat['histogrammes'][champ]
+            moments = etat['moments'][champ]
+            resultats.append({
+                'champ': champ, 'n': sum(comptes),
+                'psi': psi(ref['comptes'], comptes) if sum(comptes) else None,
+                'ks': ks(ref['comptes'], comptes) if sum(comptes) else None,
+                'moyenne_reference': ref['moyenne'], 'moyenne': moments['moyenne'] if moments['n'] else None,
+            })
+        for champ, ref in self.reference['categories'].items():
+            comptes = etat['categories'][champ]
+            # Les modalités inconnues de la référence comptent aussi dans la dérive
+            modalites = sorted(set(ref) | set(comptes))
+            courants = [comptes.get(m, 0) for m in modalites]
+            resultats.append({
+                'champ': champ, 'n': sum(courants),
+                'psi': psi([ref.get(m, 0) for m in modalites], courants) if sum(courants) else None,
+                'ks': None, 'moyenne_reference': None, 'moyenne': None,
+            })
+        return resultats
+
+    def alertes(self, min_observations=MIN_OBSERVATIONS):
+        """
+        Champs dont le PSI dépasse les seuils, une fois assez d'observations accumulées
+        """
+        alertes = []
+        for derive in self.derives():
+            if derive['psi'] is None or derive['n'] < min_observations or derive['psi'] < SEUIL_PSI_MODERE:
+                continue
+            derive['niveau'] = 'forte' if derive['psi'] >= SEUIL_PSI_FORT else 'modérée'
+            alertes.append(derive)
+        return sorted(alertes, key=lambda d: d['psi'], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suivi de la dérive des entrées et du risque prédit")
+    parser.add_argument('--registre', default='model/registre')
+    parser.add_argument('--version', help="Version du modèle (production par défaut)")
+    sous = parser.add_subparsers(dest='commande', required=True)
+    reference = sous.add_parser('reference', help="Calculer la référence d'une version à partir du CSV d'entraînement")
+    reference.add_argument('--csv', default='src/models/training/donnees_eleves_complet.csv')
+    sous.add_parser('rapport', help="Afficher le PSI/KS de chaque champ")
+    args = parser.parse_args()
+
+    from src.models.registre import RegistreModeles
+    registre = RegistreModeles(args.registre)
+    version = args.version or registre.manifeste()['live']
+    dossier = registre.repertoire / version
+    if args.commande == 'reference':
+        # Code d'entraînement importé seulement ici: l'application n'en dépend pas
+        from src.models.training.data_loader import load_data
+        df = load_data(args.csv)
+        donnees = pd.DataFrame({champ: df[colonne] for champ, colonne in {**CHAMPS_NUMERIQUES, **CHAMPS_CATEGORIELS}.items()})
+        risques = registre.predicteur(version).predict(donnees)
+        print(f"Référence enregistrée dans {sauvegarder_reference(construire_reference(df, risques), dossier)}")
+        return
+
+    ref = charger_reference(dossier)
+    if ref is None:
+        print(f"Aucune référence pour la version {version}")
+        return
+    moniteur = MoniteurDerive(ref, chemin_etat=dossier / NOM_ETAT)
+    print(pd.DataFrame(moniteur.derives()).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import random
+import threading
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+
+# Variables d'environnement reconnues
+ENV_ACTIVATION = 'ELITE_INSTRUMENTATION'            # '1' pour activer
+ENV_ECHANTILLONNAGE = 'ELITE_INSTRUMENTATION_TAUX'  # ex: '0.1' pour 10 % des appels
+ENV_JOURNAL = 'ELITE_INSTRUMENTATION_JOURNAL'       # fichier JSON lines (optionnel)
+
+# Contexte vide partagé, renvoyé quand l'instrumentation est désactivée
+_CONTEXTE_NUL = nullcontext()
+
+
+class _Chrono:
+    """
+    Context manager qui mesure une durée et l'enregistre à la sortie
+    """
+    __slots__ = ('instrumentation', 'nom', 'debut')
+
+    def __init__(self, instrumentation, nom):
+        self.instrumentation = instrumentation
+        self.nom = nom
+        self.debut = None
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.instrumentation.enregistrer(self.nom, time.perf_counter() - self.debut)
+        return False
+
+
+class Instrumentation:
+    def __init__(self, actif=False, taux_echantillonnage=1.0, taille_fenetre=500, journal=None):
+        """
+        Collecte des durées (chronos) et des compteurs pour les chemins critiques
+        de l'application. Désactivée, elle se résume à un test booléen par appel.
+        """
+        self.actif = actif
+        self.taux_echantillonnage = taux_echantillonnage
+        self.taille_fenetre = taille_fenetre
+        self.journal = journal
+        self._verrou = threading.Lock()
+        self._durees = defaultdict(lambda: deque(maxlen=self.taille_fenetre))
+        self._totaux = defaultdict(float)
+        self._appels = defaultdict(int)
+        self._compteurs = defaultdict(int)
+
+    @classmethod
+    def depuis_environnement(cls):
+        """
+        Construit l'instrumentation à partir des variables d'environnement
+        """
+        actif = os.environ.get(ENV_ACTIVATION, '0').lower() in ('1', 'true', 'oui')
+        try:
+            taux = float(os.environ.get(ENV_ECHANTILLONNAGE, '1.0'))
+        except ValueError:
+            taux = 1.0
+        return cls(actif=actif, taux_echantillonnage=min(max(taux, 0.0), 1.0),
+                   journal=os.environ.get(ENV_JOURNAL))
+
+    def configurer(self, actif=None, taux_echantillonnage=None):
+        """
+        Active/désactive la collecte ou change le taux d'échantillonnage à chaud
+        """
+        if actif is not None:
+            self.actif = actif
+        if taux_echantillonnage is not None:
+            self.taux_echantillonnage = min(max(float(taux_echantillonnage), 0.0), 1.0)
+
+    def chrono(self, nom):
+        """
+        Context manager mesurant le bloc `with` sous le nom donné
+        """
+        if not self.actif:
+            return _CONTEXTE_NUL
+        if self.taux_echantillonnage < 1.0 and random.random() >= self.taux_echantillonnage:
+            # Appel non échantillonné: on le compte sans le chronométrer
+            with self._verrou:
+                self._compteurs[nom + '.non_echantillonne'] += 1
+            return _CONTEXTE_NUL
+        return _Chrono(self, nom)
+
+    def chronometre(self, nom=None):
+        """
+        Décorateur chronométrant chaque appel de la fonction décorée
+        """
+        def decorateur(func):
+            nom_mesure = nom or f"{func.__module__}.{func.__qualname__}"
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.actif:
+                    return func(*args, **kwargs)
+                with self.chrono(nom_mesure):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorateur
+
+    def incrementer(self, nom, valeur=1):
+        """
+        Incrémente un compteur
+        """
+        if self.actif:
+            with self._verrou:
+                self._compteurs[nom] += valeur
+
+    def enregistrer(self, nom, duree):
+        """
+        Enregistre une durée (en secondes) pour l'opération donnée
+        """
+        with self._verrou:
+            self._durees[nom].append(duree)
+            self._totaux[nom] += duree
+            self._appels[nom] += 1
+
+    def reinitialiser(self):
+        """
+        Efface toutes les mesures collectées
+        """
+        with self._verrou:
+            self._durees.clear()
+            self._totaux.clear()
+            self._appels.clear()
+            self._compteurs.clear()
+
+    def resume(self):
+        """
+        Retourne les statistiques des fenêtres récentes (p50/p95 en millisecondes)
+        """
+        with self._verrou:
+            fenetres = {nom: sorted(durees) for nom, durees in self._durees.items()}
+            appels = dict(self._appels)
+            totaux = dict(self._totaux)
+
+        lignes = []
+        for nom, durees in sorted(fenetres.items()):
+            if not durees:
+                continue
+            lignes.append({
+                'operation': nom,
+                'appels': appels[nom],
+                'total_s': totaux[nom],
+                'p50_ms': _quantile(durees, 0.50) * 1000,
+                'p95_ms': _quantile(durees, 0.95) * 1000,
+                'max_ms': durees[-1] * 1000,
+            })
+        return lignes
+
+    def compteurs(self):
+        """
+        Retourne une copie des compteurs
+        """
+        return dict(self._compteurs)
+
+    def exporter_prometheus(self):
+        """
+        Exporte les mesures au format texte de Prometheus
+        """
+        lignes = [
+            '# HELP elite_duree_secondes Durée des opérations instrumentées',
+            '# TYPE elite_duree_secondes summary',
+        ]
+        for ligne in self.resume():
+            etiquette = _echapper_etiquette(ligne['operation'])
+            lignes.append(f'elite_duree_secondes{{operation="{etiquette}",quantile="0.5"}} {ligne["p50_ms"] / 1000:.6f}')
+            lignes.append(f'elite_duree_secondes{{operation="{etiquette}",quantile="0.95"}} {ligne["p95_ms"] / 1000:.6f}')
+            lignes.append(f'elite_duree_secondes_sum{{operation="{etiquette}"}} {ligne["total_s"]:.6f}')
+            lignes.append(f'elite_duree_secondes_count{{operation="{etiquette}"}} {ligne["appels"]}')
+
+        lignes.append('# HELP elite_evenements_total Compteurs instrumentés')
+        lignes.append('# TYPE elite_evenements_total counter')
+        for nom, valeur in sorted(self.compteurs().items()):
+            lignes.append(f'elite_evenements_total{{compteur="{_echapper_etiquette(nom)}"}} {valeur}')
+        return '\n'.join(lignes) + '\n'
+
+    def exporter_json(self, chemin=None):
+        """
+        Ajoute un instantané des mesures au journal JSON lines local
+        """
+        chemin = chemin or self.journal or 'instrumentation.jsonl'
+        instantane = {
+            'horodatage': datetime.now().isoformat(timespec='seconds'),
+            'taux_echantillonnage': self.taux_echantillonnage,
+            'operations': self.resume(),
+            'compteurs': self.compteurs(),
+        }
+        with open(chemin, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(instantane, ensure_ascii=False) + '\n')
+        return chemin
+
+
+def _quantile(valeurs_triees, q):
+    """
+    Quantile par rang le plus proche sur une liste déjà triée
+    """
+    index = min(int(q * len(valeurs_triees)), len(valeurs_triees) - 1)
+    return valeurs_triees[index]
+
+
+def _echapper_etiquette(valeur):
+    return valeur.replace('\\', '\\\\').replace('"', '\\"')
+
+
+# Instance partagée par toute l'application
+instrumentation = Instrumentation.depuis_environnement()
+
+
+_hooks_sqlalchemy_installes = False
+
+
+def installer_hooks_sqlalchemy():
+    """
+    Chronomètre chaque requête SQL exécutée par SQLAlchemy (tous moteurs confondus)
+    """
+    global _hooks_sqlalchemy_installes
+    if _hooks_sqlalchemy_installes:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _avant_requete(conn, cursor, statement, parameters, context, executemany):
+        if instrumentation.actif:
+            conn.info.setdefault('elite_debuts_requetes', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _apres_requete(conn, cursor, statement, parameters, context, executemany):
+        debuts = conn.info.get('elite_debuts_requetes')
+        if debuts:
+            duree = time.perf_counter() - debuts.pop()
+            verbe = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else 'inconnu'
+            instrumentation.enregistrer(f'sql.{verbe}', duree)
+
+    @event.listens_for(Engine, 'handle_error')
+    def _erreur_requete(contexte):
+        # Requête en échec: after_cursor_execute n'est pas appelé, on retire son début de la pile
+        conn = contexte.connection
+        debuts = conn.info.get('elite_debuts_requetes') if conn is not None else None
+        if debuts:
+            debuts.pop()
+            instrumentation.incrementer('sql.erreur')
+
+    _hooks_sqlalchemy_installes = True
@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import argparse
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Variable d'environnement: 'cprofile' ou 'echantillonnage' pour profiler chaque rendu
+ENV_PROFILAGE = 'ELITE_PROFILAGE'
+# Répertoire de sortie des profils (par défaut ./profils)
+ENV_REPERTOIRE = 'ELITE_PROFILAGE_REPERTOIRE'
+
+MODES = ('cprofile', 'echantillonnage')
+
+
+def mode_environnement():
+    """
+    Retourne le mode de profilage demandé par l'environnement, ou None
+    """
+    mode = os.environ.get(ENV_PROFILAGE, '').strip().lower()
+    return mode if mode in MODES else None
+
+
+class Capture:
+    def __init__(self, label, mode, chemin):
+        """
+        Résultat d'une capture: fichier produit et résumé des fonctions les plus coûteuses
+        """
+        self.label = label
+        self.mode = mode
+        self.chemin = chemin
+        self.duree = None
+        self.resume = []
+
+    def infos(self):
+        return {
+            'label': self.label,
+            'mode': self.mode,
+            'chemin': str(self.chemin),
+            'duree': self.duree,
+            'resume': self.resume,
+        }
+
+
+class _Echantillonneur(threading.Thread):
+    def __init__(self, thread_cible, intervalle):
+        """
+        Relève périodiquement la pile du thread cible (format « collapsed stacks »)
+        """
+        super().__init__(daemon=True)
+        self.thread_cible = thread_cible
+        self.intervalle = intervalle
+        self.piles = Counter()
+        self._arret = threading.Event()
+
+    def run(self):
+        while not self._arret.wait(self.intervalle):
+            frame = sys._current_frames().get(self.thread_cible)
+            if frame is None:
+                continue
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            self.piles[';'.join(reversed(pile))] += 1
+
+    def arreter(self):
+        self._arret.set()
+        self.join()
+
+
+def _resume_cprofile(chemin, top_n):
+    stats = pstats.Stats(str(chemin))
+    lignes = []
+    for (fichier, ligne, fonction), (cc, nc, tottime, cumtime, _) in stats.stats.items():
+        lignes.append({
+            'fonction': f"{Path(fichier).name}:{ligne}({fonction})",
+            'appels': nc,
+            'temps_propre_s': tottime,
+            'temps_cumule_s': cumtime,
+        })
+    lignes.sort(key=lambda l: l['temps_cumule_s'], reverse=True)
+    return lignes[:top_n]
+
+
+def _resume_piles(piles, intervalle, top_n):
+    inclusif = Counter()
+    propre = Counter()
+    for pile, n in piles.items():
+        frames = pile.split(';')
+        for frame in set(frames):
+            inclusif[frame] += n
+        propre[frames[-1]] += n
+    return [
+        {
+            'fonction': frame,
+            'echantillons': n,
+            'temps_propre_s': propre[frame] * intervalle,
+            'temps_cumule_s': n * intervalle,
+        }
+        for frame, n in inclusif.most_common(top_n)
+    ]
+
+
+class Profileur:
+    def __init__(self, repertoire=None, top_n=25, intervalle=0.005):
+        """
+        Capture ponctuelle d'un rendu de page ou d'un lot de prédictions
+        """
+        self.repertoire = Path(repertoire or os.environ.get(ENV_REPERTOIRE, 'profils'))
+        self.top_n = top_n
+        self.intervalle = intervalle
+
+    def _chemin(self, label, extension):
+        horodatage = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        nom = ''.join(c if c.isalnum() else '_' for c in label) or 'capture'
+        self.repertoire.mkdir(parents=True, exist_ok=True)
+        return self.repertoire / f"{horodatage}_{nom}.{extension}"
+
+    @contextmanager
+    def capturer(self, label, mode='cprofile'):
+        """
+        Profile le bloc `with` et enregistre un fichier .prof (cProfile)
+        ou .collapsed (échantillonnage de pile)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Mode de profilage inconnu: {mode}")
+
+        if mode == 'cprofile':
+            capture = Capture(label, mode, self._chemin(label, 'prof'))
+            profil = cProfile.Profile()
+            debut = time.perf_counter()
+            profil.enable()
+            try:
+                yield capture
+            finally:
+                profil.disable()
+                capture.duree = time.perf_counter() - debut
+                profil.dump_stats(str(capture.chemin))
+                capture.resume = _resume_cprofile(capture.chemin, self.top_n)
+        else:
+            capture = Capture(label, mode, self._chemin(label, 'collapsed'))
+            echantillonneur = _Echantillonneur(threading.get_ident(), self.intervalle)
+            debut = time.perf_counter()
+            echantillonneur.start()
+            try:
+                yield capture
+            finally:
+                echantillonneur.arreter()
+                capture.duree = time.perf_counter() - debut
+                with open(capture.chemin, 'w', encoding='utf-8') as f:
+                    for pile, n in echantillonneur.piles.most_common():
+                        f.write(f"{pile} {n}\n")
+                capture.resume = _resume_piles(echantillonneur.piles, self.intervalle, self.top_n)
+
+
+# Instance partagée par l'application
+profileur = Profileur()
+
+
+def main():
+    """
+    Profile un lot de prédictions sur un fichier CSV (colonnes du formulaire)
+    """
+    import pandas as pd
+
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+    from src.models.predicteur import PredicteurDecrochage
+
+    parser = argparse.ArgumentParser(description="Profilage d'un lot de prédictions")
+    parser.add_argument('csv', help="CSV avec les colonnes age, sexe, niveau, moyenne_t1, ...")
+    parser.add_argument('--modele', default='model/modele_decrochage.pkl')
+    parser.add_argument('--mode', choices=MODES, default='cprofile')
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+
+    profileur.top_n = args.top
+    with profileur.capturer('lot_predictions', mode=args.mode) as capture:
+        predicteur = PredicteurDecrochage(args.modele)
+        data = pd.read_csv(args.csv)
+        predicteur.predict(data)
+
+    print(f"Profil enregistré dans {capture.chemin} ({capture.duree:.2f} s)")
+    for ligne in capture.resume:
+        print(f"{ligne['temps_cumule_s']:10.4f} s  {ligne['fonction']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+RACINE = Path(__file__).resolve().parents[2]
+
+# Un processus neuf par profil: temps d'import, premier score et mémoire résidente maximale
+MESURE = '''
+import json, resource, sys, time
+debut = time.perf_counter()
+{imports}
+imports = time.perf_counter() - debut
+{score}
+total = time.perf_counter() - debut
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'import_s': imports, 'demarrage_s': total, 'rss_mo': rss / 1024}}))
+'''
+
+ELEVE = ("{'age': [15], 'redoublement': [False], 'statut_bourse': [True], 'moyenne_t1': [55.0], "
+         "'moyenne_t2': [48.0], 'nb_matieres_echec': [3], 'absences_t1': [4], 'absences_t2': [9], "
+         "'retards': [2], 'sanctions': [0], 'avis_conseil': ['Passable'], 'sexe': ['Féminin'], "
+         "'niveau': ['4ème Humanités']}")
+
+PROFILS = {
+    'scoring (NumPy)': (
+        "from src.scoring.scoreur import ScoreurNumpy",
+        "ScoreurNumpy(%(artefact)r).predict(" + ELEVE + ")",
+    ),
+    'service (scikit-learn)': (
+        "import pandas as pd\nfrom src.models.predicteur import PredicteurDecrochage",
+        "PredicteurDecrochage(%(modele)r).predict(pd.DataFrame(" + ELEVE + "))",
+    ),
+    'entraînement': (
+        "sys.path.insert(0, 'src/models/training')\n"
+        "from model_factory import get_models\nfrom model_evaluation import save_confusion_matrix\n"
+        "import matplotlib.pyplot",
+        "get_models()",
+    ),
+}
+
+
+def mesurer(imports, score, repetitions=3):
+    """
+    Médiane de plusieurs lancements à froid (processus Python séparés)
+    """
+    script = MESURE.format(imports=imports, score=score)
+    resultats = []
+    for _ in range(repetitions):
+        sortie = subprocess.run([sys.executable, '-c', script], cwd=RACINE, capture_output=True, text=True)
+        if sortie.returncode != 0:
+            return {'erreur': sortie.stderr.strip().splitlines()[-1]}
+        resultats.append(json.loads(sortie.stdout.strip().splitlines()[-1]))
+    return {cle: sorted(r[cle] for r in resultats)[len(resultats) // 2] for cle in resultats[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage et mémoire des profils de service et d'entraînement")
+    parser.add_argument('--modele', default='model/registre/v0', help="Dossier du modèle (avec modele_numpy.npz)")
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    dossier = Path(args.modele)
+    chemins = {'artefact': str(dossier / 'modele_numpy.npz'), 'modele': str(dossier / 'modele_decrochage.pkl')}
+    print(f"{'Profil':<24}{'Import (s)':>12}{'Démarrage (s)':>16}{'RSS max (Mo)':>15}")
+    for nom, (imports, score) in PROFILS.items():
+        r = mesurer(imports, score % chemins, args.repetitions)
+        if 'erreur' in r:
+            print(f"{nom:<24}  indisponible: {r['erreur']}")
+            continue
+        print(f"{nom:<24}{r['import_s']:>12.3f}{r['demarrage_s']:>16.3f}{r['rss_mo']:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import os
+import sys
+import argparse
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+# Ajouter le répertoire racine au PYTHONPATH (exécution en ligne de commande)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.models.calibration import charger_calibration
+from src.models.predicteur import CORRESPONDANCE_COLONNES, COLONNES_NUMERIQUES
+from src.scoring.scoreur import NOM_ARTEFACT
+
+# Variables dérivées: (type, champ a, champ b), mêmes formules que le prétraitement
+DERIVEES = {
+    'evolution_moyenne': ('difference', 'moyenne_t2', 'moyenne_t1'),
+    'evolution_absences': ('difference', 'absences_t2', 'absences_t1'),
+    'total_absences': ('somme', 'absences_t1', 'absences_t2'),
+}
+
+# Préfixes des indicatrices one-hot et champ de l'application correspondant
+INDICATRICES = {
+    'Niveau_Scolaire_Actuel_': 'niveau',
+    'Avis_Conseil_Classe_T1_': 'avis_conseil',
+    'Sexe_': 'sexe',
+}
+
+FORETS = ('DecisionTreeClassifier', 'RandomForestClassifier', 'ExtraTreesClassifier')
+
+
+class ModeleNonExportable(ValueError):
+    """
+    Levée quand le type de modèle n'a pas d'équivalent NumPy
+    """
+
+
+def _encodage(colonnes):
+    champs = {colonne: champ for champ, colonne in CORRESPONDANCE_COLONNES.items()}
+    encodage = []
+    for colonne in colonnes:
+        if colonne in champs:
+            encodage.append(('valeur', champs[colonne], ''))
+        elif colonne in DERIVEES:
+            encodage.append(DERIVEES[colonne])
+        else:
+            prefixe = next((p for p in INDICATRICES if colonne.startswith(p)), None)
+            if prefixe is None:
+                raise ModeleNonExportable(f"Colonne sans correspondance: {colonne}")
+            encodage.append(('egal', INDICATRICES[prefixe], colonne[len(prefixe):]))
+    return encodage
+
+
+def _arbres(arbres, valeur):
+    """
+    Concatène les arbres en tableaux plats (indices des enfants décalés par arbre)
+    """
+    gauche, droite, attribut, seuil, valeurs, racines = [], [], [], [], [], []
+    decalage = 0
+    for arbre in arbres:
+        t = arbre.tree_
+        racines.append(decalage)
+        gauche.append(np.where(t.children_left >= 0, t.children_left + decalage, -1))
+        droite.append(np.where(t.children_right >= 0, t.children_right + decalage, -1))
+        attribut.append(t.feature)
+        seuil.append(t.threshold)
+        valeurs.append(valeur(t.value))
+        decalage += t.node_count
+    return {
+        'gauche': np.concatenate(gauche).astype(np.int64),
+        'droite': np.concatenate(droite).astype(np.int64),
+        'attribut': np.concatenate(attribut).astype(np.int64),
+        'seuil': np.concatenate(seuil).astype(np.float64),
+        'valeur': np.concatenate(valeurs).astype(np.float64),
+        'racines': np.array(racines, dtype=np.int64),
+        'profondeur': max(arbre.tree_.max_depth for arbre in arbres),
+    }
+
+
+def _parametres_modele(modele):
+    nom = type(modele).__name__
+    if nom in FORETS:
+        arbres = modele.estimators_ if hasattr(modele, 'estimators_') else [modele]
+        # Proportion de la classe 1 dans chaque feuille (effectifs ou fractions selon la version)
+        valeur = lambda v: v[:, 0, 1] / v[:, 0, :].sum(axis=1)
+        return {'type': 'foret', 'constante': 0.0, 'taux': 1.0, **_arbres(arbres, valeur)}
+
+    if nom == 'GradientBoostingClassifier':
+        if modele.n_classes_ != 2:
+            raise ModeleNonExportable("Gradient boosting multiclasse")
+        if modele.init_ == 'zero':
+            constante = 0.0
+        elif hasattr(modele.init_, 'class_prior_'):
+            p = modele.init_.class_prior_[1]
+            constante = float(np.log(p / (1 - p)))
+        else:
+            raise ModeleNonExportable("Estimateur initial non pris en charge")
+        valeur = lambda v: v[:, 0, 0]
+        return {'type': 'gb', 'constante': constante, 'taux': float(modele.learning_rate),
+                **_arbres(modele.estimators_[:, 0], valeur)}
+
+    if nom == 'LogisticRegression':
+        return {'type': 'lineaire', 'coefficients': modele.coef_[0].astype(np.float64),
+                'constante': float(modele.intercept_[0])}
+
+    raise ModeleNonExportable(f"Modèle non exportable en NumPy: {nom}")
+
+
+def exporter(modele, scaler, calibration, chemin):
+    """
+    Écrit l'artefact NumPy (encodage, standardisation, modèle, calibration) d'un modèle entraîné
+    """
+    colonnes = list(getattr(modele, 'feature_names_in_', []))
+    if not colonnes:
+        raise ModeleNonExportable("Noms des colonnes absents du modèle")
+    encodage = _encodage(colonnes)
+    noms_numeriques = list(getattr(scaler, 'feature_names_in_', COLONNES_NUMERIQUES))
+
+    artefact = _parametres_modele(modele)
+    artefact.update({
+        'colonnes': np.array(colonnes),
+        'encodage_type': np.array([e[0] for e in encodage]),
+        'encodage_a': np.array([e[1] for e in encodage]),
+        'encodage_b': np.array([e[2] for e in encodage]),
+        'indices_numeriques': np.array([colonnes.index(nom) for nom in noms_numeriques]),
+        'moyennes': np.asarray(scaler.mean_, dtype=np.float64),
+        'echelles': np.asarray(scaler.scale_, dtype=np.float64),
+    })
+    if calibration is not None:
+        artefact['calibration_x'] = np.asarray(calibration['x'], dtype=np.float64)
+        artefact['calibration_y'] = np.asarray(calibration['y'], dtype=np.float64)
+
+    chemin = Path(chemin)
+    with open(chemin, 'wb') as f:
+        np.savez(f, **artefact)
+    return chemin
+
+
+def exporter_dossier(dossier):
+    """
+    Exporte le modèle d'un dossier (modele_decrochage.pkl, scaler.pkl, calibration)
+    """
+    dossier = Path(dossier)
+    modele = joblib.load(dossier / 'modele_decrochage.pkl')
+    scaler = joblib.load(dossier / 'scaler.pkl')
+    return exporter(modele, scaler, charger_calibration(dossier), dossier / NOM_ARTEFACT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export NumPy d'un modèle pour le profil de scoring")
+    parser.add_argument('dossiers', nargs='+', help="Dossiers de modèle (ex. model/registre/v20250101-120000)")
+    args = parser.parse_args()
+    for dossier in args.dossiers:
+        try:
+            print(f"Artefact écrit: {exporter_dossier(dossier)}")
+        except ModeleNonExportable as e:
+            print(f"{dossier}: {e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Artefact numérique exporté à côté du modèle (voir src/scoring/export.py)
+NOM_ARTEFACT = 'modele_numpy.npz'
+
+
+def _sigmoide(z):
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+class ScoreurNumpy:
+    def __init__(self, chemin):
+        """
+        Scoring du décrochage avec NumPy seul: encodage des entrées, standardisation,
+        parcours vectorisé des arbres (ou modèle linéaire) et calibration, à partir
+        d'un artefact .npz exporté depuis le modèle entraîné
+        """
+        with np.load(chemin, allow_pickle=False) as artefact:
+            self.type = str(artefact['type'])
+            self.colonnes = artefact['colonnes'].tolist()
+            self.encodage = list(zip(artefact['encodage_type'].tolist(),
+                                     artefact['encodage_a'].tolist(),
+                                     artefact['encodage_b'].tolist()))
+            self.indices_numeriques = artefact['indices_numeriques']
+            self.moyennes = artefact['moyennes']
+            self.echelles = artefact['echelles']
+            self.calibration = (artefact['calibration_x'], artefact['calibration_y']) if 'calibration_x' in artefact else None
+            if self.type == 'lineaire':
+                self.coefficients = artefact['coefficients']
+                self.constante = float(artefact['constante'])
+            else:
+                self.gauche = artefact['gauche']
+                self.droite = artefact['droite']
+                self.attribut = artefact['attribut']
+                self.seuil = artefact['seuil']
+                self.valeur = artefact['valeur']
+                self.racines = artefact['racines']
+                self.profondeur = int(artefact['profondeur'])
+                self.constante = float(artefact['constante'])
+                self.taux = float(artefact['taux'])
+
+    def encoder(self, donnees):
+        """
+        Matrice des caractéristiques à partir de colonnes (dict champ -> séquence,
+        ou tout objet indexable par nom de champ, DataFrame compris)
+        """
+        colonnes = {}
+
+        def champ(nom):
+            if nom not in colonnes:
+                colonnes[nom] = np.asarray(donnees[nom])
+            return colonnes[nom]
+
+        n = len(champ(self.encodage[0][1]))
+        X = np.empty((n, len(self.colonnes)))
+        categories = {}
+        for j, (type_, a, b) in enumerate(self.encodage):
+            if type_ == 'valeur':
+                X[:, j] = champ(a).astype(float)
+            elif type_ == 'egal':
+                X[:, j] = champ(a) == b
+                categories[a] = categories.get(a, 0) + X[:, j]
+            elif type_ == 'difference':
+                X[:, j] = champ(a).astype(float) - champ(b).astype(float)
+            else:
+                X[:, j] = champ(a).astype(float) + champ(b).astype(float)
+
+        # Rejet des lignes incomplètes ou de modalités inconnues (pas de remplissage par 0)
+        invalides = ~np.isfinite(X).all(axis=1)
+        for somme in categories.values():
+            invalides |= somme != 1
+        if invalides.any():
+            raise ValueError(f"Lignes invalides: {np.flatnonzero(invalides).tolist()[:10]}")
+        return X
+
+    def _feuilles(self, X):
+        # Parcours simultané de tous les arbres pour toutes les lignes (une itération par niveau)
+        X32 = X.astype(np.float32).ravel()
+        debuts = (np.arange(len(X)) * X.shape[1])[None, :]
+        noeuds = np.repeat(self.racines[:, None], len(X), axis=1)
+        for _ in range(self.profondeur):
+            gauche = self.gauche[noeuds]
+            internes = gauche >= 0
+            if not internes.any():
+                break
+            a_gauche = X32[debuts + self.attribut[noeuds]] <= self.seuil[noeuds]
+            suivants = np.where(a_gauche, gauche, self.droite[noeuds])
+            noeuds = np.where(internes, suivants, noeuds)
+        return noeuds
+
+    def predict_features(self, X):
+        """
+        Probabilités de décrochage pour une matrice déjà encodée (non standardisée)
+        """
+        X = X.copy()
+        X[:, self.indices_numeriques] = (X[:, self.indices_numeriques] - self.moyennes) / self.echelles
+        if self.type == 'lineaire':
+            probas = _sigmoide(X @ self.coefficients + self.constante)
+        elif self.type == 'foret':
+            probas = self.valeur[self._feuilles(X)].mean(axis=0)
+        else:
+            probas = _sigmoide(self.constante + self.taux * self.valeur[self._feuilles(X)].sum(axis=0))
+        if self.calibration is not None:
+            probas = np.interp(probas, *self.calibration)
+        return probas
+
+    def predict(self, donnees):
+        """
+        Probabilités de décrochage pour un lot d'élèves (mêmes champs que le formulaire)
+        """
+        return self.predict_features(self.encoder(donnees))
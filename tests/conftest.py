@@ -0,0 +1,62 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+# Racine du dépôt dans le PYTHONPATH (imports `src.…`)
+RACINE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RACINE)
+
+from src.database.models import Eleve, RouteurEleves
+from src.database.cache import ENV_REPERTOIRE_MARQUEURS
+from src.database.archivage import ENV_REPERTOIRE_ARCHIVES
+
+ECOLE_ACCENTUEE = 'École Saint-Jean'
+
+
+def nouvel_eleve(id_eleve, ecole=ECOLE_ACCENTUEE, annee_scolaire='2024', **valeurs):
+    """
+    Élève complet avec des valeurs par défaut plausibles
+    """
+    champs = dict(id_eleve=id_eleve, ecole=ecole, annee_scolaire=annee_scolaire, age=15, sexe='Féminin',
+                  niveau_scolaire='4ème Humanités', redoublement=False, statut_bourse=True,
+                  moyenne_t1=55.0, moyenne_t2=48.0, nb_matieres_echec=3, absences_t1=4, absences_t2=9,
+                  retards=2, sanctions=0, avis_conseil='Passable', risque_decrochage=0.42,
+                  date_prediction=date(2024, 3, 1))
+    champs.update(valeurs)
+    return Eleve(**champs)
+
+
+@pytest.fixture
+def routeur_ecole(tmp_path):
+    return RouteurEleves('ecole', tmp_path / 'partitions')
+
+
+@pytest.fixture(autouse=True)
+def repertoires_temporaires(tmp_path, monkeypatch):
+    """
+    Marqueurs du cache et archives écrits hors du dépôt
+    """
+    monkeypatch.setenv(ENV_REPERTOIRE_MARQUEURS, str(tmp_path / 'marqueurs'))
+    monkeypatch.setenv(ENV_REPERTOIRE_ARCHIVES, str(tmp_path / 'archives'))
+
+
+@pytest.fixture
+def routeur_global(routeur_ecole, monkeypatch):
+    """
+    Routeur partitionné par école, substitué au routeur partagé des modules de la base
+    """
+    from src.database import archivage, export, requetes
+    for module in (archivage, export, requetes):
+        monkeypatch.setattr(module, 'routeur', routeur_ecole)
+    return routeur_ecole
+
+
+def enregistrer(routeur, *eleves):
+    session = routeur.session_pour(ecole=eleves[0].ecole, annee_scolaire=eleves[0].annee_scolaire)
+    try:
+        session.add_all(eleves)
+        session.commit()
+    finally:
+        session.close()
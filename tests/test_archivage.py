@@ -0,0 +1,24 @@
+from conftest import ECOLE_ACCENTUEE, enregistrer, nouvel_eleve
+from src.database.archivage import annees_archivees, archiver_annee, lire_archives
+from src.database.requetes import charger_historique_partitions
+
+
+def test_archivage_d_une_ecole_accentuee(routeur_global):
+    enregistrer(routeur_global, nouvel_eleve('E1', annee_scolaire='2023'),
+                nouvel_eleve('E2', annee_scolaire='2023', niveau_scolaire='3ème Humanités'))
+    enregistrer(routeur_global, nouvel_eleve('E3', annee_scolaire='2024'))
+    enregistrer(routeur_global, nouvel_eleve('F1', ecole='Lycée Bobiso', annee_scolaire='2023'))
+
+    # Une partition par école, chacune parcourue une seule fois
+    assert routeur_global.cles(annee='2023') == sorted([ECOLE_ACCENTUEE, 'Lycée Bobiso'])
+    assert archiver_annee('2023') == 3
+    assert annees_archivees() == ['2023']
+
+    archive = lire_archives(['id_eleve', 'ecole', 'niveau_scolaire'], annee='2023', ecoles=[ECOLE_ACCENTUEE])
+    assert sorted(archive['id_eleve']) == ['E1', 'E2']
+    assert set(archive['ecole']) == {ECOLE_ACCENTUEE}
+
+    # Les lignes archivées ont quitté SQLite; l'historique de l'année vient des archives
+    assert routeur_global.ids_existants(['E1', 'E2', 'E3', 'F1']) == {'E3'}
+    historique = charger_historique_partitions(annee='2023', ecoles=[ECOLE_ACCENTUEE])
+    assert sorted(historique['ID Élève']) == ['E1', 'E2']
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import create_engine
+
+from src.auth import authentification as auth
+from src.auth.authentification import CacheUtilisateurs, LimiteurTentatives, TropDeTentatives
+from src.database import models
+
+
+@pytest.fixture
+def base_utilisateurs(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'base.db'}")
+    models.Base.metadata.create_all(engine)
+    monkeypatch.setattr(models, '_engine', engine)
+    return engine
+
+
+def _ajouter(username, mot_de_passe, role='enseignant'):
+    session = models.get_session()
+    try:
+        auth.creer_utilisateur(session, username, mot_de_passe, role)
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_modifications_d_un_autre_processus_vues_apres_l_intervalle(base_utilisateurs, monkeypatch):
+    monkeypatch.setattr(auth, 'cache_utilisateurs', CacheUtilisateurs(intervalle=60))
+    _ajouter('prof', 'ancien')
+    jeton = auth.emettre_jeton('prof', 'enseignant')
+    assert auth.session_valide(jeton) == ('prof', 'enseignant', None)
+
+    # Changement de mot de passe fait ailleurs: aucun appel à invalider() dans ce processus
+    engine = base_utilisateurs
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.update().values(password=auth.hacher_mot_de_passe('nouveau')))
+    assert auth.session_valide(jeton) is not None
+
+    horloge = auth.time.monotonic() + 61
+    monkeypatch.setattr(auth.time, 'monotonic', lambda: horloge)
+    assert auth.session_valide(jeton) is None
+
+
+def test_limiteur_borne_les_noms_suivis(monkeypatch):
+    horloge = [0.0]
+    monkeypatch.setattr(auth.time, 'monotonic', lambda: horloge[0])
+    limiteur = LimiteurTentatives(max_echecs=3, fenetre=300, max_par_seconde=10 ** 6, max_noms=100)
+    for i in range(1000):
+        limiteur.verifier(f'inconnu{i}')
+        limiteur.echec(f'inconnu{i}')
+    assert len(limiteur._echecs) == 100
+
+    # Les noms expirés sont retirés au fil de l'eau
+    horloge[0] = 301
+    limiteur.echec('dernier')
+    assert list(limiteur._echecs) == ['dernier']
+
+
+def test_limiteur_bloque_toujours_apres_trop_d_echecs(monkeypatch):
+    limiteur = LimiteurTentatives(max_echecs=3, fenetre=300, max_par_seconde=10 ** 6)
+    for _ in range(3):
+        limiteur.verifier('prof')
+        limiteur.echec('prof')
+    with pytest.raises(TropDeTentatives):
+        limiteur.verifier('prof')
+    limiteur.succes('prof')
+    limiteur.verifier('prof')
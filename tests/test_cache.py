@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+from conftest import RACINE, nouvel_eleve
+from src.database import cache, models
+from src.database.cache import CachePages
+
+
+@pytest.fixture
+def base_unique(tmp_path, monkeypatch):
+    """
+    Base principale temporaire, sans partitionnement: toutes les écoles dans un seul fichier
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'base.db'}")
+    models.Base.metadata.create_all(engine)
+    monkeypatch.setattr(models, '_engine', engine)
+    monkeypatch.setattr(cache, 'cache_pages', CachePages())
+    return tmp_path
+
+
+def _enregistrer(eleve):
+    session = models.get_session()
+    try:
+        session.add(eleve)
+        session.commit()
+    finally:
+        session.close()
+
+
+def _compteur():
+    appels = []
+
+    def calcul():
+        appels.append(1)
+        return len(appels)
+    return appels, calcul
+
+
+def test_commit_n_invalide_que_son_ecole(base_unique):
+    pages = cache.cache_pages
+    appels_a, calcul_a = _compteur()
+    appels_b, calcul_b = _compteur()
+    appels_d, calcul_d = _compteur()
+    for _ in range(2):
+        pages.obtenir('tableau', ['A'], 'admin', {}, calcul_a)
+        pages.obtenir('tableau', ['B'], 'admin', {}, calcul_b)
+        pages.obtenir('tableau', None, 'admin', {}, calcul_d)
+    assert (len(appels_a), len(appels_b), len(appels_d)) == (1, 1, 1)
+
+    _enregistrer(nouvel_eleve('E1', ecole='A'))
+    pages.obtenir('tableau', ['A'], 'admin', {}, calcul_a)
+    pages.obtenir('tableau', ['B'], 'admin', {}, calcul_b)
+    pages.obtenir('tableau', None, 'admin', {}, calcul_d)
+    assert (len(appels_a), len(appels_b), len(appels_d)) == (2, 1, 2)
+
+
+def test_ecriture_d_un_autre_processus(base_unique):
+    pages = CachePages()
+    appels_a, calcul_a = _compteur()
+    appels_b, calcul_b = _compteur()
+    pages.obtenir('tableau', ['A'], 'admin', {}, calcul_a)
+    pages.obtenir('tableau', ['B'], 'admin', {}, calcul_b)
+
+    script = "from src.database.cache import signaler_modification; signaler_modification({'A'})"
+    subprocess.run([sys.executable, '-c', script], cwd=RACINE, check=True, env=dict(os.environ))
+    pages.obtenir('tableau', ['A'], 'admin', {}, calcul_a)
+    pages.obtenir('tableau', ['B'], 'admin', {}, calcul_b)
+    assert (len(appels_a), len(appels_b)) == (2, 1)
+
+
+def test_pas_de_duree_de_vie_par_defaut(monkeypatch):
+    monkeypatch.delenv(cache.ENV_TTL_CACHE, raising=False)
+    assert CachePages().ttl == 0
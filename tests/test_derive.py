@@ -0,0 +1,47 @@
+from src.monitoring.derive import MoniteurDerive
+
+REFERENCE = {
+    'numeriques': {'age': {'bords': [14.0, 16.0], 'comptes': [10, 10, 10], 'moyenne': 15.0, 'ecart_type': 1.0}},
+    'categories': {'sexe': {'Féminin': 15, 'Masculin': 15}},
+}
+
+
+def _observer(moniteur, n, age, sexe):
+    for _ in range(n):
+        moniteur.observer({'age': age, 'sexe': sexe})
+
+
+def test_plusieurs_processus_additionnent_leurs_observations(tmp_path):
+    chemin = tmp_path / 'derive_etat.json'
+    # Deux workers qui sauvegardent chacun leur état, dans un ordre quelconque
+    premier = MoniteurDerive(REFERENCE, chemin_etat=chemin, intervalle_sauvegarde=1000)
+    second = MoniteurDerive(REFERENCE, chemin_etat=chemin, intervalle_sauvegarde=1000)
+    _observer(premier, 7, 13, 'Féminin')
+    _observer(second, 5, 17, 'Masculin')
+    premier.sauvegarder()
+    second.sauvegarder()
+    _observer(premier, 1, 15, 'Féminin')
+    premier.sauvegarder()
+
+    lecteur = MoniteurDerive(REFERENCE, chemin_etat=chemin)
+    derives = {d['champ']: d for d in lecteur.derives()}
+    assert derives['age']['n'] == 13
+    assert lecteur.etat_global()['histogrammes']['age'] == [7, 1, 5]
+    assert lecteur.etat_global()['categories']['sexe'] == {'Féminin': 8, 'Masculin': 5}
+
+    # Un processus sans observation n'écrit pas de fichier
+    lecteur.sauvegarder()
+    assert len(list(tmp_path.glob('derive_etat*.json'))) == 2
+
+
+def test_lecture_en_cours_d_observation(tmp_path):
+    chemin = tmp_path / 'derive_etat.json'
+    autre = MoniteurDerive(REFERENCE, chemin_etat=chemin)
+    _observer(autre, 3, 13, 'Féminin')
+    autre.sauvegarder()
+    courant = MoniteurDerive(REFERENCE, chemin_etat=chemin)
+    _observer(courant, 2, 17, 'Masculin')
+    # Observations non encore sauvegardées de ce processus comprises, sans double comptage
+    assert courant.etat_global()['histogrammes']['age'] == [3, 0, 2]
+    courant.sauvegarder()
+    assert courant.etat_global()['histogrammes']['age'] == [3, 0, 2]
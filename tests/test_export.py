@@ -0,0 +1,39 @@
+import csv
+from datetime import date
+
+import numpy as np
+
+from conftest import enregistrer, nouvel_eleve
+from src.database.archivage import archiver_annee
+from src.database.export import _valeurs_export, exporter
+from src.database.requetes import LIBELLES
+
+
+def _lire_csv(chemin):
+    with open(chemin, encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f, delimiter=';'))
+
+
+def test_valeurs_numpy_formatees_comme_les_valeurs_python():
+    ligne = (np.bool_(True), np.bool_(False), True, np.int64(3), np.float64(0.5), date(2024, 3, 1))
+    assert _valeurs_export(ligne) == ['Oui', 'Non', 'Oui', 3, 0.5, '2024-03-01']
+    assert type(_valeurs_export(ligne)[3]) is int
+
+
+def test_export_d_une_annee_archivee(routeur_global, tmp_path):
+    enregistrer(routeur_global, nouvel_eleve('A1', annee_scolaire='2023', redoublement=True),
+                nouvel_eleve('A2', annee_scolaire='2023', statut_bourse=False))
+    enregistrer(routeur_global, nouvel_eleve('B1', annee_scolaire='2024', redoublement=True))
+    assert archiver_annee('2023') == 2
+
+    chemin = tmp_path / 'export.csv'
+    assert exporter(chemin, annee='2023') == 2
+    lignes = _lire_csv(chemin)
+    assert list(lignes[0]) == LIBELLES
+    assert sorted((l['ID Élève'], l['Redoublement'], l['Boursier']) for l in lignes) == [
+        ('A1', 'Oui', 'Oui'), ('A2', 'Non', 'Non')]
+    assert {l['Date Prédiction'] for l in lignes} == {'2024-03-01'}
+
+    # Même mise en forme pour les lignes encore en base
+    exporter(chemin, annee='2024')
+    assert [(l['ID Élève'], l['Redoublement']) for l in _lire_csv(chemin)] == [('B1', 'Oui')]
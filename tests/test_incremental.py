@@ -0,0 +1,46 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from conftest import RACINE
+
+sys.path.insert(0, os.path.join(RACINE, 'src', 'models', 'training'))
+from incremental import reentrainer
+
+
+def _donnees(n=200, graine=0):
+    rng = np.random.default_rng(graine)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=['a', 'b', 'c', 'd'])
+    y = pd.Series((X['a'] + rng.normal(scale=0.5, size=n) > 0).astype(int))
+    return X, y
+
+
+@pytest.mark.parametrize('modele', [
+    RandomForestClassifier(n_estimators=20, max_depth=3, random_state=0),
+    GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=0),
+])
+def test_mises_a_jour_successives_bornees(modele):
+    X, y = _donnees()
+    modele.fit(X, y)
+    for passage in range(12):
+        X_nouveau, y_nouveau = _donnees(40, graine=passage + 1)
+        X, y = pd.concat([X, X_nouveau], ignore_index=True), pd.concat([y, y_nouveau], ignore_index=True)
+        modele, _ = reentrainer(modele, X, y, X_nouveau, y_nouveau, croissance=0.5, max_estimateurs=30)
+        assert modele.n_estimators <= 30
+        assert len(modele.estimators_) <= 30
+    assert modele.predict_proba(X).shape == (len(X), 2)
+
+
+def test_rotation_des_arbres_au_plafond():
+    X, y = _donnees()
+    foret = RandomForestClassifier(n_estimators=30, max_depth=3, random_state=0).fit(X, y)
+    anciens = foret.estimators_
+    foret, mode = reentrainer(foret, X, y, X, y, croissance=0.2, max_estimateurs=30)
+    assert len(foret.estimators_) == 30
+    # Les 6 plus anciens arbres sont retirés, les suivants conservés tels quels
+    assert np.array_equal(foret.estimators_[0].tree_.threshold, anciens[6].tree_.threshold)
+    assert '-6 anciens' in mode
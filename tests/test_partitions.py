@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+from conftest import ECOLE_ACCENTUEE, RACINE, enregistrer, nouvel_eleve
+from src.database import requetes
+from src.database.models import RouteurEleves
+
+
+def test_cle_accentuee_meme_processus(routeur_global):
+    routeur_ecole = routeur_global
+    enregistrer(routeur_ecole, nouvel_eleve('E1'))
+
+    assert routeur_ecole.cles() == [ECOLE_ACCENTUEE]
+    assert routeur_ecole.cles(ecoles=[ECOLE_ACCENTUEE]) == [ECOLE_ACCENTUEE]
+
+    assert len(requetes.charger_historique_partitions()) == 1
+    assert len(requetes.charger_historique_partitions(ecoles=[ECOLE_ACCENTUEE])) == 1
+
+
+def test_cle_accentuee_nouveau_processus(routeur_ecole):
+    enregistrer(routeur_ecole, nouvel_eleve('E1'), nouvel_eleve('E2'))
+
+    # Nouveau routeur dans le même processus (aucun moteur ouvert)
+    relu = RouteurEleves('ecole', routeur_ecole.repertoire)
+    assert relu.cles(ecoles=[ECOLE_ACCENTUEE]) == [ECOLE_ACCENTUEE]
+    assert relu.ids_existants(['E1', 'E2', 'E3']) == {'E1', 'E2'}
+
+    # Et dans un processus neuf, comme après un redémarrage de l'application
+    script = (
+        "import sys; from src.database.models import RouteurEleves; "
+        f"print(RouteurEleves('ecole', {str(routeur_ecole.repertoire)!r}).cles(ecoles=[sys.argv[1]]))"
+    )
+    sortie = subprocess.run([sys.executable, '-c', script, ECOLE_ACCENTUEE], cwd=RACINE,
+                            capture_output=True, text=True, check=True)
+    assert sortie.stdout.strip() == repr([ECOLE_ACCENTUEE])
+
+
+def test_ecoles_proches_restent_distinctes(routeur_ecole):
+    # Avant l'encodage réversible, ces deux écoles partageaient le même fichier
+    enregistrer(routeur_ecole, nouvel_eleve('E1', ecole='École A'))
+    enregistrer(routeur_ecole, nouvel_eleve('E2', ecole='_cole A'))
+
+    relu = RouteurEleves('ecole', routeur_ecole.repertoire)
+    assert relu.cles() == sorted(['École A', '_cole A'])
+    assert len(set(relu.fichiers())) == 2